@@ -0,0 +1,54 @@
+"""
+Regression Check: Patient Names in Cached FAQ Answers
+Stores answers written for one patient in the FAQ answer cache's template form
+(src/rag/answer_cache.py) and renders them for another. Offline and instant.
+
+A cached answer is shown to every later patient with a similar question, so
+the writer's name must become a placeholder where the answer addresses them,
+and must stay as written where it belongs to a doctor who shares it
+("Dr. Omar Fahad Al-Rashed" for a patient called Omar). Answers that mention
+the patient any other way are not cached at all.
+
+Run from the project root (exit status 1 on failure):
+    python -m benchmarks.answer_cache_cases
+"""
+
+import os
+import sys
+
+
+WRITER = "Omar Khalid"
+READER = "Sara Ali"
+
+# (answer written for WRITER, expected answer for READER, or None if it must not be cached)
+CASES = [
+    ("Hi Omar, Dr. Omar Fahad Al-Rashed sees patients on Sundays.",
+     "Hi Sara, Dr. Omar Fahad Al-Rashed sees patients on Sundays."),
+    ("Sure, Omar! Dr. Omar Fahad Al-Rashed is our orthodontist.",
+     "Sure, Sara! Dr. Omar Fahad Al-Rashed is our orthodontist."),
+    ("Omar, we are open 9 AM to 5 PM.", "Sara, we are open 9 AM to 5 PM."),
+    ("Thank you, Omar Khalid. Parking is free.", "Thank you, Sara Ali. Parking is free."),
+    ("Cleanings are covered by most plans.", "Cleanings are covered by most plans."),
+    # Not addressing the patient: may be the patient or a doctor, so not cached
+    ("Omar Fahad Al-Rashed is our orthodontist.", None),
+    ("I noted that Omar prefers mornings.", None),
+]
+
+
+def main():
+    os.environ.setdefault("OPENROUTER_API_KEY", "offline")  # Settings validate it on import
+    from src.rag.answer_cache import render, templatize
+
+    failures = 0
+    for answer, expected in CASES:
+        template = templatize(answer, WRITER)
+        result = render(template, READER) if template is not None else None
+        ok = result == expected
+        failures += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {answer}\n     -> {result if result is not None else '(not cached)'}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: Parallel vs Combined Classification
+Compares the two-call (sentiment + intent) mode against the single
+structured-output call for latency, LLM requests, prompt tokens and accuracy.
+
+Run from the project root (requires OPENROUTER_API_KEY):
+    python -m benchmarks.classifier_modes --repeats 3
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from langchain_core.messages import HumanMessage
+from langchain_community.callbacks import get_openai_callback
+from src.config.settings import settings
+from src.graph.nodes.sentiment import sentiment_node
+from src.graph.nodes.intent import intent_node
+from src.graph.nodes.classify import classify_node
+
+
+# (message, expected intent, expected escalation)
+LABELLED_MESSAGES = [
+    ("hi there", "faq", False),
+    ("thank you so much!", "faq", False),
+    ("what are your opening hours on thursday?", "faq", False),
+    ("do you accept Tawuniya insurance?", "faq", False),
+    ("how much does teeth whitening cost?", "faq", False),
+    ("is there parking near the clinic?", "faq", False),
+    ("I want to book a cleaning appointment", "booking", False),
+    ("can I see a dentist next Monday?", "booking", False),
+    ("are there any free slots tomorrow afternoon?", "booking", False),
+    ("please cancel my appointment with Dr. Saad", "management", False),
+    ("I need to reschedule my filling to next week", "management", False),
+    ("what are my upcoming appointments?", "management", False),
+    ("I want to speak to a human", "escalate", False),
+    ("my tooth is bleeding badly and won't stop", "escalate", True),
+    ("this is the worst clinic ever, I'm calling my lawyer", "escalate", True),
+    ("you people are useless, I'm going to sue", "escalate", True),
+    ("I'm a bit disappointed my last visit ran late", "faq", False),
+    ("the receptionist was rude but I still want to book a checkup", "booking", False),
+]
+
+
+async def run_parallel(state: dict) -> dict:
+    sentiment_result, intent_result = await asyncio.gather(sentiment_node(state), intent_node(state))
+    return {**sentiment_result, **intent_result}
+
+
+async def run_combined(state: dict) -> dict:
+    return await classify_node(state)
+
+
+async def benchmark_mode(name: str, runner, repeats: int) -> dict:
+    """Run every labelled message through a classifier mode and collect metrics"""
+    latencies = []
+    intent_correct = 0
+    escalation_correct = 0
+    total = 0
+
+    with get_openai_callback() as usage:
+        for _ in range(repeats):
+            for text, expected_intent, expected_escalation in LABELLED_MESSAGES:
+                state = {
+                    "messages": [HumanMessage(content=text)],
+                    "current_intent": None,
+                    "ticket_types": [],
+                    "original_input": None,
+                }
+                start = time.perf_counter()
+                result = await runner(state)
+                latencies.append(time.perf_counter() - start)
+
+                escalated = bool(result.get("should_escalate"))
+                intent = "escalate" if escalated else result.get("current_intent", "faq")
+                intent_correct += intent == expected_intent
+                escalation_correct += escalated == expected_escalation
+                total += 1
+
+    latencies.sort()
+    return {
+        "mode": name,
+        "turns": total,
+        "llm_requests": usage.successful_requests,
+        "prompt_tokens_per_turn": round(usage.prompt_tokens / total, 1),
+        "completion_tokens_per_turn": round(usage.completion_tokens / total, 1),
+        "mean_latency_s": round(statistics.mean(latencies), 3),
+        "p50_latency_s": round(latencies[len(latencies) // 2], 3),
+        "p95_latency_s": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+        "intent_accuracy": round(intent_correct / total, 3),
+        "escalation_accuracy": round(escalation_correct / total, 3),
+    }
+
+
+async def main(repeats: int):
+    # Compare the LLM tiers only - local fast paths would hide the difference
+    settings.sentiment_fast_path = False
+    settings.intent_classifier_enabled = False
+
+    results = [
+        await benchmark_mode("parallel", run_parallel, repeats),
+        await benchmark_mode("combined", run_combined, repeats),
+    ]
+
+    print("=" * 80)
+    print("📊 Classifier mode benchmark")
+    print("=" * 80)
+    for key in results[0]:
+        print(f"{key:28s}" + "".join(f"{str(r[key]):>20s}" for r in results))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parallel vs combined classification")
+    parser.add_argument("--repeats", type=int, default=1, help="Passes over the labelled messages")
+    args = parser.parse_args()
+    asyncio.run(main(args.repeats))
@@ -0,0 +1,367 @@
+"""
+Stand-in LLM Server
+OpenAI-compatible chat-completions server for offline runs of the real
+LLM clients (ChatOpenAI over the shared HTTP pool, request policy, token
+budgets, retries).
+
+Answers come from the same rule-based model as benchmarks/fakes.py
+(router, sentiment, structured classification, tool-calling agents,
+translation, history summary, ticket analysis), optionally preceded by
+scripted rules from a JSON file. Supported request features:
+- tools / tool_choice (tool calls in the OpenAI format)
+- stream=True with stream_options.include_usage (server-sent events)
+- max_tokens (content is cut and finish_reason is "length")
+- logprobs (every token gets a high probability)
+- token usage, including cached prompt tokens for repeated system prompts
+
+Latency follows a LatencyProfile picked by model and tools (time to first
+token plus a per-token cost). Faults are injected at random per request:
+rate_limit (429), server_error (500), timeout (hangs past the client's
+deadline) and disconnect (a stream cut off mid-way, 502 when not streamed).
+
+Run it and point the app at it:
+    python -m benchmarks.fake_server --port 8765 --scale 0.2 --fault rate_limit=0.05
+    OPENROUTER_BASE_URL=http://127.0.0.1:8765/v1 OPENROUTER_API_KEY=offline python main.py
+
+Scripted rules (--script rules.json) are checked first, on calls whose last
+message is from the user. "match" and "system" are regexes for the last
+user message and the system prompt; "tool" requires a bound tool:
+    [{"match": "parking", "reply": "Free parking is behind the clinic."},
+     {"system": "intent classification", "match": "refund", "reply": "escalate"},
+     {"tool": "view_my_appointments", "match": "what do i have",
+      "tool_calls": [{"name": "view_my_appointments", "args": {"patient_email": "patient1@example.com"}}]}]
+
+GET /stats returns request, token and fault counters.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass, fields, replace
+from typing import List, Optional
+from benchmarks.fakes import LatencyProfile, ScriptedChatModel, _tool_call
+from src.config.settings import settings
+from src.utils.tokens import estimate_tokens
+
+
+FAULT_KINDS = ("rate_limit", "server_error", "timeout", "disconnect")
+
+
+@dataclass(frozen=True)
+class FaultProfile:
+    """Probability of each injected fault per request"""
+    rate_limit: float = 0.0
+    server_error: float = 0.0
+    timeout: float = 0.0
+    disconnect: float = 0.0
+    hang_seconds: float = 60.0  # How long a "timeout" request hangs before answering 504
+
+    def override(self, specs: List[str]) -> "FaultProfile":
+        """Apply "kind=probability" overrides (e.g. "rate_limit=0.05")"""
+        updates = {}
+        for spec in specs:
+            name, _, value = spec.partition("=")
+            if name not in {f.name for f in fields(self)}:
+                raise ValueError(f"Unknown fault '{name}' (expected one of {', '.join(FAULT_KINDS)}, hang_seconds)")
+            updates[name] = float(value)
+        return replace(self, **updates)
+
+    def draw(self, rng: random.Random) -> Optional[str]:
+        """Fault to inject into one request, or None"""
+        roll = rng.random()
+        for kind in FAULT_KINDS:
+            roll -= getattr(self, kind)
+            if roll < 0:
+                return kind
+        return None
+
+
+@dataclass(frozen=True)
+class ScriptRule:
+    """Scripted reply for calls whose last user message (and system prompt) match"""
+    match: str = ""
+    system: str = ""
+    tool: str = ""
+    reply: str = ""
+    tool_calls: tuple = ()
+
+    def applies(self, system: str, last_user: str, tool_names: tuple) -> bool:
+        return (re.search(self.match, last_user, re.IGNORECASE) is not None
+                and re.search(self.system, system, re.IGNORECASE) is not None
+                and (not self.tool or self.tool in tool_names))
+
+    @classmethod
+    def load(cls, path: str) -> List["ScriptRule"]:
+        with open(path, encoding="utf-8") as f:
+            return [cls(**{**rule, "tool_calls": tuple(rule.get("tool_calls", ()))}) for rule in json.load(f)]
+
+
+class ServerStats:
+    """Request, token and fault counters"""
+
+    def __init__(self):
+        self.requests = 0
+        self.streamed = 0
+        self.tool_call_responses = 0
+        self.truncated = 0  # Answers cut at max_tokens
+        self.scripted = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.faults = {kind: 0 for kind in FAULT_KINDS}
+
+    def summary(self) -> dict:
+        return {
+            "requests": self.requests,
+            "streamed": self.streamed,
+            "tool_call_responses": self.tool_call_responses,
+            "truncated": self.truncated,
+            "scripted": self.scripted,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "faults": dict(self.faults),
+        }
+
+
+def _latency_key(model: str, tool_names: tuple) -> str:
+    """LatencyProfile component for a request (mirrors the client names in src/llm/client.py)"""
+    if model == settings.cascade_small_model:
+        return "llm_small"
+    if model == settings.translation_model:
+        return "llm_translator"
+    if tool_names and "TurnClassification" not in tool_names:
+        return "llm_agent"
+    return "llm_router"
+
+
+def _tool_call_json(tool_call: dict) -> dict:
+    return {"id": tool_call["id"], "type": "function",
+            "function": {"name": tool_call["name"], "arguments": json.dumps(tool_call["args"])}}
+
+
+def _logprobs(text: str) -> dict:
+    return {"content": [{"token": piece, "logprob": -0.01, "bytes": None, "top_logprobs": []}
+                        for piece in re.findall(r"\S+\s*|\s+", text)]}
+
+
+def create_app(profile: LatencyProfile = None, faults: FaultProfile = None,
+               rules: List[ScriptRule] = None, seed: int = 0):
+    """
+    Build the stand-in server.
+
+    Args:
+        profile: Latency of each model tier (default: LatencyProfile())
+        faults: Fault injection rates (default: none)
+        rules: Scripted rules, checked before the rule-based answers
+        seed: Seed for the fault draws
+
+    Returns:
+        FastAPI app (its ServerStats is app.state.stats)
+    """
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+    from langchain_core.messages import AIMessage
+    from langchain_openai.chat_models.base import _convert_dict_to_message
+
+    profile = profile or LatencyProfile()
+    faults = faults or FaultProfile()
+    rules = rules or []
+    rng = random.Random(seed)
+    stats = ServerStats()
+    responder = ScriptedChatModel()
+
+    app = FastAPI(title="Stand-in LLM server")
+    app.state.stats = stats
+
+    def error(status: int, kind: str, message: str) -> JSONResponse:
+        return JSONResponse({"error": {"message": message, "type": kind, "code": status}}, status_code=status)
+
+    def respond(model: str, messages: list, tool_names: tuple) -> tuple[AIMessage, bool]:
+        """Scripted rule or rule-based answer, and whether a rule produced it"""
+        if messages and messages[-1].type == "human":
+            system = str(messages[0].content) if messages[0].type == "system" else ""
+            for rule in rules:
+                if rule.applies(system, str(messages[-1].content), tool_names):
+                    calls = [_tool_call(call["name"], **call.get("args", {})) for call in rule.tool_calls]
+                    return AIMessage(content=rule.reply, tool_calls=calls), True
+        bound = responder.model_copy(update={"model_name": model, "tool_names": tool_names})
+        return bound._respond(messages), False
+
+    @app.api_route("/v1/models", methods=["GET", "HEAD"])
+    async def models():
+        names = {settings.openrouter_model, settings.translation_model, settings.cascade_small_model}
+        return {"object": "list", "data": [{"id": name, "object": "model"} for name in sorted(names)]}
+
+    @app.get("/stats")
+    async def server_stats():
+        return stats.summary()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats.requests += 1
+        model = body.get("model", settings.openrouter_model)
+        stream = bool(body.get("stream"))
+        stats.streamed += int(stream)
+
+        fault = faults.draw(rng)
+        if fault:
+            stats.faults[fault] += 1
+        if fault == "rate_limit":
+            return error(429, "rate_limit_exceeded", "Rate limit exceeded (injected)")
+        if fault == "server_error":
+            return error(500, "server_error", "Upstream provider error (injected)")
+        if fault == "timeout":
+            await asyncio.sleep(faults.hang_seconds)
+            return error(504, "timeout", "Upstream provider timed out (injected)")
+        if fault == "disconnect" and not stream:
+            return error(502, "bad_gateway", "Connection to the provider was lost (injected)")
+
+        tool_names = tuple(tool["function"]["name"] for tool in body.get("tools") or [])
+        messages = [_convert_dict_to_message(m) for m in body.get("messages", [])]
+        message, scripted = respond(model, messages, tool_names)
+        stats.scripted += int(scripted)
+        usage = responder._usage(messages, message)
+
+        finish_reason = "tool_calls" if message.tool_calls else "stop"
+        content = message.content
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+        if max_tokens and estimate_tokens(content) > max_tokens:
+            content = content[:max_tokens * 4]
+            finish_reason = "length"
+            stats.truncated += 1
+            usage = {**usage, "output_tokens": max_tokens, "total_tokens": usage["input_tokens"] + max_tokens}
+        stats.tool_call_responses += int(bool(message.tool_calls))
+        stats.prompt_tokens += usage["input_tokens"]
+        stats.completion_tokens += usage["output_tokens"]
+        usage_json = {
+            "prompt_tokens": usage["input_tokens"],
+            "completion_tokens": usage["output_tokens"],
+            "total_tokens": usage["total_tokens"],
+            "prompt_tokens_details": {"cached_tokens": usage["input_token_details"]["cache_read"]},
+        }
+
+        latency = getattr(profile, _latency_key(model, tool_names))
+        per_token = profile.llm_ms_per_token / 1000
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        await asyncio.sleep(latency.sample())
+
+        if not stream:
+            await asyncio.sleep(per_token * usage["output_tokens"])
+            reply = {"role": "assistant", "content": content or None}
+            if message.tool_calls:
+                reply["tool_calls"] = [_tool_call_json(tc) for tc in message.tool_calls]
+            choice = {"index": 0, "message": reply, "finish_reason": finish_reason,
+                      "logprobs": _logprobs(content) if body.get("logprobs") else None}
+            return {"id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                    "choices": [choice], "usage": usage_json}
+
+        def event(delta: dict = None, finish: str = None, **extra) -> str:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish}],
+                     **extra}
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        async def events():
+            yield event({"role": "assistant", "content": ""})
+            pieces = re.findall(r"\S+\s*", content)
+            for i, piece in enumerate(pieces):
+                await asyncio.sleep(per_token * estimate_tokens(piece))
+                if fault == "disconnect" and i >= len(pieces) // 2:
+                    return  # Cut off: no finish_reason, no [DONE]
+                yield event({"content": piece})
+            for i, tool_call in enumerate(message.tool_calls):
+                arguments = json.dumps(tool_call["args"])
+                await asyncio.sleep(per_token * estimate_tokens(arguments))
+                yield event({"tool_calls": [{"index": i, "id": tool_call["id"], "type": "function",
+                                             "function": {"name": tool_call["name"], "arguments": arguments}}]})
+            if fault == "disconnect":
+                return
+            yield event({}, finish_reason)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield event(usage=usage_json)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+class FakeLLMServer:
+    """
+    The stand-in server on a background thread (for load tests and CI).
+
+        with FakeLLMServer(profile) as server:
+            ...  # point OPENROUTER_BASE_URL at server.url
+    """
+
+    def __init__(self, profile: LatencyProfile = None, faults: FaultProfile = None,
+                 rules: List[ScriptRule] = None, seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        import uvicorn
+
+        self.app = create_app(profile, faults, rules, seed)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((host, port))
+        self.url = f"http://{host}:{self._socket.getsockname()[1]}/v1"
+        self._server = uvicorn.Server(uvicorn.Config(self.app, log_level="warning", lifespan="off",
+                                                     timeout_graceful_shutdown=1))
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [self._socket]}, daemon=True)
+
+    @property
+    def stats(self) -> ServerStats:
+        return self.app.state.stats
+
+    def start(self) -> "FakeLLMServer":
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("Stand-in LLM server failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+        self._socket.close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stand-in LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every latency (0 answers instantly)")
+    parser.add_argument("--latency", action="append", default=[],
+                        help="Override one model tier: component=median[,p95] (e.g. llm_agent=900,3000)")
+    parser.add_argument("--fault", action="append", default=[],
+                        help="Fault rate: kind=probability (rate_limit, server_error, timeout, disconnect)")
+    parser.add_argument("--script", help="JSON file with scripted rules")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app(
+        profile=LatencyProfile().override(args.latency).scaled(args.scale),
+        faults=FaultProfile().override(args.fault),
+        rules=ScriptRule.load(args.script) if args.script else None,
+        seed=args.seed,
+    )
+    print(f"Stand-in LLM server: OPENROUTER_BASE_URL=http://{args.host}:{args.port}/v1")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,681 @@
+"""
+Offline Stand-in Backends
+Fake LLM, embedding, database, calendar and SMTP backends with configurable
+latency, so the full graph can run without network access or credentials.
+
+The fake LLM is rule based: it classifies intents by keyword, "translates"
+the scripted Arabic messages (benchmarks/scenarios.py) and plans real tool
+calls for the specialist agents, so tools, services and the TRT steps all
+run their normal code paths.
+
+install() must run BEFORE src.graph is imported, because the nodes bind the
+LLM clients at import time:
+
+    from benchmarks.fakes import LatencyProfile, install
+    install(LatencyProfile())
+    from src.graph.workflow import create_workflow
+
+With install(llm_server=url) the real LLM clients are kept and pointed at an
+OpenAI-compatible server instead (benchmarks/fake_server.py), so the HTTP
+pool, request policy and response parsing run too.
+"""
+
+import os
+
+# The real clients are still constructed on import; they are replaced before use
+os.environ.setdefault("OPENROUTER_API_KEY", "offline")
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, fields, replace
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from benchmarks.scenarios import TRANSLATIONS
+from init_chromadb import load_chunks
+from src.classifiers.intent_embedding import HashingEmbeddings, _cosine
+from src.config.settings import settings
+from src.llm.policy import RequestPolicyMixin
+from src.rag.retriever import KnowledgeBaseRetriever
+from src.services.calendar import CalendarService
+from src.services.database import DatabaseService
+from src.services.gmail import GmailService
+from src.utils.telemetry import telemetry_callback
+from src.utils.tokens import estimate_tokens
+
+
+# =============================================================================
+# LATENCY
+# =============================================================================
+
+@dataclass(frozen=True)
+class Latency:
+    """Lognormal latency given by its median and 95th percentile (ms)"""
+    median_ms: float = 0.0
+    p95_ms: float = 0.0
+
+    def sample(self) -> float:
+        """Draw one latency in seconds"""
+        if self.median_ms <= 0:
+            return 0.0
+        if self.p95_ms <= self.median_ms:
+            return self.median_ms / 1000
+        sigma = math.log(self.p95_ms / self.median_ms) / 1.645
+        return _rng.lognormvariate(math.log(self.median_ms), sigma) / 1000
+
+    def scaled(self, factor: float) -> "Latency":
+        return Latency(self.median_ms * factor, self.p95_ms * factor)
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        """Parse "median" or "median,p95" (milliseconds)"""
+        parts = [float(p) for p in spec.split(",")]
+        return cls(parts[0], parts[1] if len(parts) > 1 else parts[0])
+
+
+@dataclass(frozen=True)
+class LatencyProfile:
+    """
+    Latency of every stand-in backend.
+
+    LLM latencies are time to first token; each output token then adds
+    `llm_ms_per_token`. Defaults are rough medians / p95s observed against
+    OpenRouter, Jina, Supabase, Google Calendar and Gmail SMTP from Riyadh.
+    """
+    llm_router: Latency = Latency(350, 1200)
+    llm_agent: Latency = Latency(600, 2000)
+    llm_translator: Latency = Latency(300, 900)
+    llm_small: Latency = Latency(150, 500)  # Cascade small-model tier (CASCADE_ENABLED)
+    llm_ms_per_token: float = 12.0
+    embedding: Latency = Latency(120, 400)
+    vector_search: Latency = Latency(15, 60)
+    database: Latency = Latency(60, 250)
+    calendar: Latency = Latency(220, 800)
+    smtp: Latency = Latency(700, 2000)
+
+    @classmethod
+    def instant(cls) -> "LatencyProfile":
+        """Every backend answers immediately (measures framework overhead only)"""
+        return cls().scaled(0.0)
+
+    def scaled(self, factor: float) -> "LatencyProfile":
+        """Multiply every latency by `factor`"""
+        updates = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            updates[f.name] = value.scaled(factor) if isinstance(value, Latency) else value * factor
+        return replace(self, **updates)
+
+    def override(self, specs: List[str]) -> "LatencyProfile":
+        """Apply "component=median,p95" overrides (e.g. "calendar=400,1500")"""
+        updates = {}
+        for spec in specs:
+            name, _, value = spec.partition("=")
+            if name == "llm_ms_per_token":
+                updates[name] = float(value)
+            elif name in {f.name for f in fields(self)}:
+                updates[name] = Latency.parse(value)
+            else:
+                raise ValueError(f"Unknown latency component '{name}'")
+        return replace(self, **updates)
+
+
+_rng = random.Random(0)
+_profile = LatencyProfile()
+
+
+def _sleep(latency: Latency):
+    """Blocking wait (services run in run_blocking worker threads)"""
+    seconds = latency.sample()
+    if seconds:
+        time.sleep(seconds)
+
+
+# =============================================================================
+# FAKE DATA
+# =============================================================================
+
+PATIENTS = [
+    {"id": f"p{i}", "name": name, "email": f"patient{i}@example.com", "phone": f"+96650000000{i}"}
+    for i, name in enumerate([
+        "Mohammed Ali Al-Qahtani", "Fatimah Abdullah Al-Saeed", "Sara Hassan Al-Shehri",
+        "Abdulrahman Fahad Al-Dossary", "Reem Majed Al-Harbi", "Ahmed Mohammed Al-Otaibi",
+        "Noura Ibrahim Al-Ghamdi", "Khalid Saud Al-Mutairi",
+    ], start=1)
+]
+
+DOCTORS = [
+    {"id": f"d{i}", "name": name, "specialization": spec, "email": f"doctor{i}@clinic.example", "available": True}
+    for i, (name, spec) in enumerate([
+        ("Dr. Hind Mohammed Al-Sudairy", "General Dentistry"),
+        ("Dr. Laila Ahmed Al-Faisal", "Orthodontics"),
+        ("Dr. Saad bin Abdulaziz Al-Khaled", "Oral Surgery"),
+        ("Dr. Yousef Sulaiman Al-Ajlan", "Periodontics"),
+        ("Dr. Omar Fahad Al-Rashed", "Pediatric Dentistry"),
+    ], start=1)
+]
+
+SERVICES = [
+    {"id": f"s{i}", "name": name, "description": f"{name} at Riyadh Dental Care",
+     "duration_minutes": minutes, "price": price}
+    for i, (name, minutes, price) in enumerate([
+        ("Initial Examination", 30, 150), ("Teeth Cleaning", 45, 300), ("Tooth Filling", 60, 400),
+        ("Teeth Whitening", 60, 1200), ("Root Canal Treatment", 90, 1500), ("Tooth Extraction", 45, 500),
+    ], start=1)
+]
+
+
+class FakeDatabase(DatabaseService):
+    """In-memory Supabase stand-in"""
+
+    def __init__(self):
+        self.tickets: List[dict] = []
+
+    def get_all_patients(self):
+        _sleep(_profile.database)
+        return list(PATIENTS)
+
+    def get_patient_by_id(self, patient_id: str):
+        _sleep(_profile.database)
+        return next((p for p in PATIENTS if p["id"] == patient_id), None)
+
+    def get_available_doctors(self):
+        _sleep(_profile.database)
+        return list(DOCTORS)
+
+    def get_all_services(self):
+        _sleep(_profile.database)
+        return list(SERVICES)
+
+    def get_doctor_by_id(self, doctor_id: str):
+        _sleep(_profile.database)
+        return next((d for d in DOCTORS if d["id"] == doctor_id), None)
+
+    def get_service_by_id(self, service_id: str):
+        _sleep(_profile.database)
+        return next((s for s in SERVICES if s["id"] == service_id), None)
+
+    def get_support_tickets(self, limit: int = 200):
+        _sleep(_profile.database)
+        return self.tickets[-limit:]
+
+    def insert_support_ticket(self, ticket_data: dict):
+        _sleep(_profile.database)
+        self.tickets.append(ticket_data)
+        return [ticket_data]
+
+
+class FakeCalendar(CalendarService):
+    """
+    In-memory Google Calendar stand-in. Every patient starts with two
+    upcoming appointments so the management flows have something to find.
+    """
+
+    def __init__(self):
+        self.calendar_id = "offline"
+        self._events: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=3)
+        for i, patient in enumerate(PATIENTS):
+            for j, (doctor, service) in enumerate([(DOCTORS[0], SERVICES[1]), (DOCTORS[2], SERVICES[2])]):
+                self._insert(patient, doctor, service, start + timedelta(days=j * 7, hours=i))
+
+    def _insert(self, patient: dict, doctor: dict, service: dict, start: datetime) -> dict:
+        end = start + timedelta(minutes=service["duration_minutes"])
+        event = {
+            "id": uuid.uuid4().hex,
+            "summary": f"{service['name']} - {patient['name']}",
+            "description": (f"Service: {service['name']}\nPatient: {patient['name']} ({patient['email']})\n"
+                            f"Doctor: {doctor['name']} ({doctor['email']})"),
+            "start_time": start.isoformat(),
+            "end_time": end.isoformat(),
+            "_start": start, "_end": end,
+            "_patient_email": patient["email"], "_doctor_email": doctor["email"],
+        }
+        self._events[event["id"]] = event
+        return event
+
+    @staticmethod
+    def _public(event: dict) -> dict:
+        return {k: v for k, v in event.items() if not k.startswith("_")}
+
+    def _conflict(self, email_key: str, email: str, start: datetime, end: datetime, exclude: str = None) -> bool:
+        return any(
+            e[email_key] == email and e["id"] != exclude and e["_start"] < end and start < e["_end"]
+            for e in self._events.values()
+        )
+
+    def get_patient_appointments(self, patient_email: str) -> List[Dict]:
+        _sleep(_profile.calendar)
+        now = datetime.now()
+        with self._lock:
+            events = sorted((e for e in self._events.values()
+                             if e["_patient_email"] == patient_email and e["_start"] >= now),
+                            key=lambda e: e["_start"])
+            return [self._public(e) for e in events]
+
+    def create_appointment(self, patient_email: str, patient_name: str, doctor_name: str, doctor_email: str,
+                           service_name: str, start_time: datetime, duration_minutes: int = 30) -> Optional[Dict]:
+        _sleep(_profile.calendar)
+        end_time = start_time + timedelta(minutes=duration_minutes)
+        with self._lock:
+            if self._conflict("_doctor_email", doctor_email, start_time, end_time):
+                return {"error": "conflict", "message": f"Dr. {doctor_name} already has an appointment at this time"}
+            if self._conflict("_patient_email", patient_email, start_time, end_time):
+                return {"error": "conflict", "message": "You already have another appointment at this time"}
+            event = self._insert({"name": patient_name, "email": patient_email},
+                                 {"name": doctor_name, "email": doctor_email},
+                                 {"name": service_name, "duration_minutes": duration_minutes}, start_time)
+        return {"id": event["id"], "summary": event["summary"], "start_time": event["start_time"],
+                "end_time": event["end_time"], "link": f"https://calendar.example/{event['id']}", "status": "success"}
+
+    def update_appointment(self, event_id: str, new_start_time: datetime = None, new_doctor_name: str = None,
+                           new_doctor_email: str = None, new_service_name: str = None,
+                           new_duration_minutes: int = None) -> Optional[Dict]:
+        _sleep(_profile.calendar)
+        with self._lock:
+            event = self._events.get(event_id)
+            if event is None:
+                return {"error": "api_error", "message": "Appointment not found"}
+            start = new_start_time or event["_start"]
+            end = start + (timedelta(minutes=new_duration_minutes) if new_duration_minutes
+                           else event["_end"] - event["_start"])
+            if new_start_time and self._conflict("_patient_email", event["_patient_email"], start, end, exclude=event_id):
+                return {"error": "conflict", "message": "You already have another appointment at this time"}
+            event.update(_start=start, _end=end, start_time=start.isoformat(), end_time=end.isoformat())
+            return {"id": event_id, "summary": event["summary"], "start_time": event["start_time"],
+                    "end_time": event["end_time"], "status": "success"}
+
+    def delete_appointment(self, event_id: str) -> Dict:
+        _sleep(_profile.calendar)
+        with self._lock:
+            if self._events.pop(event_id, None) is None:
+                return {"error": "api_error", "message": "Failed to cancel appointment: not found"}
+        return {"status": "success", "message": "Appointment cancelled successfully"}
+
+
+class FakeGmail(GmailService):
+    """Builds the real MIME messages but 'sends' them by sleeping"""
+
+    def __init__(self):
+        self.gmail_address = "clinic@example.com"
+        self.gmail_password = "offline"
+        self.smtp_server = "smtp.offline"
+        self.smtp_port = 587
+        self.sent = 0
+
+    def _send_email(self, msg):
+        _sleep(_profile.smtp)
+        self.sent += 1
+
+
+class FakeEmbeddings(HashingEmbeddings):
+    """Local hashing embeddings behind a simulated embedding-API round trip"""
+
+    def embed_query(self, text: str) -> List[float]:
+        _sleep(_profile.embedding)
+        return super().embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        _sleep(_profile.embedding)
+        return [HashingEmbeddings.embed_query(self, t) for t in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        seconds = _profile.embedding.sample()
+        if seconds:
+            await asyncio.sleep(seconds)
+        return super().embed_query(text)
+
+
+class FakeRetriever(KnowledgeBaseRetriever):
+    """Brute-force search over the real FAQ documents, chunked by init_chromadb.py"""
+
+    def __init__(self):
+        self.embeddings = FakeEmbeddings()
+        chunks = load_chunks(settings.rag_docs_dir)
+        self._ids = list(chunks)
+        self._chunks = [chunk.page_content for chunk in chunks.values()]
+        self._vectors = HashingEmbeddings().embed_documents(self._chunks)  # Indexing is not timed
+
+    def query_with_scores(self, question: str, k: int = 3) -> list[tuple[str, float]]:
+        vector = self.embeddings.embed_query(question)
+        _sleep(_profile.vector_search)
+        scored = sorted(((1 - _cosine(vector, v), c) for v, c in zip(self._vectors, self._chunks)))
+        return [(chunk, distance) for distance, chunk in scored[:k]]
+
+    def query(self, question: str, k: int = 2) -> list[str]:
+        return [chunk for chunk, _ in self.query_with_scores(question, k)]
+
+    def search_by_vector(self, vector: list[float], k: int = 2) -> list[tuple[str, str]]:
+        _sleep(_profile.vector_search)
+        scored = sorted((1 - _cosine(vector, v), i) for i, v in enumerate(self._vectors))
+        return [(self._ids[i], self._chunks[i]) for _, i in scored[:k]]
+
+    def refresh_index(self) -> str:
+        return "offline"
+
+
+# =============================================================================
+# FAKE LLM
+# =============================================================================
+
+_TIME = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b", re.IGNORECASE)
+_SMALLTALK = ("thank", "thanks", "that's all", "bye", "hello", "hi ")
+
+
+def _intent_of(text: str) -> str:
+    text = text.lower()
+    if any(w in text for w in ("human", "lawyer", "sue ", "bleeding")):
+        return "escalate"
+    if any(w in text for w in ("cancel", "reschedule", "my appointments", "upcoming")):
+        return "management"
+    if "book" in text or _TIME.search(text):
+        return "booking"
+    return "faq"
+
+
+def _mentioned(items: List[dict], text: str) -> Optional[dict]:
+    """First doctor/service whose distinctive name word appears in the text"""
+    text = text.lower()
+    for item in items:
+        words = [w for w in re.findall(r"[a-z]+", item["name"].lower()) if w not in ("dr", "bin", "al", "teeth", "tooth")]
+        if words and words[0] in text:
+            return item
+    return None
+
+
+# Provider-style prompt prefix cache: a system prompt seen before (byte for byte) is served from cache
+PREFIX_CACHE_MIN_TOKENS = 1024  # OpenAI-compatible providers only cache prefixes at least this long
+_seen_prefixes: set = set()
+
+
+def _cached_prefix_tokens(model: str, messages: List[BaseMessage]) -> int:
+    """Prompt tokens a caching provider would report as cached for this call"""
+    if not messages or messages[0].type != "system":
+        return 0
+    prefix = str(messages[0].content)
+    tokens = estimate_tokens(prefix)
+    if tokens < PREFIX_CACHE_MIN_TOKENS:
+        return 0
+    key = (model, hash(prefix))
+    if key in _seen_prefixes:
+        return tokens
+    _seen_prefixes.add(key)
+    return 0
+
+
+def _tool_call(name: str, **args) -> dict:
+    return {"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}", "type": "tool_call"}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Scripted stand-in for the OpenRouter chat models.
+
+    Recognises each call site by its system prompt (or bound tools) and
+    answers the way the real model would, after a simulated delay: time to
+    first token plus a per-token cost for the generated output.
+    """
+
+    model_name: str = "fake"
+    latency_key: str = "llm_agent"
+    tool_names: tuple = ()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        names = tuple(convert_to_openai_tool(t)["function"]["name"] for t in tools)
+        return self.model_copy(update={"tool_names": names})
+
+    # ---- responses ---------------------------------------------------------
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        system = messages[0].content if messages and messages[0].type == "system" else ""
+        human = [m for m in messages if m.type == "human"]
+        last_human = human[-1].content if human else ""
+
+        if "TurnClassification" in self.tool_names:
+            current = last_human.rsplit("Current user message:", 1)[-1].strip()
+            intent = _intent_of(current)
+            return AIMessage(content="", tool_calls=[_tool_call(
+                "TurnClassification", intent=intent, sentiment="neutral",
+                should_escalate=intent == "escalate", reason="scripted")])
+        if self.tool_names:
+            return self._agent_step(messages)
+        if "intent classification" in system:
+            return AIMessage(content=_intent_of(last_human.rsplit("Current user message:", 1)[-1]))
+        if "sentiment analysis" in system:
+            return AIMessage(content="Sentiment: neutral\nEscalate: false")
+        if "translation engine" in system:
+            if last_human.startswith("Arabic:"):
+                text = last_human[len("Arabic:"):].rsplit("\nEnglish:", 1)[0].strip()
+                return AIMessage(content=TRANSLATIONS.get(text, "Hello"))
+            text = last_human[len("English:"):].rsplit("\nArabic:", 1)[0].strip()
+            return AIMessage(content=f"(ترجمة) {text}")
+        if "running summary" in system:
+            return AIMessage(content="The patient discussed appointments and clinic information.")
+        if "Support Ticket Analyst" in system:
+            return AIMessage(content=json.dumps({
+                "subject": "Patient conversation", "ticket_types": ["general_inquiry"], "status": "resolved"}))
+        return AIMessage(content="How can I help you today?")
+
+    def _agent_step(self, messages: List[BaseMessage]) -> AIMessage:
+        """One round of a tool-calling agent: the next tool calls, or the answer"""
+        last = max(i for i, m in enumerate(messages) if m.type == "human")
+        block = messages[last].content
+        email = (re.search(r"- Email: (\S+)", block) or [None, ""])[1]
+        name = (re.search(r"- Name: (.+)", block) or [None, ""])[1].strip()
+        request = (re.search(r"Patient (?:Request|Question): (.+)", block) or [None, block])[1].strip()
+        called = [tc["name"] for m in messages[last + 1:] if isinstance(m, AIMessage) for tc in m.tool_calls]
+        results = [m.content for m in messages[last + 1:] if m.type == "tool"]
+        result = results[-1] if results else ""
+        smalltalk = any(w in f"{request.lower()} " for w in _SMALLTALK) and _intent_of(request) == "faq"
+        history = " ".join(m.content for m in messages if m.type == "human")
+
+        if smalltalk and not called:
+            return AIMessage(content="You're welcome! Is there anything else I can help you with today?")
+
+        if "query_knowledge_base" in self.tool_names:
+            if not called:
+                return AIMessage(content="", tool_calls=[_tool_call("query_knowledge_base", question=request)])
+            passage = result.split("\n\n", 1)[-1][:300]
+            return AIMessage(content=f"Here is what I found. {passage.strip()} Is there anything else I can help with?")
+
+        if "create_new_booking" in self.tool_names:
+            if not called:
+                slot = _TIME.search(request)
+                if not slot:
+                    return AIMessage(content="", tool_calls=[
+                        _tool_call("get_available_services"), _tool_call("get_available_doctors")])
+                doctor = _mentioned(DOCTORS, request) or DOCTORS[0]
+                service = _mentioned(SERVICES, history) or SERVICES[0]
+                hour = int(slot[1]) % 12 + (12 if slot[3].lower() == "pm" else 0)
+                # Spread bookings over the coming weeks so concurrent patients rarely collide
+                day = datetime.now() + timedelta(days=_rng.randint(1, 90))
+                when = day.replace(hour=hour, minute=int(slot[2] or 0)).strftime("%Y-%m-%d %H:%M")
+                return AIMessage(content="", tool_calls=[_tool_call(
+                    "create_new_booking", patient_email=email, patient_name=name,
+                    doctor_id=doctor["id"], service_id=service["id"], appointment_datetime=when)])
+            if called[-1] == "create_new_booking" and "successfully booked" in result:
+                details = dict(re.findall(r"- (\w+): (.+)", result))
+                return AIMessage(content="", tool_calls=[_tool_call(
+                    "send_booking_confirmation_email", patient_email=email, patient_name=name,
+                    service_name=details["service_name"], doctor_name=details["doctor_name"],
+                    appointment_datetime=details["appointment_datetime"],
+                    duration_minutes=int(details["duration_minutes"]), price=float(details["price"]))])
+            if "create_new_booking" in called:
+                if "successfully booked" in results[0]:
+                    return AIMessage(content="Your appointment is booked and a confirmation email is on its way. "
+                                             "Is there anything else I can help with?")
+                return AIMessage(content=f"{results[0].splitlines()[0]} Would another time work for you?")
+            services = ", ".join(s["name"] for s in SERVICES)
+            doctors = ", ".join(d["name"] for d in DOCTORS)
+            return AIMessage(content=f"We offer {services}. Our available doctors are {doctors}. "
+                                     "Which doctor and preferred time would you like?")
+
+        if "cancel_appointment" in self.tool_names:
+            if not called:
+                if "cancel" in request.lower():
+                    doctor = _mentioned(DOCTORS, request)
+                    return AIMessage(content="", tool_calls=[_tool_call(
+                        "cancel_appointment", patient_email=email,
+                        doctor_name=doctor["name"].split()[1] if doctor else None)])
+                return AIMessage(content="", tool_calls=[_tool_call("view_my_appointments", patient_email=email)])
+            if called[-1] == "cancel_appointment" and result.startswith("✅"):
+                details = dict(re.findall(r"- (\w+): (.+)", result))
+                when = datetime.strptime(details["Time"], "%A, %B %d, %Y at %I:%M %p")
+                return AIMessage(content="", tool_calls=[_tool_call(
+                    "send_cancellation_email", patient_email=email, patient_name=name,
+                    service_name=details["Service"], doctor_name=details["Doctor"],
+                    appointment_datetime=when.strftime("%Y-%m-%d %H:%M"))])
+            return AIMessage(content=" ".join(results[0].split()[:60]))
+
+        return AIMessage(content="How can I help you today?")
+
+    # ---- generation --------------------------------------------------------
+
+    def _usage(self, messages: List[BaseMessage], message: AIMessage) -> dict:
+        prompt = estimate_tokens("".join(str(m.content) for m in messages))
+        output = estimate_tokens(message.content + json.dumps([tc["args"] for tc in message.tool_calls]))
+        return {"input_tokens": prompt, "output_tokens": output, "total_tokens": prompt + output,
+                "input_token_details": {"cache_read": _cached_prefix_tokens(self.model_name, messages)}}
+
+    def _delays(self) -> tuple[float, float]:
+        """(time to first token, per-token delay) in seconds"""
+        return getattr(_profile, self.latency_key).sample(), _profile.llm_ms_per_token / 1000
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._respond(messages)
+        message.usage_metadata = self._usage(messages, message)
+        first, per_token = self._delays()
+        time.sleep(first + per_token * message.usage_metadata["output_tokens"])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._respond(messages)
+        message.usage_metadata = self._usage(messages, message)
+        first, per_token = self._delays()
+        await asyncio.sleep(first + per_token * message.usage_metadata["output_tokens"])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._respond(messages)
+        usage = self._usage(messages, message)
+        first, per_token = self._delays()
+        await asyncio.sleep(first)
+        for piece in re.findall(r"\S+\s*", message.content):
+            await asyncio.sleep(per_token * estimate_tokens(piece))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        for i, tc in enumerate(message.tool_calls):
+            await asyncio.sleep(per_token * estimate_tokens(json.dumps(tc["args"])))
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc["id"], "index": i}]))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
+
+
+class FakeChatModel(RequestPolicyMixin, ScriptedChatModel):
+    """Scripted model under the same request policy (budgets, deadlines, hedging) as the real clients"""
+
+    hedged: bool = False
+    budget: Optional[str] = None
+
+
+# =============================================================================
+# INSTALL
+# =============================================================================
+
+@dataclass
+class Backends:
+    """Handles to the installed stand-ins (for assertions and counters)"""
+    database: FakeDatabase
+    calendar: FakeCalendar
+    gmail: FakeGmail
+    retriever: FakeRetriever
+    llm_router: BaseChatModel  # FakeChatModel, or the real clients with llm_server
+    llm_agent: BaseChatModel
+    llm_faq: BaseChatModel
+    llm_translator: BaseChatModel
+    llm_router_small: BaseChatModel
+    llm_faq_small: BaseChatModel
+
+
+def install(profile: LatencyProfile = None, seed: int = 0, llm_server: str = None) -> Backends:
+    """
+    Replace every external backend with its offline stand-in.
+
+    Must be called before src.graph (or anything importing the LLM clients
+    by name) is imported.
+
+    Args:
+        profile: Latency of each backend (default: LatencyProfile())
+        seed: Seed for latency sampling and fake booking slots
+        llm_server: Base URL of an OpenAI-compatible server for the real LLM
+            clients (e.g. FakeLLMServer.url); the LLM profile is then the server's
+
+    Returns:
+        The installed Backends
+    """
+    global _profile
+    _profile = profile or LatencyProfile()
+    _rng.seed(seed)
+
+    import importlib
+    import src.llm as llm
+    import src.llm.client as client
+    import src.services.database as database
+    import src.services.calendar as calendar
+    import src.services.gmail as gmail
+    import src.rag.retriever as retriever
+
+    def chat(name: str, model: str, hedged: bool = False, latency_key: str = None) -> FakeChatModel:
+        return FakeChatModel(name=name, latency_key=latency_key or name, model_name=model, hedged=hedged,
+                             callbacks=[telemetry_callback])
+
+    llm_names = ("llm_router", "llm_agent", "llm_faq", "llm_translator", "llm_router_small", "llm_faq_small")
+    if llm_server:
+        # Rebuild the client singletons against the server
+        settings.openrouter_base_url = llm_server
+        importlib.reload(client)
+        importlib.reload(llm)
+        llms = {name: getattr(client, name) for name in llm_names}
+    else:
+        llms = {
+            "llm_router": chat("llm_router", settings.openrouter_model, hedged=True),
+            "llm_agent": chat("llm_agent", settings.openrouter_model),
+            "llm_faq": chat("llm_faq", settings.openrouter_model, hedged=True, latency_key="llm_agent"),
+            "llm_translator": chat("llm_translator", settings.translation_model, hedged=True),
+            "llm_router_small": chat("llm_router_small", settings.cascade_small_model, hedged=True,
+                                     latency_key="llm_small"),
+            "llm_faq_small": chat("llm_faq_small", settings.cascade_small_model, hedged=True,
+                                  latency_key="llm_small"),
+        }
+        for name, model in llms.items():
+            setattr(client, name, model)
+
+    backends = Backends(
+        database=FakeDatabase(),
+        calendar=FakeCalendar(),
+        gmail=FakeGmail(),
+        retriever=FakeRetriever(),
+        **llms,
+    )
+    database._db_instance = backends.database
+    calendar._calendar_instance = backends.calendar
+    gmail._gmail_instance = backends.gmail
+    retriever._retriever_instance = backends.retriever
+    return backends
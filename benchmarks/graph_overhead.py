@@ -0,0 +1,235 @@
+"""
+Benchmark: Graph Overhead per Turn
+Measures what the framework itself costs per turn - LangGraph state merging,
+add_messages, checkpointing, agent executor loops, prompt formatting,
+callbacks - by running create_workflow() turns against instant fake
+backends (benchmarks/fakes.py) at growing history lengths.
+
+Results are written as JSON so runs can be compared between releases:
+    python -m benchmarks.graph_overhead
+    python -m benchmarks.graph_overhead --output after.json --compare before.json
+
+--compare exits with status 1 if any median regressed by more than --tolerance.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from importlib import metadata
+from benchmarks.fakes import LatencyProfile, install
+
+
+HISTORY_LENGTHS = [1, 10, 50, 200]
+
+# One fixed message per specialist path (faq: 1 tool round, booking: 2 parallel tools, management: 1 tool)
+SCENARIOS = {
+    "faq": "What are your opening hours on Thursday?",
+    "booking": "I want to book a teeth cleaning appointment",
+    "management": "What are my upcoming appointments?",
+}
+
+# Filler history: alternating patient / assistant turns of realistic length
+_PAST_TURNS = [
+    ("Do you accept Tawuniya insurance?",
+     "Yes, we accept Tawuniya, Bupa and Medgulf. Please bring your insurance card so we can verify "
+     "your coverage before treatment. Is there anything else I can help with?"),
+    ("How much does teeth whitening cost?",
+     "Professional in-clinic teeth whitening costs 1,200 SAR and takes about an hour. We also offer "
+     "take-home kits. Would you like to book a whitening session?"),
+]
+
+
+def build_state(history_length: int, message: str) -> dict:
+    """A steady-state conversation with `history_length` messages, the last being `message`"""
+    from langchain_core.messages import AIMessage, HumanMessage
+    from src.config.settings import settings
+    from src.graph.workflow import initialize_state
+
+    state = initialize_state()
+    state.update(patient_id="p1", patient_name="Mohammed Ali Al-Qahtani",
+                 patient_email="patient1@example.com", patient_phone="+966500000001")
+    for i in range(history_length - 1):
+        human, ai = _PAST_TURNS[(i // 2) % len(_PAST_TURNS)]
+        state["messages"].append(HumanMessage(content=human) if i % 2 == 0 else AIMessage(content=ai))
+    state["messages"].append(HumanMessage(content=message))
+
+    # Older messages are already summarized, as they would be mid-conversation
+    older = max(history_length - 1 - settings.history_max_turns * 2, 0)
+    if older:
+        state["history_summary"] = "The patient asked about insurance coverage and whitening prices."
+        state["history_summarized_count"] = older
+    return state
+
+
+def summarize(samples_ms: list) -> dict:
+    ordered = sorted(samples_ms)
+    return {
+        "runs": len(ordered),
+        "min_ms": round(ordered[0], 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+    }
+
+
+async def time_turns(app, message: str, history_length: int, repeats: int, warmup: int) -> dict:
+    """Time full graph turns (fresh thread per run so checkpoints don't accumulate)"""
+    from src.graph.checkpoint import thread_config
+
+    samples = []
+    for i in range(warmup + repeats):
+        state = build_state(history_length, message)
+        config = thread_config(state["conversation_id"])
+        start = time.perf_counter()
+        await app.ainvoke(state, config=config)
+        elapsed = (time.perf_counter() - start) * 1000
+        if i >= warmup:
+            samples.append(elapsed)
+    return summarize(samples)
+
+
+def time_add_messages(history_length: int, repeats: int) -> dict:
+    """Time one add_messages merge of a reply into a history of `history_length`"""
+    from langchain_core.messages import AIMessage
+    from langgraph.graph.message import add_messages
+
+    history = build_state(history_length, SCENARIOS["faq"])["messages"]
+    history = add_messages([], history)  # Assign ids once, as the graph would have
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        add_messages(history, [AIMessage(content="Our clinic is open 9:00 AM - 8:00 PM.")])
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def time_executor_builds(repeats: int) -> dict:
+    """Time constructing each specialist AgentExecutor from its factory"""
+    from src.graph.executors import _factories
+
+    return {
+        name: summarize([_timed(factory) for _ in range(repeats)])
+        for name, factory in _factories.items()
+    }
+
+
+def _timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def environment() -> dict:
+    """Versions and settings the numbers depend on"""
+    from src.config.settings import settings
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    packages = {}
+    for name in ("langgraph", "langchain", "langchain-core", "langchain-openai"):
+        try:
+            packages[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            packages[name] = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": packages,
+        "settings": {
+            "classifier_mode": settings.classifier_mode,
+            "speculative_execution": settings.speculative_execution,
+            "intent_classifier_enabled": settings.intent_classifier_enabled,
+            "checkpoint_backend": settings.checkpoint_backend,
+            "history_max_turns": settings.history_max_turns,
+            "faq_cache_enabled": settings.faq_cache_enabled,
+        },
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Print median changes against a baseline run; return the regressions"""
+    regressions = []
+    print(f"\nCompared with {baseline['environment'].get('commit')} ({baseline['environment']['timestamp']}):")
+    for key, current in results["turns"].items():
+        before = baseline.get("turns", {}).get(key)
+        if not before:
+            continue
+        change = current["median_ms"] / before["median_ms"] - 1 if before["median_ms"] else 0.0
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"  {key:<18} {before['median_ms']:>9.2f} -> {current['median_ms']:>9.2f} ms ({change:+.0%}){flag}")
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Per-turn graph overhead with instant fake backends")
+    parser.add_argument("--histories", default=",".join(map(str, HISTORY_LENGTHS)),
+                        help="Comma-separated history lengths (messages, including the current one)")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--output", default="graph_overhead.json", help="JSON results file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed median slowdown vs baseline")
+    args = parser.parse_args()
+
+    install(LatencyProfile.instant())
+    from src.config.settings import settings
+    from src.graph.workflow import create_workflow
+    from src.utils.debug import debug
+
+    debug.disable()
+    settings.faq_cache_enabled = False  # Repeated identical turns would all be cache hits
+    histories = [int(n) for n in args.histories.split(",")]
+    results = {"environment": environment(), "turns": {}, "add_messages": {}, "executor_build": {}}
+
+    # Agents and tools print their own debug output; keep the report readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        app = create_workflow()
+        results["create_workflow_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        results["executor_build"] = time_executor_builds(args.repeats)
+        for scenario, message in SCENARIOS.items():
+            for length in histories:
+                gc.collect()
+                results["turns"][f"{scenario}@{length}"] = await time_turns(
+                    app, message, length, args.repeats, args.warmup)
+        for length in histories:
+            results["add_messages"][str(length)] = time_add_messages(length, args.repeats * 50)
+
+    print(f"create_workflow: {results['create_workflow_ms']:.1f} ms")
+    print(f"{'turn':<18} {'median ms':>10} {'p95 ms':>9} {'min ms':>9}")
+    for key, stats in results["turns"].items():
+        print(f"{key:<18} {stats['median_ms']:>10.2f} {stats['p95_ms']:>9.2f} {stats['min_ms']:>9.2f}")
+    print(f"\n{'add_messages':<18} {'median ms':>10}")
+    for length, stats in results["add_messages"].items():
+        print(f"{'history ' + length:<18} {stats['median_ms']:>10.4f}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Regression Check: Lexical Sentiment Guardrail
+Runs labelled messages through the lexical tier (src/classifiers/sentiment_lexicon.py)
+and checks each decision. Offline and instant: no LLM is called.
+
+The instant "escalate" path skips the LLM entirely, so a false positive
+there hands a harmless patient to a human. The cases below pin down the
+phrases that must escalate and the look-alikes ("food court", a patient
+asking for Sue, negated threats) that must go to the LLM instead.
+
+The instant "benign" path skips it too, so it is limited to plain FAQ and
+booking phrasing; threats and emergencies that no keyword catches must
+still reach the LLM.
+
+Run from the project root (exit status 1 on failure):
+    python -m benchmarks.guardrail_cases
+"""
+
+import os
+import sys
+
+
+# (message, original Arabic input or None, expected decision)
+CASES = [
+    # Unambiguous: escalate without the LLM
+    ("I'm filing a lawsuit against this clinic", None, "escalate"),
+    ("I will sue you for this", None, "escalate"),
+    ("I'm calling my lawyer right now", None, "escalate"),
+    ("I am going to call the police", None, "escalate"),
+    ("I want to kill myself", None, "escalate"),
+    ("my gums are bleeding heavily", None, "escalate"),
+    ("I will file a lawsuit against you", "سأرفع دعوى قضائية ضدكم", "escalate"),
+    ("I will kill the dentist", None, "escalate"),
+    ("I am going to burn this clinic down", None, "escalate"),
+    ("my face is swelling and I cannot breathe", None, "escalate"),
+    ("I want to die", "أريد أن أموت", "escalate"),
+    ("I want to rest", "أريد أن أموت", "escalate"),  # Mistranslated: the Arabic original still escalates
+    # Look-alikes: the LLM decides
+    ("Can I book a cleaning with Sue on Monday?", None, "ambiguous"),
+    ("Is the clinic near the food court?", None, "ambiguous"),
+    ("My neighbour is a cop, does he get a discount?", None, "ambiguous"),
+    ("I'm not going to sue, I just want a refund", None, "ambiguous"),
+    ("No lawsuit, I just want my appointment moved", None, "ambiguous"),
+    ("I would never take you to court, relax", None, "ambiguous"),
+    ("This toothache is killing me", None, "ambiguous"),
+    # Not on the benign allow-list: the LLM decides
+    ("My face is swelling a bit since yesterday", None, "ambiguous"),
+    ("You people will regret this", None, "ambiguous"),
+    # Clearly benign
+    ("What are your opening hours?", None, "benign"),
+    ("Thank you, that's perfect!", None, "benign"),
+    ("Hello", None, "benign"),
+    ("I want to book a cleaning tomorrow at 10", None, "benign"),
+    ("Dr. Hind on Monday at 10:30am please", None, "benign"),
+    ("I want to book an appointment", "أريد حجز موعد", "benign"),
+]
+
+
+def main():
+    os.environ.setdefault("OPENROUTER_API_KEY", "offline")  # Settings validate it on import
+    from src.classifiers.sentiment_lexicon import check_message
+
+    failures = 0
+    for message, original, expected in CASES:
+        verdict = check_message(message, original)
+        ok = verdict.decision == expected
+        failures += not ok
+        detail = f" ({verdict.reason}: {', '.join(verdict.matched)})" if verdict.matched else ""
+        print(f"{'OK  ' if ok else 'FAIL'} {expected:<9} {verdict.decision:<9} {message}{detail}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Benchmark: Offline Load Test
+Drives the SessionManager with simulated patients running scripted English
+and Arabic conversations against the offline stand-in backends
+(benchmarks/fakes.py), ramping up the number of concurrent patients.
+
+Reports per concurrency level:
+- Throughput (turns per second)
+- p50 / p95 / p99 turn latency as seen by the patient
+- p50 / p95 / p99 queueing delay (waiting for a turn slot)
+- Time to first streamed text (with --stream)
+
+With --llm-server the real LLM clients talk to the stand-in LLM server
+(benchmarks/fake_server.py) on a background thread instead of the in-process
+fake models, with optional fault injection.
+
+No network access or credentials needed. Run from the project root:
+    python -m benchmarks.load_test --levels 1,5,10,25,50
+    python -m benchmarks.load_test --scale 0.2 --latency calendar=400,1500 --json load.json
+    python -m benchmarks.load_test --llm-server --fault rate_limit=0.05 --fault server_error=0.02
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from benchmarks.fake_server import FakeLLMServer, FaultProfile
+from benchmarks.fakes import PATIENTS, Latency, LatencyProfile, install
+from benchmarks.scenarios import CONVERSATIONS
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile (0.0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+@dataclass
+class LevelStats:
+    """Raw measurements for one concurrency level"""
+    latencies_ms: list = field(default_factory=list)
+    first_text_ms: list = field(default_factory=list)
+    errors: int = 0
+
+
+async def simulate_patient(manager, user: int, args, think: Latency, stats: LevelStats):
+    """One simulated patient: several scripted conversations with think time between turns"""
+    patient = PATIENTS[user % len(PATIENTS)]
+    for n in range(args.conversations):
+        script = CONVERSATIONS[(user + n) % len(CONVERSATIONS)]
+        session = await manager.open_session(patient["id"])
+        for turn in script.turns:
+            await asyncio.sleep(think.sample())
+            start = time.perf_counter()
+            try:
+                if args.stream:
+                    first = None
+                    async for event in manager.stream_message(session.conversation_id, turn.message):
+                        if first is None and event["event"] == "delta":
+                            first = time.perf_counter()
+                    stats.first_text_ms.append(((first or time.perf_counter()) - start) * 1000)
+                else:
+                    await manager.handle_message(session.conversation_id, turn.message)
+            except Exception:
+                stats.errors += 1
+                continue
+            stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+        await manager.close_session(session.conversation_id)
+
+
+async def run_level(manager, concurrency: int, args, think: Latency) -> dict:
+    """Run `concurrency` simulated patients to completion and summarize the level"""
+    from src.utils.telemetry import add_sink, remove_sink
+
+    stats = LevelStats()
+    records = []
+    add_sink(records.append)
+    try:
+        start = time.perf_counter()
+        # Agents and tools print their own debug output; keep the table readable
+        with open(os.devnull, "w") as devnull, \
+                (contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)):
+            await asyncio.gather(*(simulate_patient(manager, u, args, think, stats) for u in range(concurrency)))
+            elapsed = time.perf_counter() - start
+            await manager.shutdown()  # Wait for the background ticket filing
+    finally:
+        remove_sink(records.append)
+
+    queue_ms = [r.queue_ms for r in records]
+    llm_calls = [r.totals()["llm_calls"] for r in records]
+    result = {
+        "concurrency": concurrency,
+        "turns": len(stats.latencies_ms),
+        "errors": stats.errors,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_tps": round(len(stats.latencies_ms) / elapsed, 2) if elapsed else 0.0,
+        "llm_calls_per_turn": round(sum(llm_calls) / len(llm_calls), 2) if llm_calls else 0.0,
+    }
+    for name, values in (("latency", stats.latencies_ms), ("queue", queue_ms), ("first_text", stats.first_text_ms)):
+        if values:
+            for pct in (50, 95, 99):
+                result[f"{name}_p{pct}_ms"] = round(percentile(values, pct), 1)
+    return result
+
+
+def print_row(result: dict, stream: bool):
+    line = (f"{result['concurrency']:>5} {result['turns']:>6} {result['errors']:>4} "
+            f"{result['throughput_tps']:>7.2f} "
+            f"{result['latency_p50_ms']:>8.0f} {result['latency_p95_ms']:>8.0f} {result['latency_p99_ms']:>8.0f} "
+            f"{result['queue_p50_ms']:>7.0f} {result['queue_p95_ms']:>7.0f} {result['queue_p99_ms']:>7.0f}")
+    if stream:
+        line += f" {result['first_text_p50_ms']:>8.0f} {result['first_text_p95_ms']:>8.0f}"
+    print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Offline load test with simulated patients")
+    parser.add_argument("--levels", default="1,5,10,25,50", help="Comma-separated concurrent patient counts")
+    parser.add_argument("--conversations", type=int, default=2, help="Conversations per patient per level")
+    parser.add_argument("--think", default="1000,3000", help="Think time between turns: median[,p95] ms")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every latency (and think time)")
+    parser.add_argument("--latency", action="append", default=[],
+                        help="Override one backend: component=median[,p95] (e.g. calendar=400,1500)")
+    parser.add_argument("--max-turns", type=int, default=None, help="Turn slots (default SERVER_MAX_CONCURRENT_TURNS)")
+    parser.add_argument("--stream", action="store_true", help="Use streamed turns and report time to first text")
+    parser.add_argument("--cascade", action="store_true", help="Enable the model cascade and report its tiers")
+    parser.add_argument("--llm-server", action="store_true",
+                        help="Send the real LLM clients' requests to the stand-in LLM server")
+    parser.add_argument("--fault", action="append", default=[],
+                        help="With --llm-server: kind=probability (rate_limit, server_error, timeout, disconnect)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Keep agent/tool console output")
+    args = parser.parse_args()
+
+    profile = LatencyProfile().override(args.latency).scaled(args.scale)
+    think = Latency.parse(args.think).scaled(args.scale)
+    server = None
+    if args.llm_server:
+        server = FakeLLMServer(profile, FaultProfile().override(args.fault), seed=args.seed).start()
+    install(profile, seed=args.seed, llm_server=server.url if server else None)
+
+    # Imported only after the stand-ins are installed
+    from src.api.sessions import SessionManager
+    from src.config.settings import settings
+    from src.graph.workflow import create_workflow
+    from src.llm.client import llm_translator
+    from src.services.translator import get_translator
+    from src.utils.debug import debug
+
+    debug.disable()
+    if args.cascade:
+        settings.cascade_enabled = True
+    manager = SessionManager(create_workflow(), get_translator(llm_translator), args.max_turns)
+    max_turns = args.max_turns or settings.server_max_concurrent_turns
+
+    print(f"Turn slots: {max_turns}  |  checkpointer: {settings.checkpoint_backend}  |  "
+          f"think: {think.median_ms:.0f}/{think.p95_ms:.0f} ms  |  latency scale: {args.scale}"
+          + (f"  |  LLM server: {server.url}" if server else ""))
+    header = (f"{'conc':>5} {'turns':>6} {'err':>4} {'turn/s':>7} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q p50':>7} {'q p95':>7} {'q p99':>7}")
+    if args.stream:
+        header += f" {'1st p50':>8} {'1st p95':>8}"
+    print(header)
+
+    results = []
+    for level in [int(n) for n in args.levels.split(",")]:
+        result = await run_level(manager, level, args, think)
+        results.append(result)
+        print_row(result, args.stream)
+
+    from src.llm.cascade import cascade_stats
+    cascade = cascade_stats.summary()
+    if cascade:
+        print(f"\n{'cascade':<10} {'small':>6} {'kept':>6} {'hit':>6} {'s p50':>7} {'s p95':>7} "
+              f"{'large':>6} {'l p50':>7} {'l p95':>7}")
+        for site, tiers in cascade.items():
+            print(f"{site:<10} {tiers['small_calls']:>6} {tiers['small_kept']:>6} {tiers['small_hit_rate']:>6.0%} "
+                  f"{tiers['small_p50_ms']:>7} {tiers['small_p95_ms']:>7} "
+                  f"{tiers['large_calls']:>6} {tiers['large_p50_ms']:>7} {tiers['large_p95_ms']:>7}")
+
+    llm_server = None
+    if server:
+        llm_server = server.stats.summary()
+        server.stop()
+        faults = ", ".join(f"{kind} {count}" for kind, count in llm_server["faults"].items())
+        print(f"\nLLM server: {llm_server['requests']} requests ({llm_server['streamed']} streamed), "
+              f"{llm_server['prompt_tokens']} prompt / {llm_server['completion_tokens']} completion tokens, "
+              f"faults: {faults}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "max_concurrent_turns": max_turns,
+                "checkpoint_backend": settings.checkpoint_backend,
+                "classifier_mode": settings.classifier_mode,
+                "cascade": cascade,
+                "llm_server": llm_server,
+                "stream": args.stream,
+                "think": asdict(think),
+                "profile": asdict(profile),
+                "levels": results,
+            }, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
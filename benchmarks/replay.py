@@ -0,0 +1,123 @@
+"""
+Benchmark: Conversation Replay
+Replays a conversation recorded with CASSETTE_MODE=record (src/utils/cassette.py)
+through the SessionManager, with every LLM, Supabase, Google Calendar and
+Gmail call answered from its cassette.
+
+Reports per turn the recorded and replayed latency and whether the reply
+matches the recorded one. Exit status 1 if a reply differs or a turn fails
+(e.g. a call with no recorded counterpart), so a cassette doubles as a
+regression test for a real conversation.
+
+No credentials needed: without JINA_API_KEY the knowledge base is the offline
+stand-in from benchmarks/fakes.py (FAQ tool results then differ from the
+recording and are matched by call order). Run from the project root:
+    python -m benchmarks.replay cassettes/<conversation_id>.json.gz
+    python -m benchmarks.replay cassettes/<conversation_id>.json.gz --speed 0 --stream
+
+Replay in the mode the conversation was recorded in (--stream for the
+streamed /chat/stream and WebSocket turns, or the CLI with STREAM_RESPONSES).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gzip
+import json
+import os
+import sys
+
+
+async def replay(data: dict, args) -> tuple[list, int]:
+    """
+    Run the recorded turns against the cassette.
+
+    Returns:
+        Tuple of (replayed turns, None for failed ones; calls matched by order)
+    """
+    from src.api.sessions import Session, SessionManager
+    from src.graph.workflow import create_workflow, initialize_state
+    from src.llm.client import llm_translator
+    from src.services.translator import get_translator
+    from src.utils.cassette import get_cassette
+
+    manager = SessionManager(create_workflow(), get_translator(llm_translator))
+    conversation_id = data["conversation_id"]
+    state = initialize_state(conversation_id)
+    for key, value in data["meta"].get("patient", {}).items():
+        state[f"patient_{key}"] = value
+    # The patient lookup happened before the recording started
+    manager.sessions[conversation_id] = Session(conversation_id=conversation_id, state=state)
+
+    cassette = get_cassette(conversation_id)
+    results = []
+    for turn in data["turns"]:
+        replayed = len(cassette.replayed_turns)
+        try:
+            if args.stream:
+                async for _ in manager.stream_message(conversation_id, turn["message"]):
+                    pass
+            else:
+                await manager.handle_message(conversation_id, turn["message"])
+        except Exception as e:
+            print(f"Turn failed: {type(e).__name__}: {e}", file=sys.stderr)
+        results.append(cassette.replayed_turns[replayed] if len(cassette.replayed_turns) > replayed else None)
+    await manager.close_session(conversation_id, wait=True)
+    return results, cassette.fallbacks
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded conversation from its cassette")
+    parser.add_argument("cassette", help="Cassette file (CASSETTE_DIR/<conversation_id>.json.gz)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Multiply recorded latencies (1 original timings, 0 instant)")
+    parser.add_argument("--stream", action="store_true", help="Replay as streamed turns")
+    parser.add_argument("--verbose", action="store_true", help="Keep agent/tool console output")
+    args = parser.parse_args()
+
+    with gzip.open(args.cassette, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+
+    # Settings are read on import
+    os.environ["CASSETTE_MODE"] = "replay"
+    os.environ["CASSETTE_DIR"] = os.path.dirname(os.path.abspath(args.cassette))
+    os.environ["CASSETTE_SPEED"] = str(args.speed)
+    os.environ.setdefault("OPENROUTER_API_KEY", "replay")  # Clients are constructed but never reach the network
+    os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+
+    from src.config.settings import settings
+    from src.utils.debug import debug
+
+    debug.disable()
+    if not settings.jina_api_key:
+        import src.rag.retriever as retriever
+        from benchmarks.fakes import FakeRetriever
+        retriever._retriever_instance = FakeRetriever()
+
+    with open(os.devnull, "w") as devnull, \
+            (contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)):
+        replayed, fallbacks = await replay(data, args)
+
+    print(f"Conversation {data['conversation_id']}  |  recorded {data['meta'].get('recorded_at', '?')}  |  "
+          f"{len(data['calls'])} calls  |  speed {args.speed}")
+    print(f"{'turn':>4} {'rec ms':>8} {'replay ms':>9}  {'reply':<8} message")
+    failures = 0
+    for i, (turn, result) in enumerate(zip(data["turns"], replayed), start=1):
+        if result is None:
+            status = "FAILED"
+        else:
+            status = "same" if result["response"] == turn["response"] else "DIFFERS"
+        failures += status != "same"
+        replay_ms = f"{result['latency_ms']:.0f}" if result and result["latency_ms"] is not None else "-"
+        recorded_ms = f"{turn['latency_ms']:.0f}" if turn["latency_ms"] is not None else "-"
+        print(f"{i:>4} {recorded_ms:>8} {replay_ms:>9}  {status:<8} {turn['message'][:60]}")
+        if status == "DIFFERS":
+            print(f"       recorded: {turn['response'][:200]}")
+            print(f"       replayed: {result['response'][:200]}")
+
+    print(f"\n{fallbacks} call(s) matched by order instead of request fingerprint")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+Scripted Patient Conversations
+Multi-turn English and Arabic conversations used by the offline benchmarks.
+
+Each Arabic turn carries the English text the fake translation model returns
+for it, so the graph sees the same input it would get from the real
+translator.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Turn:
+    message: str
+    english: Optional[str] = None  # Translation of an Arabic message
+
+
+@dataclass(frozen=True)
+class Conversation:
+    name: str
+    language: str  # "english" or "arabic"
+    turns: tuple
+
+
+CONVERSATIONS = [
+    Conversation("faq_en", "english", (
+        Turn("What are your opening hours on Thursday?"),
+        Turn("Do you accept Tawuniya insurance?"),
+        Turn("How much does teeth whitening cost?"),
+        Turn("Thank you!"),
+    )),
+    Conversation("booking_en", "english", (
+        Turn("I want to book a teeth cleaning appointment"),
+        Turn("Dr. Hind tomorrow at 10am please"),
+        Turn("Thanks, that's all"),
+    )),
+    Conversation("management_en", "english", (
+        Turn("What are my upcoming appointments?"),
+        Turn("Please cancel my appointment with Dr. Hind"),
+        Turn("Thank you"),
+    )),
+    Conversation("faq_ar", "arabic", (
+        Turn("ما هي ساعات العمل يوم الخميس؟", "What are your working hours on Thursday?"),
+        Turn("هل تقبلون تأمين التعاونية؟", "Do you accept Tawuniya insurance?"),
+        Turn("شكرا جزيلا", "Thank you very much"),
+    )),
+    Conversation("booking_ar", "arabic", (
+        Turn("أريد حجز موعد لتنظيف الأسنان", "I want to book a teeth cleaning appointment"),
+        Turn("مع دكتورة هند غدا الساعة 10 صباحا", "With Dr. Hind tomorrow at 10am"),
+        Turn("شكرا", "Thanks"),
+    )),
+]
+
+# Arabic -> English lookup for the fake translation model
+TRANSLATIONS = {
+    turn.message: turn.english
+    for conversation in CONVERSATIONS
+    for turn in conversation.turns
+    if turn.english
+}
@@ -0,0 +1,117 @@
+"""
+Regression Check: Per-Turn State Updates
+Verifies that graph nodes return deltas, so the work the state reducers do
+per turn stays constant as the conversation grows.
+
+For every workflow variant (parallel, combined, speculative) one turn is run
+per history length against the instant stand-in backends (benchmarks/fakes.py).
+The history is already in the checkpointed thread, and the turn's input is
+built with turn_input() as the CLI and the server build it. The check records:
+- messages merged by the `add_messages` reducer, from the caller's input
+  write and from node writes
+- state keys written by nodes (stream_mode="updates")
+
+All must be identical at every history length. A caller that re-sends the
+history, or a node that returns the whole state, makes them grow with the
+history and fails the check.
+
+Run from the project root (exit status 1 on failure):
+    python -m benchmarks.state_updates
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+from benchmarks.fakes import LatencyProfile, install
+from benchmarks.graph_overhead import HISTORY_LENGTHS, SCENARIOS, build_state
+
+
+VARIANTS = {
+    "parallel": {"classifier_mode": "parallel", "speculative_execution": False},
+    "combined": {"classifier_mode": "combined", "speculative_execution": False},
+    "speculative": {"classifier_mode": "parallel", "speculative_execution": True},
+}
+
+
+async def measure_turn(app, message: str, history_length: int) -> dict:
+    """Run one turn on a thread that already holds the history and count the reducer work"""
+    from src.graph.checkpoint import thread_config
+    from src.graph.workflow import turn_input
+
+    state = build_state(history_length, message)
+    config = thread_config(state["conversation_id"])
+    # Earlier turns, as the checkpointer holds them mid-conversation (written as the last node)
+    await app.aupdate_state(config, {**state, "messages": state["messages"][:-1]}, as_node="human_handoff")
+
+    channel = app.channels["messages"]
+    reducer = channel.operator
+    merged = []
+
+    def counting_reducer(left, right):
+        merged.append(len(right) if isinstance(right, list) else 1)
+        return reducer(left, right)
+
+    channel.operator = counting_reducer
+    try:
+        writes = {}
+        async for update in app.astream(turn_input(app, state), config=config, stream_mode="updates"):
+            for node, values in update.items():
+                writes[node] = sorted((values or {}).keys())
+    finally:
+        channel.operator = reducer
+
+    return {
+        "input_messages": merged[0],  # The caller's input write
+        "node_messages": sum(merged[1:]),
+        "node_keys": sum(len(keys) for keys in writes.values()),
+        "writes": writes,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Check that per-turn state updates stay constant")
+    parser.add_argument("--histories", default=",".join(map(str, HISTORY_LENGTHS)))
+    args = parser.parse_args()
+    histories = [int(n) for n in args.histories.split(",")]
+
+    install(LatencyProfile.instant())
+    from src.config.settings import settings
+    from src.graph.workflow import create_workflow
+    from src.utils.debug import debug
+
+    debug.disable()
+    settings.faq_cache_enabled = False  # Every turn must run its agent
+    settings.checkpoint_backend = "memory"  # Turns continue a checkpointed thread, as in the CLI and server
+    failures = []
+    for variant, overrides in VARIANTS.items():
+        for key, value in overrides.items():
+            setattr(settings, key, value)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            app = create_workflow()
+
+        for scenario, message in SCENARIOS.items():
+            results = {}
+            for length in histories:
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    results[length] = await measure_turn(app, message, length)
+
+            counts = {(r["input_messages"], r["node_messages"], r["node_keys"]) for r in results.values()}
+            ok = len(counts) == 1
+            row = "  ".join(f"{n}: {r['input_messages']}+{r['node_messages']} msg / {r['node_keys']} keys"
+                            for n, r in results.items())
+            print(f"{'OK  ' if ok else 'FAIL'} {variant:<12} {scenario:<11} {row}")
+            if not ok:
+                failures.append((variant, scenario, results))
+
+    for variant, scenario, results in failures:
+        print(f"\n{variant}/{scenario} node writes by history length:")
+        for length, result in results.items():
+            print(f"  {length}: {result['writes']}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
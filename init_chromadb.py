@@ -1,9 +1,33 @@
 """
 Initialize ChromaDB with Jina Embeddings
 This script loads documents from rag-doc/ and creates vector embeddings
+
+Indexing is incremental: every chunk is stored under an ID derived from its
+document and content, so a run only embeds chunks that are new or changed and
+deletes the IDs that no longer exist. Embeddings are requested in concurrent
+batches capped by chunk count and size (INDEX_BATCH_SIZE, INDEX_BATCH_MAX_CHARS,
+INDEX_CONCURRENCY). A manifest next to the collection records the embedding
+model, chunking and the indexed documents; the collection is rebuilt from
+scratch when the model or chunking changes, or with --rebuild.
+
+A rebuild is built into a staging collection next to the live one, which
+keeps serving the agents, and swapped in only once every chunk is stored. A
+rebuild that fails part way leaves the staging collection behind, and the
+next run resumes it instead of starting over.
+
+Usage:
+    python init_chromadb.py                  # Index RAG_DOCS_DIR (default rag-doc/)
+    python init_chromadb.py --docs my-docs/  # Another directory
+    python init_chromadb.py --dry-run        # Show what would change
+    python init_chromadb.py --rebuild        # Re-embed everything
 """
 
+import argparse
+import asyncio
+import hashlib
+import json
 import os
+from datetime import datetime
 import chromadb
 from langchain_community.embeddings import JinaEmbeddings
 from langchain_chroma import Chroma
@@ -14,63 +38,255 @@ from src.config.settings import settings
 # Disable ChromaDB telemetry
 os.environ["ANONYMIZED_TELEMETRY"] = "False"
 
+# Chunking (changing it rebuilds the collection)
+CHUNK_SIZE = 500  # Characters per chunk
+CHUNK_OVERLAP = 50  # Overlap to maintain context
+
+# Documents picked up from the docs directory (searched recursively)
+DOCUMENT_EXTENSIONS = (".txt", ".md")
+
+MANIFEST_FILE = "index_manifest.json"
+
+# Rebuilds go into "<collection><STAGING_SUFFIX>" until they are complete
+STAGING_SUFFIX = "__rebuild"
+
+
+def load_chunks(docs_dir: str) -> dict:
+    """
+    Load and split every document under a directory.
+
+    Args:
+        docs_dir: Directory with .txt / .md documents
+
+    Returns:
+        Dict of chunk ID -> Document (metadata: source path), in document order
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=["\n\n", "\n", " ", ""]
+    )
+    chunks = {}
+    for root, dirs, files in os.walk(docs_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(DOCUMENT_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            source = os.path.normpath(path)
+            relative = os.path.relpath(path, docs_dir).replace(os.sep, "/")
+            seen = {}
+            for chunk in splitter.split_documents(TextLoader(path, encoding="utf-8").load()):
+                chunk.metadata = {"source": source}
+                digest = hashlib.sha256(f"{relative}\0{chunk.page_content}".encode("utf-8")).hexdigest()[:32]
+                # The same text twice in one document gets two entries
+                seen[digest] = seen.get(digest, 0) + 1
+                chunk_id = digest if seen[digest] == 1 else f"{digest}-{seen[digest]}"
+                chunks[chunk_id] = chunk
+    return chunks
+
+
+def make_batches(chunk_ids: list, chunks: dict) -> list:
+    """Split chunk IDs into batches of at most INDEX_BATCH_SIZE chunks and INDEX_BATCH_MAX_CHARS characters"""
+    batches, batch, size = [], [], 0
+    for chunk_id in chunk_ids:
+        length = len(chunks[chunk_id].page_content)
+        if batch and (len(batch) >= settings.index_batch_size or size + length > settings.index_batch_max_chars):
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(chunk_id)
+        size += length
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+async def embed_and_store(collection, embeddings, chunks: dict, chunk_ids: list) -> tuple[int, int]:
+    """
+    Embed chunks in concurrent batches and add each batch to the collection as it completes.
+
+    A failed batch does not stop the others; its chunks are picked up by the next run.
+
+    Returns:
+        Tuple of (chunks stored, batches failed)
+    """
+    semaphore = asyncio.Semaphore(settings.index_concurrency)
+    batches = make_batches(chunk_ids, chunks)
+    stored, failed = 0, 0
+
+    async def run(number: int, batch: list):
+        nonlocal stored, failed
+        async with semaphore:
+            texts = [chunks[chunk_id].page_content for chunk_id in batch]
+            try:
+                vectors = await embeddings.aembed_documents(texts)
+            except Exception as e:
+                failed += 1
+                print(f"❌ Batch {number}/{len(batches)} failed ({len(batch)} chunks): {e}")
+                return
+            collection.upsert(
+                ids=batch,
+                embeddings=vectors,
+                documents=texts,
+                metadatas=[chunks[chunk_id].metadata for chunk_id in batch],
+            )
+            stored += len(batch)
+            print(f"   • Batch {number}/{len(batches)}: {len(batch)} chunks")
+
+    await asyncio.gather(*(run(i, batch) for i, batch in enumerate(batches, start=1)))
+    return stored, failed
+
+
+def read_manifest(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
 
-def initialize_chroma():
-    """Initialize ChromaDB with documents from rag-doc/"""
+def initialize_chroma(docs_dir: str = None, rebuild: bool = False, dry_run: bool = False):
+    """
+    Index the documents in docs_dir into ChromaDB, embedding only new or changed chunks.
+
+    Args:
+        docs_dir: Document directory (default RAG_DOCS_DIR)
+        rebuild: Re-embed everything into a new collection, swapped in once complete
+        dry_run: Only report what would be embedded and deleted
+
+    Returns:
+        True if the collection matches the documents
+    """
+    docs_dir = docs_dir or settings.rag_docs_dir
 
     print("=" * 60)
     print("🔄 Initializing ChromaDB with Jina Embeddings")
     print("=" * 60)
 
-    # 1. Load documents
-    print("\n📂 Loading documents from rag-doc/...")
-    loader = TextLoader("rag-doc/mock-data.txt", encoding="utf-8")
-    documents = loader.load()
-    print(f"✅ Loaded {len(documents)} document(s)")
-
-    # 2. Split into chunks
-    print("\n✂️  Splitting documents into chunks...")
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,  # Characters per chunk
-        chunk_overlap=50,  # Overlap to maintain context
-        separators=["\n\n", "\n", " ", ""]
-    )
-    chunks = text_splitter.split_documents(documents)
-    print(f"✅ Created {len(chunks)} chunks")
+    # 1. Load and split documents
+    print(f"\n📂 Loading documents from {docs_dir}...")
+    chunks = load_chunks(docs_dir)
+    sources = sorted({chunk.metadata["source"] for chunk in chunks.values()})
+    if not chunks:
+        print(f"❌ Error: no {'/'.join(DOCUMENT_EXTENSIONS)} documents found in {docs_dir}")
+        return False
+    print(f"✅ Loaded {len(sources)} document(s), {len(chunks)} chunks")
 
-    # 3. Initialize Jina embeddings
-    print("\n🧬 Initializing Jina embeddings...")
-    if not settings.jina_api_key:
+    # 2. Compare with the existing collection
+    print("\n🔍 Comparing with the existing collection...")
+    client = chromadb.PersistentClient(path=settings.chroma_db_path)
+    manifest_path = os.path.join(settings.chroma_db_path, MANIFEST_FILE)
+    manifest = read_manifest(manifest_path)
+    layout = {
+        "embedding_model": settings.jina_embedding_model,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+    }
+    forced = rebuild
+    if not rebuild and any(manifest.get(key) != value for key, value in layout.items()):
+        # No manifest, or vectors from another model / chunking that cannot be mixed with new ones
+        print("ℹ️  No manifest for the current model and chunking: rebuilding")
+        rebuild = True
+
+    # A rebuild compares against the staging collection left by an unfinished one, if any
+    layout_tag = json.dumps(layout, sort_keys=True)
+    live_name = settings.chroma_collection_name
+    target_name = live_name + STAGING_SUFFIX if rebuild else live_name
+    existing = set()
+    try:
+        target = client.get_collection(target_name)
+        if not rebuild or (not forced and (target.metadata or {}).get("layout") == layout_tag):
+            existing = set(target.get(include=[])["ids"])
+            if rebuild:
+                print(f"ℹ️  Resuming the unfinished rebuild in '{target_name}'")
+    except Exception:
+        pass  # No collection yet
+    new_ids = [chunk_id for chunk_id in chunks if chunk_id not in existing]
+    stale_ids = sorted(existing - chunks.keys())
+    print(f"✅ {len(chunks) - len(new_ids)} unchanged, {len(new_ids)} to embed, {len(stale_ids)} stale")
+
+    if dry_run:
+        print("\nℹ️  Dry run: nothing changed")
+        return True
+
+    if new_ids and not settings.jina_api_key:
         print("❌ Error: JINA_API_KEY not found in .env file")
         return False
 
+    # 3. Initialize Jina embeddings
     embeddings = JinaEmbeddings(
         jina_api_key=settings.jina_api_key,
         model_name=settings.jina_embedding_model
     )
-    print(f"✅ Using model: {settings.jina_embedding_model}")
 
-    # 4. Delete old collection if it exists
-    print("\n🗑️  Removing old ChromaDB collection...")
-    client = chromadb.PersistentClient(path=settings.chroma_db_path)
-    try:
-        client.delete_collection(name=settings.chroma_collection_name)
-        print("✅ Deleted old collection")
-    except Exception:
-        print("ℹ️  No existing collection found (this is fine)")
+    if rebuild and not existing:
+        print(f"\n🏗️  Building a new collection in '{target_name}' (the live one keeps serving)...")
+        try:
+            client.delete_collection(name=target_name)  # Staging from another layout or --rebuild
+        except Exception:
+            pass
+        collection = client.create_collection(name=target_name, metadata={"layout": layout_tag})
+    else:
+        collection = client.get_or_create_collection(name=target_name)
 
-    # 5. Create new vector store
-    print("\n💾 Creating new ChromaDB collection...")
-    vectorstore = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        collection_name=settings.chroma_collection_name,
-        persist_directory=settings.chroma_db_path,
-    )
-    print(f"✅ Created collection: {settings.chroma_collection_name}")
+    # 4. Embed new and changed chunks
+    failed = 0
+    if new_ids:
+        print(f"\n🧬 Embedding {len(new_ids)} chunks with {settings.jina_embedding_model}...")
+        stored, failed = asyncio.run(embed_and_store(collection, embeddings, chunks, new_ids))
+        print(f"✅ Stored {stored} chunks")
 
-    # 6. Test retrieval
+    # 5. Delete chunks of removed or edited text
+    if stale_ids:
+        print(f"\n🗑️  Deleting {len(stale_ids)} stale chunks...")
+        collection.delete(ids=stale_ids)
+        print("✅ Deleted stale chunks")
+
+    # 6. Mark the new index version (a rebuild is swapped in only once it is complete)
+    changed = bool(new_ids or stale_ids) or rebuild
+    if changed and not (rebuild and failed):
+        # Running agents compare this to drop answers cached from the old index
+        metadata = {key: value for key, value in (collection.metadata or {}).items()
+                    if not key.startswith("hnsw:") and key != "layout"}
+        metadata["indexed_at"] = datetime.now().isoformat()
+        if rebuild:
+            print(f"\n🔁 Swapping '{target_name}' in as '{live_name}'...")
+            try:
+                client.delete_collection(name=live_name)
+            except Exception:
+                pass  # First index
+            collection.modify(name=live_name, metadata=metadata)
+        else:
+            collection.modify(metadata=metadata)
+
+    # 7. Record the manifest (only once the collection matches the documents)
+    if failed:
+        if rebuild:
+            print(f"\n❌ {failed} batch(es) failed - the live collection is unchanged; "
+                  f"run again to resume the rebuild")
+        else:
+            print(f"\n❌ {failed} batch(es) failed - run again to index the remaining chunks")
+        return False
+    if changed or manifest.get("documents") is None:
+        documents = {}
+        for chunk_id, chunk in chunks.items():
+            documents.setdefault(chunk.metadata["source"], []).append(chunk_id)
+        manifest = {
+            **layout,
+            "collection": live_name,
+            "indexed_at": (collection.metadata or {}).get("indexed_at"),
+            "documents": {source: {"chunks": ids} for source, ids in documents.items()},
+        }
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+    # 8. Test retrieval
     print("\n🧪 Testing retrieval...")
+    vectorstore = Chroma(
+        client=client,
+        collection_name=settings.chroma_collection_name,
+        embedding_function=embeddings,
+    )
     test_query = "What are the business hours?"
     results = vectorstore.similarity_search(test_query, k=2)
     print(f"✅ Retrieved {len(results)} results for test query")
@@ -84,7 +300,8 @@ def initialize_chroma():
     print("=" * 60)
     print(f"📊 Summary:")
     print(f"   • Collection: {settings.chroma_collection_name}")
-    print(f"   • Chunks: {len(chunks)}")
+    print(f"   • Documents: {len(sources)}")
+    print(f"   • Chunks: {len(chunks)} ({len(new_ids)} embedded, {len(stale_ids)} deleted)")
     print(f"   • Embedding Model: {settings.jina_embedding_model}")
     print(f"   • Path: {settings.chroma_db_path}")
     print("\n🚀 You can now run: python main.py")
@@ -93,11 +310,16 @@ def initialize_chroma():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index the knowledge base documents into ChromaDB")
+    parser.add_argument("--docs", help=f"Document directory (default {settings.rag_docs_dir})")
+    parser.add_argument("--rebuild", action="store_true", help="Re-embed everything into a new collection, swapped in once complete")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would be embedded and deleted")
+    args = parser.parse_args()
     try:
-        initialize_chroma()
+        initialize_chroma(args.docs, rebuild=args.rebuild, dry_run=args.dry_run)
     except Exception as e:
         print(f"\n❌ Error: {str(e)}")
         print("\n💡 Troubleshooting:")
         print("   1. Check that JINA_API_KEY is set in .env")
-        print("   2. Verify rag-doc/mock-data.txt exists")
+        print(f"   2. Verify {args.docs or settings.rag_docs_dir} contains .txt or .md documents")
         print("   3. Ensure you have internet connection for Jina API")
@@ -3,14 +3,31 @@ Dental AI Agent - CLI Interface
 Interactive command-line interface for testing the agent
 """
 
+import asyncio
 import sys
 import time
+import uuid
+from typing import Optional
 from colorama import Fore
 from langchain_core.messages import HumanMessage
-from src.graph.workflow import create_workflow, initialize_state
+from src.graph.workflow import (
+    create_workflow, discard_failed_inputs, fail_turn, initialize_state, load_conversation, turn_input,
+)
+from src.graph.checkpoint import thread_config
+from src.graph.streaming import astream_turn
+from src.utils.telemetry import start_turn, finish_turn, current_turn
+from src.utils.cassette import activate_cassette
+from src.graph.nodes.intent import get_router_classifier
+from src.classifiers.sentiment_lexicon import guardrail_stats
+from src.rag.answer_cache import get_answer_cache
+from src.rag.retriever import embedding_cache_stats
 from src.config.settings import settings
 from src.services.database import get_database
 from src.llm.client import llm_translator
+from src.llm.budget import budget_stats
+from src.llm.cascade import cascade_stats
+from src.llm.policy import policy_stats
+from src.llm.transport import close_connections, connection_stats, warmup_connections
 from src.services.translator import get_translator
 from src.utils.debug import debug
 
@@ -27,7 +44,8 @@ def print_banner():
     print("=" * 60)
     print("\nType your message and press Enter to chat.")
     print("Type 'quit', 'exit', or 'q' to end the conversation.")
-    print("Type 'reset' to start a new conversation.\n")
+    print("Type 'reset' to start a new conversation.")
+    print("Run 'python main.py --resume <conversation_id>' to continue a saved one.\n")
 
 
 def select_patient():
@@ -83,15 +101,95 @@ def print_message(role: str, content: str):
         print(f"\n⚙️  System: {content}")
 
 
+async def stream_reply(app, translator, state):
+    """
+    Run one turn and print the assistant reply as it streams in.
+
+    Arabic sessions print one translated sentence at a time.
+
+    Returns:
+        Tuple of (final AgentState after the turn, reply as printed)
+    """
+    final = {}
+    parts = []
+
+    async def english_tokens():
+        async for event in astream_turn(app, turn_input(app, state), thread_config(state["conversation_id"])):
+            if event["type"] == "token":
+                yield event["text"]
+            else:
+                final["state"] = event["state"]
+
+    stream = english_tokens()
+    if state.get("original_language") == "arabic":
+        stream = translator.translate_stream_to_arabic(stream)
+
+    print("\n🤖 Assistant: ", end="", flush=True)
+    async for text in stream:
+        print(text, end="", flush=True)
+        parts.append(text)
+    print()
+    return final["state"], "".join(parts).strip()
+
+
+_cli_loop = None
+
+
+def cli_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop shared by every turn of the CLI session.
+
+    Pooled LLM connections belong to the loop that opened them, so reusing
+    one loop keeps them warm between turns.
+    """
+    global _cli_loop
+    if _cli_loop is None or _cli_loop.is_closed():
+        _cli_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_cli_loop)
+    return _cli_loop
+
+
+def end_conversation(app, state, failed_inputs: list):
+    """
+    File the support ticket of a finished CLI conversation on the CLI loop.
+
+    Failed inputs are removed from the checkpointed thread first; once the
+    ticket is filed the thread is deleted. The loop's LLM connections are
+    closed afterwards.
+    """
+    from src.services.ticket_manager import ticket_manager
+    loop = cli_event_loop()
+    try:
+        loop.run_until_complete(discard_failed_inputs(app, state["conversation_id"], failed_inputs))
+        loop.run_until_complete(ticket_manager.process_conversation(state))
+        # Filed: the checkpointed thread is no longer needed for --resume
+        if app.checkpointer is not None:
+            loop.run_until_complete(app.checkpointer.adelete_thread(state["conversation_id"]))
+    finally:
+        loop.run_until_complete(close_connections())
+
+
+def get_resume_id() -> Optional[str]:
+    """Read the conversation ID passed as `--resume <conversation_id>`"""
+    if "--resume" in sys.argv:
+        index = sys.argv.index("--resume")
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return None
+
+
 def main():
     """Main CLI loop"""
 
     try:
-        # Select patient
-        selected_patient = select_patient()
-        if not selected_patient:
-            print("❌ Cannot proceed without patient selection")
-            sys.exit(1)
+        # Resuming a saved conversation skips patient selection (patient is in the checkpoint)
+        resume_id = get_resume_id()
+        selected_patient = None
+        if not resume_id:
+            selected_patient = select_patient()
+            if not selected_patient:
+                print("❌ Cannot proceed without patient selection")
+                sys.exit(1)
 
         # Print banner
         print_banner()
@@ -103,6 +201,9 @@ def main():
         # Initialize translator for TRT architecture
         translator = get_translator(llm_translator)
 
+        # Open LLM connections now so the first turn skips TCP/TLS setup
+        cli_event_loop().run_until_complete(warmup_connections())
+
         # Set debug mode based on settings
         if settings.debug_mode:
             debug.enable()
@@ -111,18 +212,34 @@ def main():
             debug.disable()
             print(" ✅ Ready!\n")
 
-        # Initialize state with patient data
-        state = initialize_state()
-        state["patient_id"] = selected_patient["id"]
-        state["patient_name"] = selected_patient["name"]
-        state["patient_email"] = selected_patient["email"]
-        state["patient_phone"] = selected_patient["phone"]
+        if resume_id:
+            # Load the last checkpoint of the conversation
+            state = cli_event_loop().run_until_complete(load_conversation(app, resume_id))
+            if not state:
+                print(f"❌ No saved conversation found for {resume_id}")
+                sys.exit(1)
+            print_message("system", f"Resumed conversation for {state.get('patient_name')} ({len(state['messages'])} messages)")
+        else:
+            # Initialize state with patient data
+            state = initialize_state()
+            state["patient_id"] = selected_patient["id"]
+            state["patient_name"] = selected_patient["name"]
+            state["patient_email"] = selected_patient["email"]
+            state["patient_phone"] = selected_patient["phone"]
+
+        # Record/replay this conversation's external calls (CASSETTE_MODE)
+        cassette = activate_cassette(state["conversation_id"])
+        failed_inputs = []  # Inputs of failed turns, removed from the checkpointed thread before the next turn
 
         while True:
             # Get user input
             try:
                 user_input = input("💬 You: ").strip()
             except EOFError:
+                # The thread is kept for --resume, without the inputs of failed turns
+                loop = cli_event_loop()
+                loop.run_until_complete(discard_failed_inputs(app, state["conversation_id"], failed_inputs))
+                loop.run_until_complete(close_connections())
                 print("\n\nGoodbye! 👋")
                 break
 
@@ -130,36 +247,54 @@ def main():
             if user_input.lower() in ["quit", "exit", "q"]:
                 print("\n🏁 Thank you for using our AI assistant!")
                 print(f"📊 Conversation ID: {state['conversation_id']}")
+
+                # Local intent pre-classifier hit rate / LLM agreement
+                classifier = get_router_classifier()
+                if classifier:
+                    debug.print_stats("INTENT PRE-CLASSIFIER", classifier.stats.summary())
+                debug.print_stats("SENTIMENT GUARDRAIL", guardrail_stats.summary())
+                answer_cache = get_answer_cache()
+                if answer_cache:
+                    debug.print_stats("FAQ ANSWER CACHE", answer_cache.stats.summary())
+                debug.print_stats("QUERY EMBEDDING CACHE", embedding_cache_stats.summary())
+                debug.print_stats("LLM CONNECTIONS", connection_stats.summary())
+                debug.print_stats("LLM REQUEST POLICY", policy_stats.summary())
+                for site, tiers in cascade_stats.summary().items():
+                    debug.print_stats(f"MODEL CASCADE ({site})", tiers)
+                debug.print_stats("TOKEN BUDGETS", {
+                    site: f"max prompt {s['max_prompt_tokens']}/{s['input_budget']}, "
+                          f"{s['overruns']} overrun(s), {s['trimmed_tokens']} tok trimmed, "
+                          f"{s['exhausted']} cut off empty"
+                    for site, s in budget_stats.summary().items()
+                })
                 
                 # Trigger Ticket Manager
-                from src.services.ticket_manager import ticket_manager
-                import asyncio
-                
                 try:
-                    # Always try to get the running loop first
-                    try:
-                        loop = asyncio.get_running_loop()
-                        loop.create_task(ticket_manager.process_conversation(state))
-                    except RuntimeError:
-                        # No running loop, create a new one
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        loop.run_until_complete(ticket_manager.process_conversation(state))
-                        loop.close()
+                    end_conversation(app, state, failed_inputs)
                 except Exception as e:
                     print(f"❌ Error saving ticket: {e}")
+                if cassette:
+                    cassette.save()
                 
                 print("\nGoodbye! 👋\n")
                 break
 
             if user_input.lower() == "reset":
+                cli_event_loop().run_until_complete(discard_failed_inputs(app, state["conversation_id"], failed_inputs))
                 state = initialize_state()
+                cassette = activate_cassette(state["conversation_id"])
                 print_message("system", "Conversation reset. Starting fresh!")
                 continue
 
             if not user_input:
                 continue
 
+            cli_event_loop().run_until_complete(discard_failed_inputs(app, state["conversation_id"], failed_inputs))
+            input_id = str(uuid.uuid4())  # Stable ID, so a failed input can be removed from the thread
+
+            # Per-turn telemetry: nodes, LLM, tool and service calls record spans into this turn
+            start_turn(state["conversation_id"])
+
             # TRT Pre-processing: Detect language and translate if Arabic
             detected_language = translator.detect_language(user_input)
             state["original_language"] = detected_language
@@ -174,14 +309,10 @@ def main():
                 # Translate Arabic to English before adding to state
                 try:
                     import asyncio
-                    try:
-                        loop = asyncio.get_running_loop()
-                    except RuntimeError:
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
+                    loop = cli_event_loop()
 
                     translated_input = loop.run_until_complete(translator.translate_to_english(user_input))
-                    state["messages"].append(HumanMessage(content=translated_input))
+                    state["messages"].append(HumanMessage(content=translated_input, id=input_id))
 
                     # Show what the agent will see
                     debug.print_input(translated_input, "AGENT WILL SEE (English)", color=Fore.LIGHTGREEN_EX)
@@ -193,16 +324,28 @@ def main():
             else:
                 # English input - add directly to state
                 state["original_input"] = None
-                state["messages"].append(HumanMessage(content=user_input))
+                state["messages"].append(HumanMessage(content=user_input, id=input_id))
 
                 # Show what the agent will see
                 debug.print_input(user_input, "AGENT WILL SEE (English)", color=Fore.LIGHTGREEN_EX)
 
             # Run the agent
             try:
-                print("\n⏳ Processing...", end="", flush=True)
                 import asyncio
 
+                if settings.stream_responses and not settings.debug_mode:
+                    # Stream the reply as it is generated (debug output would interleave with it)
+                    loop = cli_event_loop()
+                    state, reply = loop.run_until_complete(stream_reply(app, translator, state))
+                    if cassette:
+                        cassette.add_turn(state, user_input, reply)
+                    finish_turn()
+                    if state.get("current_intent"):
+                        print(f"\n[Intent: {state['current_intent']}]", end="")
+                    continue
+
+                print("\n⏳ Processing...", end="", flush=True)
+
                 # Time the agent execution
                 agent_start_time = time.time()
 
@@ -211,13 +354,14 @@ def main():
                     loop = asyncio.get_running_loop()
                     # If we are in a loop (unlikely in sync main), create a task
                     # But main() is sync, so this branch shouldn't hit unless nested
-                    result = loop.run_until_complete(app.ainvoke(state))
+                    result = loop.run_until_complete(app.ainvoke(turn_input(app, state),
+                                                                 config=thread_config(state["conversation_id"])))
                 except RuntimeError:
                     # Standard case for sync main()
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    result = loop.run_until_complete(app.ainvoke(state))
-                    # Keep loop open for next iteration
+                    loop = cli_event_loop()
+                    result = loop.run_until_complete(app.ainvoke(turn_input(app, state),
+                                                                 config=thread_config(state["conversation_id"])))
+                    # Same loop every turn, so pooled LLM connections stay open
 
                 agent_elapsed = time.time() - agent_start_time
 
@@ -234,13 +378,14 @@ def main():
                     last_message = state["messages"][-1]
                     if hasattr(last_message, "content"):
                         response_content = last_message.content
+                        reply = response_content
 
                         # Show agent output and timing
                         if state.get("current_intent"):
                             debug.print_agent_flow(state["current_intent"], state.get("next_agent", "unknown"))
 
                         debug.print_output(response_content, "AGENT PRODUCED (English)", color=Fore.LIGHTBLUE_EX)
-                        debug.print_metrics(agent_elapsed, tokens=None)
+                        debug.print_metrics(agent_elapsed, tokens=current_turn().token_metrics())
 
                         # If original input was Arabic, translate response to Arabic
                         if state.get("original_language") == "arabic":
@@ -251,6 +396,7 @@ def main():
                                 )
                                 debug.print_separator("=", length=80, color=Fore.GREEN)
                                 print_message("assistant", translated_response)
+                                reply = translated_response
                             except Exception as e:
                                 print_message("system", f"Translation error: {str(e)}")
                                 debug.print_error(str(e))
@@ -260,38 +406,42 @@ def main():
                             debug.print_separator("=", length=80, color=Fore.GREEN)
                             print_message("assistant", response_content)
 
+                if cassette and state["messages"]:
+                    cassette.add_turn(state, user_input, reply)
+
+                # Per-node / per-call breakdown of this turn (incl. translation)
+                record = finish_turn()
+                debug.print_stats("TURN TELEMETRY", record.summary())
+
                 # Debug info (optional - can be removed in production)
                 if state.get("current_intent"):
                     print(f"\n[Intent: {state['current_intent']}]", end="")
 
-            except KeyboardInterrupt:
+            except KeyboardInterrupt as e:
                 print("\n\n⚠️  Interrupted. Type 'quit' to exit or continue chatting.\n")
+                if state["messages"] and state["messages"][-1].id == input_id:
+                    fail_turn(app, state, e, failed_inputs)
+                finish_turn()
                 continue
 
             except Exception as e:
                 print_message("system", f"Error: {str(e)}")
                 print("\n💡 Please try again or contact support if the issue persists.")
 
-                # Log error to state
-                state["error_count"] = state.get("error_count", 0) + 1
-                state["last_error"] = str(e)
+                # Log error to state, dropping the unanswered input so a retry does not see it twice
+                if state["messages"] and state["messages"][-1].id == input_id:
+                    fail_turn(app, state, e, failed_inputs)
+                else:
+                    state["error_count"] = state.get("error_count", 0) + 1
+                    state["last_error"] = str(e)
+                finish_turn()
 
     except KeyboardInterrupt:
         print("\n\n⚠️  Interrupted. Saving conversation...")
         
         # Trigger Ticket Manager on Ctrl+C
         try:
-            from src.services.ticket_manager import ticket_manager
-            import asyncio
-            
-            try:
-                loop = asyncio.get_running_loop()
-                loop.create_task(ticket_manager.process_conversation(state))
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(ticket_manager.process_conversation(state))
-                loop.close()
+            end_conversation(app, state, failed_inputs)
         except Exception as e:
             print(f"❌ Failed to save ticket on exit: {e}")
 
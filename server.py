@@ -0,0 +1,12 @@
+"""
+Dental AI Agent - Server Entry Point
+Serves many patient sessions concurrently over HTTP and WebSocket
+(see src/api/app.py for the endpoints)
+"""
+
+import uvicorn
+from src.config.settings import settings
+
+
+if __name__ == "__main__":
+    uvicorn.run("src.api.app:app", host=settings.server_host, port=settings.server_port)
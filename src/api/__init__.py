@@ -0,0 +1 @@
+"""HTTP / WebSocket serving frontend"""
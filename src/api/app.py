@@ -0,0 +1,207 @@
+"""
+HTTP / WebSocket Server
+Multi-session serving frontend for the dental AI agent.
+
+Endpoints:
+- POST   /chat                     {patient_id, message, conversation_id?} -> reply
+                                   (new conversations get a server-side ID; an ID of
+                                   another patient's conversation is a 404)
+- POST   /chat/stream              same body, reply streamed as server-sent events
+- DELETE /sessions/{conversation_id}  close the session and file its ticket
+- WS     /ws?patient_id=...&conversation_id=...  one session per connection;
+         the session closes (and its ticket is filed) on disconnect.
+         Replies stream as "delta" frames followed by a "done" frame unless
+         the frame sets "stream": false
+"""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from src.api.sessions import ConversationNotFound, SessionManager, SessionNotFound, PatientNotFound
+from src.config.settings import settings
+from src.graph.workflow import create_workflow
+from src.llm.client import llm_translator
+from src.llm.budget import budget_stats
+from src.llm.cascade import cascade_stats
+from src.llm.policy import policy_stats
+from src.llm.transport import close_connections, connection_stats, warmup_connections
+from src.rag.retriever import embedding_cache_stats
+from src.services.translator import get_translator
+from src.utils.cassette import flush_cassettes
+from src.utils.debug import debug
+from src.utils.telemetry import flush_telemetry_log
+
+
+class ChatRequest(BaseModel):
+    patient_id: str
+    message: str
+    conversation_id: Optional[str] = None
+
+
+class WebSocketMessage(BaseModel):
+    message: str
+    stream: bool = True
+
+
+class ChatResponse(BaseModel):
+    conversation_id: str
+    response: str
+    language: Optional[str] = None
+    intent: Optional[str] = None
+
+
+# Global session manager (created on startup)
+_manager: Optional[SessionManager] = None
+
+
+def get_session_manager() -> SessionManager:
+    """Get the session manager created by the app lifespan"""
+    if _manager is None:
+        raise RuntimeError("Server not started")
+    return _manager
+
+
+async def _reap_idle_sessions(manager: SessionManager):
+    """Periodically close sessions the client abandoned without closing"""
+    while True:
+        await asyncio.sleep(60)
+        closed = await manager.close_idle_sessions()
+        if closed:
+            print(f"Closed {closed} idle session(s)")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _manager
+    if not settings.debug_mode:
+        debug.disable()
+
+    _manager = SessionManager(create_workflow(), get_translator(llm_translator))
+    await warmup_connections()  # First requests skip TCP/TLS setup
+    reaper = asyncio.create_task(_reap_idle_sessions(_manager))
+    try:
+        yield
+    finally:
+        reaper.cancel()
+        await _manager.shutdown()
+        await flush_cassettes()
+        await asyncio.to_thread(flush_telemetry_log)
+        await close_connections()
+        _manager = None
+
+
+app = FastAPI(title="Riyadh Dental Care AI Assistant", lifespan=lifespan)
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest):
+    """Send one patient message; opens (or resumes) the session on first use"""
+    manager = get_session_manager()
+    try:
+        session = await manager.open_session(request.patient_id, request.conversation_id)
+        return await manager.handle_message(session.conversation_id, request.message)
+    except PatientNotFound:
+        raise HTTPException(status_code=404, detail=f"Unknown patient_id: {request.patient_id}")
+    except ConversationNotFound:
+        raise HTTPException(status_code=404, detail=f"Unknown conversation_id: {request.conversation_id}")
+    except SessionNotFound:
+        raise HTTPException(status_code=409, detail="Session was closed")
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Like /chat, but the reply arrives as server-sent events (delta..., done)"""
+    manager = get_session_manager()
+    try:
+        session = await manager.open_session(request.patient_id, request.conversation_id)
+    except PatientNotFound:
+        raise HTTPException(status_code=404, detail=f"Unknown patient_id: {request.patient_id}")
+    except ConversationNotFound:
+        raise HTTPException(status_code=404, detail=f"Unknown conversation_id: {request.conversation_id}")
+
+    async def events():
+        try:
+            async for event in manager.stream_message(session.conversation_id, request.message):
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except SessionNotFound:
+            yield f"data: {json.dumps({'event': 'error', 'error': 'Session was closed'})}\n\n"
+        except Exception as e:
+            # The turn failed, possibly after partial output - tell the client instead of just stopping
+            print(f"Streamed turn failed for {session.conversation_id}: {e}")
+            yield f"data: {json.dumps({'event': 'error', 'error': 'The reply failed, please try again'})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.delete("/sessions/{conversation_id}")
+async def close_session(conversation_id: str):
+    """Close a session; the support ticket is filed in the background"""
+    if not await get_session_manager().close_session(conversation_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"conversation_id": conversation_id, "closed": True}
+
+
+@app.get("/health")
+async def health():
+    manager = get_session_manager()
+    return {
+        "status": "ok",
+        "sessions": len(manager.sessions),
+        "llm_connections": connection_stats.summary(),
+        "llm_policy": policy_stats.summary(),
+        "llm_cascade": cascade_stats.summary(),
+        "token_budgets": budget_stats.summary(),
+        "embedding_cache": embedding_cache_stats.summary(),
+    }
+
+
+@app.websocket("/ws")
+async def websocket_chat(websocket: WebSocket, patient_id: str, conversation_id: Optional[str] = None):
+    """
+    One conversation per connection. Accepts plain text or
+    {"message": "...", "stream": bool} frames and answers each turn in order.
+    """
+    manager = get_session_manager()
+    await websocket.accept()
+    try:
+        session = await manager.open_session(patient_id, conversation_id)
+    except PatientNotFound:
+        await websocket.close(code=4404, reason="Unknown patient_id")
+        return
+    except ConversationNotFound:
+        await websocket.close(code=4404, reason="Unknown conversation_id")
+        return
+
+    await websocket.send_json({"conversation_id": session.conversation_id, "event": "session_open"})
+    try:
+        while True:
+            frame = await websocket.receive_text()
+            request = WebSocketMessage(message=frame)
+            if frame.lstrip().startswith("{"):
+                try:
+                    request = WebSocketMessage.model_validate_json(frame)
+                except ValueError:
+                    await websocket.send_json({"error": "Invalid message frame"})
+                    continue
+            if not request.message.strip():
+                continue
+            try:
+                if request.stream:
+                    async for event in manager.stream_message(session.conversation_id, request.message):
+                        await websocket.send_json(event)
+                else:
+                    await websocket.send_json(await manager.handle_message(session.conversation_id, request.message))
+            except SessionNotFound:
+                break
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                await websocket.send_json({"conversation_id": session.conversation_id, "error": str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await manager.close_session(session.conversation_id)
@@ -0,0 +1,334 @@
+"""
+Session Manager
+Runs many patient conversations concurrently on one event loop.
+
+Each session keeps its AgentState in memory (and in the checkpointer, so
+another worker can pick it up). Turns of the same session run strictly in
+arrival order; turns across sessions run concurrently up to a global limit.
+"""
+
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
+from langchain_core.messages import HumanMessage
+from src.config.settings import settings
+from src.graph.state import AgentState
+from src.graph.workflow import discard_failed_inputs, fail_turn, initialize_state, load_conversation, turn_input
+from src.graph.checkpoint import thread_config
+from src.graph.streaming import astream_turn
+from src.services.database import get_database
+from src.services.translator import TranslationService
+from src.utils.cassette import use_cassette
+from src.utils.concurrency import run_blocking
+from src.utils.telemetry import TurnRecord, turn_telemetry
+
+
+class SessionNotFound(Exception):
+    """Raised when a message targets an unknown or closed session"""
+
+
+class PatientNotFound(Exception):
+    """Raised when a session is opened for an unknown patient_id"""
+
+
+class ConversationNotFound(Exception):
+    """Raised when a conversation_id is unknown or belongs to another patient"""
+
+
+@dataclass
+class Session:
+    """In-memory handle for one conversation"""
+    conversation_id: str
+    state: AgentState
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)  # FIFO: preserves per-session turn order
+    last_active: float = field(default_factory=time.monotonic)
+    closed: bool = False
+    failed_inputs: list[str] = field(default_factory=list)  # Message IDs still to remove from the thread
+
+
+class SessionManager:
+    """
+    Owns the live sessions and applies the TRT steps around each graph run.
+    """
+
+    def __init__(self, app, translator: TranslationService, max_concurrent_turns: int = None):
+        """
+        Args:
+            app: Compiled LangGraph workflow (from create_workflow)
+            translator: Translation service for the TRT steps
+            max_concurrent_turns: Graph runs allowed in flight across all sessions
+        """
+        self.app = app
+        self.translator = translator
+        self.sessions: dict[str, Session] = {}
+        self.turn_slots = asyncio.Semaphore(max_concurrent_turns or settings.server_max_concurrent_turns)
+        self._open_lock = asyncio.Lock()
+        self._ticket_tasks: set[asyncio.Task] = set()
+
+    async def open_session(self, patient_id: str, conversation_id: Optional[str] = None) -> Session:
+        """
+        Return the live session for a conversation, resuming or creating it.
+
+        New conversations always get a server-generated ID; a conversation_id
+        is only accepted for a live or checkpointed conversation of the same
+        patient.
+
+        Args:
+            patient_id: Patient the conversation belongs to
+            conversation_id: Existing conversation to continue (optional)
+
+        Returns:
+            The Session
+
+        Raises:
+            PatientNotFound: If a new session is requested for an unknown patient
+            ConversationNotFound: If conversation_id does not exist or belongs to another patient
+        """
+        async with self._open_lock:
+            if conversation_id:
+                session = self.sessions.get(conversation_id)
+                state = session.state if session else await load_conversation(self.app, conversation_id)
+                # Same error either way, so IDs of other patients' conversations cannot be probed
+                if state is None or state.get("patient_id") != patient_id:
+                    raise ConversationNotFound(conversation_id)
+                if session:
+                    return session
+            else:
+                patient = await run_blocking(get_database().get_patient_by_id, patient_id)
+                if not patient:
+                    raise PatientNotFound(patient_id)
+                state = initialize_state()
+                state["patient_id"] = patient["id"]
+                state["patient_name"] = patient["name"]
+                state["patient_email"] = patient["email"]
+                state["patient_phone"] = patient["phone"]
+
+            session = Session(conversation_id=state["conversation_id"], state=state)
+            self.sessions[session.conversation_id] = session
+            return session
+
+    async def handle_message(self, conversation_id: str, message: str) -> dict:
+        """
+        Run one patient turn: translate in, run the graph, translate out.
+
+        Args:
+            conversation_id: Target session
+            message: Patient message (Arabic or English)
+
+        Returns:
+            Dict with conversation_id, response, language and intent
+
+        Raises:
+            SessionNotFound: If the session does not exist or was closed
+        """
+        session = self.sessions.get(conversation_id)
+        if session is None:
+            raise SessionNotFound(conversation_id)
+
+        async with session.lock:
+            if session.closed:
+                raise SessionNotFound(conversation_id)
+            with turn_telemetry(conversation_id) as record, use_cassette(conversation_id) as cassette:
+                async with self._turn_slot(record):
+                    response = await self._run_turn(session, message)
+                if cassette:
+                    cassette.add_turn(session.state, message, response)
+            session.last_active = time.monotonic()
+
+        return {
+            "conversation_id": conversation_id,
+            "response": response,
+            "language": session.state.get("original_language"),
+            "intent": session.state.get("current_intent"),
+        }
+
+    async def stream_message(self, conversation_id: str, message: str) -> AsyncIterator[dict]:
+        """
+        Run one patient turn and stream the reply as it is generated.
+
+        English replies stream token by token as the agent answers; Arabic replies stream one
+        translated sentence at a time. Ordering and the concurrency limit are
+        the same as for handle_message.
+
+        Yields:
+            {"event": "delta", "text": ...} pieces, then
+            {"event": "done", conversation_id, response, language, intent}
+
+        Raises:
+            SessionNotFound: If the session does not exist or was closed
+        """
+        session = self.sessions.get(conversation_id)
+        if session is None:
+            raise SessionNotFound(conversation_id)
+
+        async with session.lock:
+            if session.closed:
+                raise SessionNotFound(conversation_id)
+            with turn_telemetry(conversation_id) as record, use_cassette(conversation_id) as cassette:
+                async with self._turn_slot(record):
+                    language = await self._prepare_turn(session, message)
+                    final = {}
+
+                    async def english_tokens():
+                        async for event in astream_turn(self.app, turn_input(self.app, session.state),
+                                                      thread_config(conversation_id)):
+                            if event["type"] == "token":
+                                yield event["text"]
+                            else:
+                                final["state"] = event["state"]
+
+                    stream = english_tokens()
+                    if language == "arabic":
+                        stream = self.translator.translate_stream_to_arabic(stream)
+
+                    parts = []
+                    try:
+                        async for text in stream:
+                            parts.append(text)
+                            yield {"event": "delta", "text": text}
+                    except BaseException as e:  # Includes the client going away mid-stream
+                        self._fail_turn(session, e)
+                        raise
+                    session.state = final["state"]
+                if cassette:
+                    cassette.add_turn(session.state, message, "".join(parts).strip())
+            session.last_active = time.monotonic()
+
+        yield {
+            "event": "done",
+            "conversation_id": conversation_id,
+            "response": "".join(parts).strip(),
+            "language": language,
+            "intent": session.state.get("current_intent"),
+        }
+
+    @asynccontextmanager
+    async def _turn_slot(self, record: TurnRecord):
+        """Hold one of the global turn slots, recording the wait as queueing delay"""
+        waiting_since = time.perf_counter()
+        async with self.turn_slots:
+            record.queue_ms = (time.perf_counter() - waiting_since) * 1000
+            yield
+
+    async def _prepare_turn(self, session: Session, message: str) -> str:
+        """TRT pre-processing: detect language, translate to English, append the input"""
+        await self._discard_failed_inputs(session)
+        state = session.state
+        language = self.translator.detect_language(message)
+        state["original_language"] = language
+
+        if language == "arabic":
+            state["original_input"] = message
+            message = await self.translator.translate_to_english(message)
+        else:
+            state["original_input"] = None
+
+        # Stable ID, so a failed input can be removed from the checkpointed thread
+        state["messages"].append(HumanMessage(content=message, id=str(uuid.uuid4())))
+        return language
+
+    def _fail_turn(self, session: Session, error: BaseException):
+        """Drop the unanswered input so a retry does not see it twice"""
+        fail_turn(self.app, session.state, error, session.failed_inputs)
+
+    async def _discard_failed_inputs(self, session: Session):
+        """Remove inputs of failed turns from the checkpointed thread"""
+        await discard_failed_inputs(self.app, session.conversation_id, session.failed_inputs)
+
+    async def _run_turn(self, session: Session, message: str) -> str:
+        """TRT pre-processing, graph run and post-processing for one turn"""
+        language = await self._prepare_turn(session, message)
+        try:
+            state = await self.app.ainvoke(turn_input(self.app, session.state),
+                                           config=thread_config(session.conversation_id))
+        except Exception as e:
+            self._fail_turn(session, e)
+            raise
+        session.state = state
+
+        response = state["messages"][-1].content
+        if language == "arabic":
+            try:
+                response = await self.translator.translate_to_arabic(response)
+            except Exception as e:
+                print(f"Translation error, replying in English: {e}")
+        return response
+
+    async def close_session(self, conversation_id: str, wait: bool = False, keep_thread: bool = False) -> bool:
+        """
+        Close a session and file its support ticket.
+
+        The in-flight turn (if any) finishes first. Ticket processing runs in
+        the background unless `wait` is set; once the ticket is filed the
+        conversation's checkpointed thread is deleted unless `keep_thread`
+        is set.
+
+        Args:
+            conversation_id: Session to close
+            wait: Await ticket processing before returning
+            keep_thread: Keep the checkpointed thread so the conversation can be resumed
+
+        Returns:
+            False if the session was not open
+        """
+        session = self.sessions.get(conversation_id)
+        if session is None:
+            return False
+
+        async with session.lock:
+            if session.closed:
+                return False
+            session.closed = True
+            self.sessions.pop(conversation_id, None)
+            await self._discard_failed_inputs(session)  # The thread may be kept for a resume
+
+        task = asyncio.create_task(self._file_ticket(session.state, delete_thread=not keep_thread))
+        self._ticket_tasks.add(task)
+        task.add_done_callback(self._ticket_tasks.discard)
+        if wait:
+            await task
+        return True
+
+    async def _file_ticket(self, state: AgentState, delete_thread: bool = True):
+        """Run the ticket manager for a finished conversation, then delete its thread"""
+        from src.services.ticket_manager import ticket_manager
+        conversation_id = state.get("conversation_id")
+        try:
+            with use_cassette(conversation_id, close=True):
+                await ticket_manager.process_conversation(state)
+        except Exception as e:
+            print(f"❌ Error saving ticket for {conversation_id}: {e}")
+            return  # Keep the thread: it is the only copy of the conversation
+
+        if delete_thread and self.app.checkpointer is not None:
+            try:
+                await self.app.checkpointer.adelete_thread(conversation_id)
+            except Exception as e:
+                print(f"Could not delete checkpoints of {conversation_id}: {e}")
+
+    async def close_idle_sessions(self, idle_seconds: float = None) -> int:
+        """
+        Close sessions with no activity for `idle_seconds`.
+
+        Returns:
+            Number of sessions closed
+        """
+        idle_seconds = idle_seconds or settings.server_session_idle_seconds
+        now = time.monotonic()
+        idle = [
+            cid for cid, s in self.sessions.items()
+            if not s.lock.locked() and now - s.last_active > idle_seconds
+        ]
+        for cid in idle:
+            await self.close_session(cid)
+        return len(idle)
+
+    async def shutdown(self):
+        """Close every open session and wait for pending tickets (threads are kept for a resume)"""
+        for cid in list(self.sessions):
+            await self.close_session(cid, keep_thread=True)
+        if self._ticket_tasks:
+            await asyncio.gather(*self._ticket_tasks, return_exceptions=True)
@@ -0,0 +1,4 @@
+"""Local classifiers module"""
+from .intent_embedding import get_intent_classifier, IntentPreClassifier, HashingEmbeddings
+
+__all__ = ["get_intent_classifier", "IntentPreClassifier", "HashingEmbeddings"]
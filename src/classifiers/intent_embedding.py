@@ -0,0 +1,300 @@
+"""
+Embedding-based Intent Pre-Classifier
+Compares the message embedding against per-intent example centroids and
+answers locally when confident; otherwise the caller falls back to the LLM.
+"""
+
+import hashlib
+import math
+import random
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+from src.config.settings import settings
+
+
+VALID_INTENTS = ["faq", "booking", "management", "escalate"]
+
+# Support ticket types -> intent labels used to seed centroids from history
+TICKET_TYPE_TO_INTENT = {
+    "appointment_booking": "booking",
+    "appointment_modification": "management",
+    "appointment_cancellation": "management",
+    "general_inquiry": "faq",
+}
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Local embedding model using hashed word and character n-grams.
+
+    No network calls and no model download - good enough to separate short
+    customer-service intents, and fast enough to run inline on the event loop.
+    """
+
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"[\w']+", text.lower())
+        features = [f"w:{word}" for word in words]
+        features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            for n in (3, 4):
+                features += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+        return features
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for feature in self._features(text):
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            sign = 1.0 if digest[4] & 1 else -1.0
+            # Whole words carry more signal than character fragments
+            weight = 2.0 if feature.startswith(("w:", "b:")) else 1.0
+            vector[index] += sign * weight
+        return _normalize(vector)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else vector
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+def parse_prompt_examples(router_prompt: str) -> Dict[str, List[str]]:
+    """
+    Extract per-intent examples from the router system prompt.
+
+    Each numbered section (e.g. '1. **faq** - ...') contributes its bullet
+    lines. Quoted phrases become individual examples; unquoted bullets are
+    used as-is.
+
+    Args:
+        router_prompt: ROUTER_SYSTEM_PROMPT text
+
+    Returns:
+        Dict mapping intent -> list of example phrases
+    """
+    examples: Dict[str, List[str]] = {intent: [] for intent in VALID_INTENTS}
+    current = None
+
+    for line in router_prompt.splitlines():
+        header = re.match(r"\s*\d+\.\s+\*\*(\w+)\*\*", line)
+        if header:
+            current = header.group(1) if header.group(1) in examples else None
+            continue
+
+        bullet = re.match(r"\s*-\s+(.*)", line)
+        if current is None or not bullet:
+            continue
+
+        text = bullet.group(1).strip()
+        quoted = re.findall(r'"([^"]+)"', text)
+        examples[current].extend(quoted if quoted else [text])
+
+    return examples
+
+
+@dataclass
+class IntentPrediction:
+    """Result of a local classification attempt"""
+    label: str
+    confidence: float  # Margin between best and runner-up centroid similarity
+    confident: bool
+
+
+class ClassifierStats:
+    """Hit rate and LLM agreement counters for the pre-classifier"""
+
+    def __init__(self):
+        self.total = 0
+        self.hits = 0
+        self.fallbacks = 0
+        self.comparisons = 0
+        self.agreements = 0
+
+    def record_hit(self):
+        self.total += 1
+        self.hits += 1
+
+    def record_fallback(self, local_label: str, llm_label: str):
+        self.total += 1
+        self.fallbacks += 1
+        self.record_comparison(local_label, llm_label)
+
+    def record_comparison(self, local_label: str, llm_label: str):
+        self.comparisons += 1
+        if local_label == llm_label:
+            self.agreements += 1
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.total if self.total else 0.0
+
+    @property
+    def agreement_rate(self) -> float:
+        return self.agreements / self.comparisons if self.comparisons else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "total": self.total,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "hit_rate": round(self.hit_rate, 3),
+            "llm_comparisons": self.comparisons,
+            "llm_agreement": round(self.agreement_rate, 3),
+        }
+
+
+class IntentPreClassifier:
+    """Nearest-centroid intent classifier over message embeddings"""
+
+    def __init__(self, embeddings: Embeddings, threshold: float):
+        """
+        Initialize the classifier.
+
+        Args:
+            embeddings: Embedding model (local hashing model or Jina)
+            threshold: Minimum confidence margin required to skip the LLM
+        """
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.examples: Dict[str, List[str]] = {intent: [] for intent in VALID_INTENTS}
+        self.centroids: Dict[str, List[float]] = {}
+        self.stats = ClassifierStats()
+
+    def add_examples(self, examples: Dict[str, List[str]]):
+        """Add labelled examples and recompute the affected centroids"""
+        for intent, texts in examples.items():
+            if intent in self.examples and texts:
+                self.examples[intent].extend(texts)
+
+        for intent, texts in self.examples.items():
+            if not texts:
+                continue
+            vectors = self.embeddings.embed_documents([t.lower() for t in texts])
+            summed = [sum(column) for column in zip(*vectors)]
+            self.centroids[intent] = _normalize(summed)
+
+    async def apredict(self, text: str) -> Optional[IntentPrediction]:
+        """
+        Classify a message against the intent centroids.
+
+        Args:
+            text: User message (English, after TRT pre-processing)
+
+        Returns:
+            IntentPrediction, or None if no centroids are available
+        """
+        if len(self.centroids) < 2:
+            return None
+
+        vector = await self.embeddings.aembed_query(text.lower())
+        scores = sorted(
+            ((_cosine(vector, centroid), intent) for intent, centroid in self.centroids.items()),
+            reverse=True,
+        )
+        (best, label), (runner_up, _) = scores[0], scores[1]
+        confidence = best - runner_up
+
+        return IntentPrediction(
+            label=label,
+            confidence=confidence,
+            confident=confidence >= self.threshold,
+        )
+
+    def should_shadow(self) -> bool:
+        """Whether a local hit should also be checked against the LLM"""
+        return random.random() < settings.intent_classifier_shadow_rate
+
+
+def load_ticket_examples(limit: int) -> Dict[str, List[str]]:
+    """
+    Build intent examples from past single-type support tickets.
+
+    The first patient message of each ticket is labelled with the intent
+    implied by its ticket type.
+
+    Args:
+        limit: Maximum number of tickets to read
+
+    Returns:
+        Dict mapping intent -> list of example messages
+    """
+    from src.services.database import get_database
+
+    examples: Dict[str, List[str]] = {intent: [] for intent in VALID_INTENTS}
+    for ticket in get_database().get_support_tickets(limit=limit):
+        types = ticket.get("type") or []
+        if len(types) != 1 or types[0] not in TICKET_TYPE_TO_INTENT:
+            continue
+
+        history = (ticket.get("conversation_history") or {}).get("messages", [])
+        first_user = next((m["content"] for m in history if m.get("role") == "user"), None)
+        if first_user:
+            examples[TICKET_TYPE_TO_INTENT[types[0]]].append(first_user)
+
+    return examples
+
+
+def _build_embeddings() -> Embeddings:
+    if settings.intent_classifier_embeddings == "jina":
+        from src.rag.retriever import get_retriever
+        return get_retriever().embeddings
+    return HashingEmbeddings()
+
+
+# Singleton instance (seeded on first call with the router prompt)
+_classifier_instance = None
+_classifier_lock = threading.Lock()  # Seeding runs on the blocking pool; concurrent first turns build it once
+
+
+def get_intent_classifier(router_prompt: str = None) -> IntentPreClassifier:
+    """
+    Get or create the singleton intent pre-classifier.
+
+    Args:
+        router_prompt: Router system prompt to seed examples from (required on first call)
+
+    Returns:
+        IntentPreClassifier instance
+    """
+    global _classifier_instance
+
+    with _classifier_lock:
+        if _classifier_instance is None:
+            _classifier_instance = _seed_classifier(router_prompt)
+    return _classifier_instance
+
+
+def _seed_classifier(router_prompt: Optional[str]) -> IntentPreClassifier:
+    """Build the classifier from the router prompt examples and past support tickets"""
+    if router_prompt is None:
+        raise ValueError("router_prompt must be provided on first call")
+
+    classifier = IntentPreClassifier(
+        embeddings=_build_embeddings(),
+        threshold=settings.intent_classifier_threshold,
+    )
+    classifier.add_examples(parse_prompt_examples(router_prompt))
+
+    if settings.intent_classifier_ticket_examples > 0:
+        try:
+            classifier.add_examples(load_ticket_examples(settings.intent_classifier_ticket_examples))
+        except Exception as e:
+            print(f"Could not seed intent classifier from tickets: {e}")
+
+    return classifier
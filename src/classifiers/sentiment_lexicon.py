@@ -0,0 +1,255 @@
+"""
+Lexical Sentiment Guardrail (fast path)
+Compiled English/Arabic keyword patterns that settle clearly critical and
+clearly benign messages instantly; everything else goes to the LLM.
+
+Only unambiguous phrases escalate without the LLM ("lawsuit", "call the
+police", "kill myself"). Bare words that are often harmless ("court" in
+"food court", the name "Sue", "cops") and negated phrases ("I'm not going
+to file a lawsuit") are sent to the LLM instead.
+
+The guardrail fails closed: a message is only "benign" when it is short and
+every word is on an allow-list of greetings, thanks and plain FAQ / booking
+phrasing ("what are your opening hours?", "book a cleaning tomorrow at 10").
+Anything else, however harmless it looks, goes to the LLM.
+"""
+
+import random
+import re
+from dataclasses import dataclass, field
+from typing import List, Literal, Optional
+from src.config.settings import settings
+
+
+# Escalate immediately - legal threats, police, violence, self-harm, medical emergencies (unambiguous phrases only)
+CRITICAL_PATTERNS = {
+    "legal threat": [
+        r"\blaw\s?suits?\b", r"\blegal\s+action\b",
+        r"\b(?:call(?:ing)?|contact(?:ing)?|hir(?:e|ing)|get(?:ting)?|talk(?:ing)?\s+to)\s+(?:my|a)\s+(?:lawyers?|attorneys?)\b",
+        r"\b(?:take|taking)\s+(?:you|this|the\s+clinic)\s+to\s+court\b",
+        r"\b(?:i'?ll|i\s+will|i'?m\s+going\s+to|i\s+am\s+going\s+to|gonna)\s+sue\b",
+        r"دعو[ىي]\s+قضائية", r"رفع\s+قضية", r"قضية\s+ضد", r"سأقاضي",
+    ],
+    "police": [
+        r"\b(?:call(?:ing)?|contact(?:ing)?)\s+the\s+police\b", r"\breport(?:ing)?\s+\w+(?:\s+\w+)?\s+to\s+the\s+police\b",
+        r"(?:أتصل|اتصل|سأتصل|ابلغ|أبلغ|سأبلغ)\s+(?:ب|على\s+)?(?:الشرطة|الشرطه|البوليس)",
+    ],
+    "violence": [
+        r"\b(?:i'?ll|i\s+will|i'?m\s+going\s+to|i\s+am\s+going\s+to|gonna|i\s+want\s+to|i'?d\s+like\s+to)"
+        r"\s+(?:kill|hurt|stab|shoot|attack|beat\s+up|punch)\s+(?!myself\b)\w+",
+        r"\bburn\s+(?:\w+\s+){0,3}down\b", r"\bset\s+(?:\w+\s+){0,3}on\s+fire\b",
+        r"\bblow\s+up\s+(?:the|this|your)\b", r"\b(?:bring(?:ing)?|have|got)\s+a\s+(?:gun|knife|weapon)\b",
+        r"سأقتل", r"ساقتل", r"راح\s+أقتل", r"راح\s+اقتل", r"سأحرق", r"ساحرق", r"راح\s+أحرق", r"راح\s+احرق",
+    ],
+    "self-harm": [
+        r"\bsuicid\w*", r"\bkill\s+myself\b", r"\bend\s+my\s+life\b", r"\bwant\s+to\s+die\b",
+        r"\bhurt\s+myself\b", r"\bbetter\s+off\s+dead\b",
+        r"انتحار", r"انتحر", r"أقتل\s+نفسي", r"اقتل\s+نفسي", r"أنهي\s+حياتي",
+        r"[أا]ريد\s+[أا]ن\s+[أا]موت", r"[أا]بي\s+[أا]موت", r"بدي\s+[أا]موت", r"[أا]تمنى\s+الموت",
+    ],
+    "medical emergency": [
+        r"\b(?:can'?t|cannot|can\s+not|unable\s+to|hard\s+to|struggling\s+to)\s+(?:breathe|swallow)\b",
+        r"\b(?:difficulty|trouble)\s+(?:breathing|swallowing)\b", r"\bshort(?:ness)?\s+of\s+breath\b",
+        r"\bpassed\s+out\b", r"\bunconscious\b", r"\bchest\s+pains?\b", r"\ballergic\s+reaction\b",
+        r"(?:لا\s+[أا]ستطيع|ما\s+[أا]قدر|مو\s+قادر|مش\s+قادر)\s+(?:[أا]تنفس|التنفس|[أا]بلع)",
+        r"صعوبة\s+(?:في\s+)?(?:التنفس|البلع)", r"ضيق\s+(?:في\s+)?(?:التنفس|النفس)", r"[أا]غمي\s+علي",
+    ],
+    "heavy bleeding": [
+        r"\bbleeding\s+(?:heavily|badly|a\s+lot|non-?stop)\b", r"\bheavy\s+bleeding\b",
+        r"\bwon'?t\s+stop\s+bleeding\b",
+        r"نزيف\s+(?:شديد|حاد|قوي)", r"ينزف\s+(?:بشدة|كثير)",
+    ],
+}
+
+# Needs the LLM - negative tone, profanity, pain/emergency mentions
+AMBIGUOUS_PATTERNS = [
+    # Legal / police words that are often harmless ("food court", a doctor named Sue)
+    r"\bsu(?:e|ing|ed)\b", r"\blawyers?\b", r"\battorneys?\b", r"\bcourt\b", r"\bpolice\b", r"\bcops?\b",
+    r"محامي", r"اقاضي", r"المحكمة", r"الشرطة", r"الشرطه", r"البوليس",
+    # Negative tone
+    r"\bangry\b", r"\bfurious\b", r"\bterrible\b", r"\bhorrible\b", r"\bawful\b", r"\bworst\b",
+    r"\bdisappoint\w*", r"\bunacceptable\b", r"\bridiculous\b", r"\brude\b", r"\bcomplain\w*",
+    r"\bscam\w*", r"\brefund\b", r"\bfrustrat\w*", r"\bhate\b", r"\bnever\s+again\b",
+    # Profanity / insults
+    r"\bdamn\w*", r"\bhell\b", r"\bwtf\b", r"\bshit\w*", r"\bf[u*]ck\w*", r"\bstupid\b",
+    r"\bidiots?\b", r"\buseless\b", r"\bcrap\w*",
+    # Pain / emergencies (may or may not be escalation-worthy)
+    r"\bemergenc\w*", r"\bpain\w*", r"\bhurts?\b", r"\bbleed\w*", r"\bswollen\b", r"\burgent\w*",
+    # Arabic
+    r"غاضب", r"زعلان", r"سيء", r"سيئ", r"أسوأ", r"اسوأ", r"شكوى", r"اشتكي", r"أشتكي", r"نصب",
+    r"حرام\s+عليكم", r"غبي", r"تافه", r"زفت", r"طوارئ", r"ألم", r"الم\s+شديد", r"وجع", r"ينزف", r"نزيف",
+]
+
+POSITIVE_PATTERNS = [
+    r"\bthanks?\b", r"\bthank\s+you\b", r"\bgreat\b", r"\bperfect\b", r"\bawesome\b",
+    r"\bexcellent\b", r"\bappreciate\w*", r"\blove\b",
+    r"شكرا", r"شكراً", r"ممتاز", r"رائع", r"جزاك",
+]
+
+# The only messages settled as "benign" without the LLM: short, and made only of these words
+BENIGN_MAX_WORDS = 15
+BENIGN_WORDS = frozenset("""
+    hi hello hey hiya good morning afternoon evening day salam assalamu alaikum marhaba
+    thanks thank thx you please ok okay sure yes yeah yep no nope great perfect awesome excellent fine cool
+    bye goodbye appreciate it welcome sounds alright got
+    i i'd i'm i'll id im my me we our you your you're the a an to for of on in at from by about
+    is are am was do does did can could would will should be it it's this that that's these there any
+    what what's when where which how much many who with and or also just like want need have has get
+    book booking booked appointment appointments schedule reschedule cancel change move check see
+    available availability free slot slots time times date day days week next earliest first last
+    doctor doctors dr dentist dentists cleaning checkup check-up consultation whitening filling fillings
+    braces crown crowns implant implants extraction root canal x-ray xray kids children family
+    service services price prices cost costs fee fees insurance accept payment pay cash card
+    parking hours open opening close closing located location address directions phone number email
+    clinic offer visit today tomorrow tonight noon am pm o'clock
+    monday tuesday wednesday thursday friday saturday sunday
+    january february march april may june july august september october november december
+    مرحبا اهلا أهلا السلام عليكم وعليكم صباح مساء الخير النور شكرا شكراً جزيلا ممتاز تمام طيب نعم لا
+    أريد اريد ابي أبي ممكن هل ما متى كم أين وين في من على مع و عن
+    موعد مواعيد حجز أحجز احجز إلغاء الغاء تغيير تأجيل دكتور الدكتور طبيب الطبيب تنظيف فحص
+    الأسعار السعر سعر التأمين تأمين الدوام ساعات العمل العيادة موقف الموقع
+    اليوم غدا غداً بكرة الساعة صباحا صباحاً مساء مساءً
+    الأحد الاثنين الإثنين الثلاثاء الأربعاء الخميس الجمعة السبت
+""".split())
+
+_WORD = re.compile(r"[^\W_]+(?:['’-][^\W_]+)*")
+# Times, dates and ordinals ("10", "9:30", "10am", "3rd", "2024-05-01")
+_NUMBER = re.compile(r"\d{1,4}(?:[:./-]\d{1,2}){0,2}(?:am|pm|st|nd|rd|th)?", re.IGNORECASE)
+
+_CRITICAL = {
+    reason: re.compile("|".join(patterns), re.IGNORECASE)
+    for reason, patterns in CRITICAL_PATTERNS.items()
+}
+_AMBIGUOUS = re.compile("|".join(AMBIGUOUS_PATTERNS), re.IGNORECASE)
+_POSITIVE = re.compile("|".join(POSITIVE_PATTERNS), re.IGNORECASE)
+_REPEATED_PUNCTUATION = re.compile(r"[!?]{3,}")
+
+# A negation shortly before a critical phrase ("I'm not going to sue") leaves it to the LLM
+_NEGATION = re.compile(
+    r"\b(?:not|no|never|don'?t|won'?t|wouldn'?t|isn'?t|aren'?t|without)\b|\b(?:لا|لن|لم|ما|مش|مو)\b",
+    re.IGNORECASE,
+)
+NEGATION_WINDOW_CHARS = 25
+
+
+def _negated(text: str, start: int) -> bool:
+    return bool(_NEGATION.search(text[max(0, start - NEGATION_WINDOW_CHARS):start]))
+
+
+def _is_allow_listed(text: str) -> bool:
+    """Short message made only of allow-listed words, numbers and times (a name may follow "Dr")"""
+    words = [w.lower().replace("’", "'") for w in _WORD.findall(text)]
+    if not words or len(words) > BENIGN_MAX_WORDS:
+        return False
+    for i, word in enumerate(words):
+        after_title = i > 0 and words[i - 1] in ("dr", "doctor", "الدكتور", "دكتور")
+        if word not in BENIGN_WORDS and not _NUMBER.fullmatch(word) and not after_title:
+            return False
+    return True
+
+
+def _is_shouting(text: str) -> bool:
+    """Mostly upper-case Latin text, or runs of '!!!' / '???'"""
+    if _REPEATED_PUNCTUATION.search(text):
+        return True
+    letters = [c for c in text if c.isascii() and c.isalpha()]
+    return len(letters) >= 12 and sum(c.isupper() for c in letters) / len(letters) >= 0.8
+
+
+@dataclass
+class LexicalVerdict:
+    """Outcome of the lexical tier"""
+    decision: Literal["escalate", "benign", "ambiguous"]
+    sentiment: str  # "positive", "neutral", "negative", "hostile"
+    reason: Optional[str] = None
+    matched: List[str] = field(default_factory=list)
+
+
+def check_message(text: str, original_input: Optional[str] = None) -> LexicalVerdict:
+    """
+    Run the lexical guardrail over the message (and its Arabic original, if any).
+
+    Args:
+        text: Message as the agents see it (English after TRT)
+        original_input: Original Arabic input, if the patient wrote in Arabic
+
+    Returns:
+        LexicalVerdict - "escalate" and "benign" are final, "ambiguous" needs the LLM
+    """
+    candidates = [t for t in (text, original_input) if t]
+
+    negated = []
+    for reason, pattern in _CRITICAL.items():
+        found = [(m.group(0), _negated(candidate, m.start())) for candidate in candidates
+                 for m in pattern.finditer(candidate)]
+        matches = [phrase for phrase, is_negated in found if not is_negated]
+        if matches:
+            return LexicalVerdict("escalate", "hostile", reason=reason, matched=matches)
+        negated += [phrase for phrase, is_negated in found if is_negated]
+    if negated:
+        return LexicalVerdict("ambiguous", "negative", reason="negated critical phrase", matched=negated)
+
+    ambiguous = [m.group(0) for t in candidates for m in _AMBIGUOUS.finditer(t)]
+    if ambiguous:
+        return LexicalVerdict("ambiguous", "negative", reason="negative tone", matched=ambiguous)
+
+    if any(len(t) > settings.sentiment_long_message_chars for t in candidates):
+        return LexicalVerdict("ambiguous", "neutral", reason="long message")
+
+    if any(_is_shouting(t) for t in candidates):
+        return LexicalVerdict("ambiguous", "negative", reason="shouting")
+
+    if not all(_is_allow_listed(t) for t in candidates):
+        return LexicalVerdict("ambiguous", "neutral", reason="not on the benign allow-list")
+
+    sentiment = "positive" if any(_POSITIVE.search(t) for t in candidates) else "neutral"
+    return LexicalVerdict("benign", sentiment)
+
+
+class GuardrailStats:
+    """Counts which tier decided each message, for auditing LLM savings"""
+
+    def __init__(self):
+        self.lexical_escalations = 0
+        self.lexical_benign = 0
+        self.llm_decisions = 0
+        self.llm_escalations = 0
+        self.audited = 0
+        self.missed_escalations = 0  # Lexical "benign" that the LLM would have escalated
+
+    def record(self, tier: str, escalated: bool):
+        if tier == "lexical":
+            if escalated:
+                self.lexical_escalations += 1
+            else:
+                self.lexical_benign += 1
+        else:
+            self.llm_decisions += 1
+            if escalated:
+                self.llm_escalations += 1
+
+    def record_audit(self, llm_escalated: bool):
+        self.audited += 1
+        if llm_escalated:
+            self.missed_escalations += 1
+
+    def should_audit(self) -> bool:
+        return random.random() < settings.sentiment_audit_rate
+
+    def summary(self) -> dict:
+        total = self.lexical_escalations + self.lexical_benign + self.llm_decisions
+        lexical = self.lexical_escalations + self.lexical_benign
+        return {
+            "total": total,
+            "lexical_decisions": lexical,
+            "lexical_escalations": self.lexical_escalations,
+            "llm_decisions": self.llm_decisions,
+            "llm_escalations": self.llm_escalations,
+            "llm_calls_saved": round(lexical / total, 3) if total else 0.0,
+            "audited_benign": self.audited,
+            "missed_escalations": self.missed_escalations,
+        }
+
+
+# Process-wide counters
+guardrail_stats = GuardrailStats()
@@ -47,9 +47,101 @@ class Settings(BaseSettings):
     chroma_db_path: str = "./chroma_db"
     chroma_collection_name: str = "dental_clinic_faq"
 
+    # Knowledge Base Indexing (init_chromadb.py)
+    rag_docs_dir: str = os.getenv("RAG_DOCS_DIR", "./rag-doc")  # .txt / .md documents, searched recursively
+    index_batch_size: int = int(os.getenv("INDEX_BATCH_SIZE", "64"))  # Chunks per embedding request
+    index_batch_max_chars: int = int(os.getenv("INDEX_BATCH_MAX_CHARS", "32000"))  # Text per embedding request
+    index_concurrency: int = int(os.getenv("INDEX_CONCURRENCY", "4"))  # Embedding requests in flight
+
     # Agent Configuration
     max_retries: int = 2
     temperature: float = 0.7
+    history_max_turns: int = int(os.getenv("HISTORY_MAX_TURNS", "6"))  # Turns sent verbatim to agents
+    history_summary_batch: int = int(os.getenv("HISTORY_SUMMARY_BATCH", "4"))  # Older messages per summary update
+
+    # LLM HTTP Connection Pool (shared by every OpenRouter client)
+    llm_http2: bool = os.getenv("LLM_HTTP2", "true").lower() == "true"  # Needs the h2 package
+    llm_pool_max_connections: int = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "50"))
+    llm_pool_max_keepalive: int = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20"))
+    llm_pool_keepalive_seconds: float = float(os.getenv("LLM_POOL_KEEPALIVE_SECONDS", "120"))
+    llm_warmup_connections: int = int(os.getenv("LLM_WARMUP_CONNECTIONS", "2"))  # Opened at startup (0 disables)
+
+    # LLM Request Policy (src/llm/policy.py)
+    llm_turn_budget_seconds: float = float(os.getenv("LLM_TURN_BUDGET_SECONDS", "45"))  # LLM calls share this per turn
+    llm_min_call_seconds: float = float(os.getenv("LLM_MIN_CALL_SECONDS", "5"))  # Deadline floor once the budget is spent
+    llm_hedging_enabled: bool = os.getenv("LLM_HEDGING_ENABLED", "true").lower() == "true"  # Idempotent calls only
+    llm_hedge_percentile: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))  # Hedge after this latency percentile
+    llm_hedge_min_samples: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))  # Calls seen before the percentile is used
+    llm_hedge_default_delay_ms: float = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_MS", "2500"))  # Until then
+    llm_hedge_min_delay_ms: float = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "250"))
+
+    # Model Cascade (small model first, main model only on low confidence - src/llm/cascade.py)
+    cascade_enabled: bool = os.getenv("CASCADE_ENABLED", "false").lower() == "true"  # Classifiers + FAQ agent
+    cascade_small_model: str = os.getenv("CASCADE_SMALL_MODEL", "qwen/qwen3-8b")
+    cascade_min_label_prob: float = float(os.getenv("CASCADE_MIN_LABEL_PROB", "0.85"))  # From logprobs
+    cascade_max_retrieval_distance: float = float(os.getenv("CASCADE_MAX_RETRIEVAL_DISTANCE", "0.9"))  # Chroma L2 (0-4)
+
+    # Token Budgets (per call site max_tokens + prompt budget - src/llm/budget.py)
+    token_budgets_enabled: bool = os.getenv("TOKEN_BUDGETS_ENABLED", "true").lower() == "true"
+    token_budgets: str = os.getenv("TOKEN_BUDGETS", "")  # Overrides: "intent=16/1500,faq=800/6000"
+
+    # Cassettes (record/replay of a conversation's external calls - src/utils/cassette.py)
+    cassette_mode: str = os.getenv("CASSETTE_MODE", "off")  # off | record | replay
+    cassette_dir: str = os.getenv("CASSETTE_DIR", "./cassettes")
+    cassette_speed: float = float(os.getenv("CASSETTE_SPEED", "1.0"))  # Replay timing: 1 original, 0 instant
+
+    # Concurrency Configuration
+    blocking_io_workers: int = int(os.getenv("BLOCKING_IO_WORKERS", "16"))  # Thread pool for Calendar/Supabase/SMTP
+    speculative_execution: bool = os.getenv("SPECULATIVE_EXECUTION", "false").lower() == "true"  # Start agent before guardrail finishes
+
+    # Conversation Checkpointing (persisted LangGraph state keyed by conversation_id)
+    checkpoint_backend: str = os.getenv("CHECKPOINT_BACKEND", "sqlite")  # "sqlite", "memory" or "none"
+    checkpoint_db_path: str = os.getenv("CHECKPOINT_DB_PATH", "./checkpoints.db")
+    checkpoint_keep_per_thread: int = int(os.getenv("CHECKPOINT_KEEP_PER_THREAD", "10"))  # Older checkpoints of a conversation are pruned
+
+    # Streaming (agent tokens as they arrive; Arabic replies translated sentence by sentence)
+    stream_responses: bool = os.getenv("STREAM_RESPONSES", "true").lower() == "true"  # CLI streams only when DEBUG_MODE is off
+
+    # Server Configuration (server.py - HTTP/WebSocket frontend)
+    server_host: str = os.getenv("SERVER_HOST", "0.0.0.0")
+    server_port: int = int(os.getenv("SERVER_PORT", "8000"))
+    server_max_concurrent_turns: int = int(os.getenv("SERVER_MAX_CONCURRENT_TURNS", "32"))  # Graph runs in flight
+    server_session_idle_seconds: int = int(os.getenv("SERVER_SESSION_IDLE_SECONDS", "1800"))  # Auto-close + ticket
+
+    # Intent Pre-Classifier (local embedding centroids in front of the LLM router)
+    intent_classifier_enabled: bool = os.getenv("INTENT_CLASSIFIER_ENABLED", "true").lower() == "true"
+    intent_classifier_embeddings: str = os.getenv("INTENT_CLASSIFIER_EMBEDDINGS", "local")  # "local" or "jina"
+    intent_classifier_threshold: float = float(os.getenv("INTENT_CLASSIFIER_THRESHOLD", "0.15"))  # Min centroid margin
+    intent_classifier_ticket_examples: int = int(os.getenv("INTENT_CLASSIFIER_TICKET_EXAMPLES", "200"))  # 0 disables
+    intent_classifier_shadow_rate: float = float(os.getenv("INTENT_CLASSIFIER_SHADOW_RATE", "0.0"))  # LLM spot checks
+
+    # FAQ Answer Cache (reuse answers for similar questions grounded in the same knowledge base chunks)
+    faq_cache_enabled: bool = os.getenv("FAQ_CACHE_ENABLED", "true").lower() == "true"
+    faq_cache_similarity: float = float(os.getenv("FAQ_CACHE_SIMILARITY", "0.92"))  # Min question cosine similarity
+    faq_cache_max_entries: int = int(os.getenv("FAQ_CACHE_MAX_ENTRIES", "500"))
+    faq_cache_ttl_seconds: int = int(os.getenv("FAQ_CACHE_TTL_SECONDS", "86400"))  # Date-bound answers expire at midnight
+
+    # Query Embedding Cache (in-process LRU + SQLite on disk in front of the Jina API - src/rag/retriever.py)
+    embedding_cache_enabled: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    embedding_cache_max_entries: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "5000"))  # In-process LRU
+    embedding_cache_path: str = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.db")  # "" = memory only
+    embedding_cache_max_rows: int = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "50000"))  # On disk, oldest dropped first
+    embedding_cache_max_age_days: float = float(os.getenv("EMBEDDING_CACHE_MAX_AGE_DAYS", "30"))
+
+    # Dialogue Flows (booking/cancel/reschedule slot filling; follow-ups skip intent classification)
+    dialogue_flows_enabled: bool = os.getenv("DIALOGUE_FLOWS_ENABLED", "true").lower() == "true"
+    dialogue_flow_max_turns: int = int(os.getenv("DIALOGUE_FLOW_MAX_TURNS", "6"))  # Agent turns before a flow is dropped
+
+    # Classifier Mode: "parallel" (separate sentiment + intent calls) or "combined" (one structured call)
+    classifier_mode: str = os.getenv("CLASSIFIER_MODE", "parallel")
+
+    # Sentiment Guardrail (lexical fast path in front of the LLM)
+    sentiment_fast_path: bool = os.getenv("SENTIMENT_FAST_PATH", "true").lower() == "true"
+    sentiment_long_message_chars: int = int(os.getenv("SENTIMENT_LONG_MESSAGE_CHARS", "280"))  # Longer goes to LLM
+    sentiment_audit_rate: float = float(os.getenv("SENTIMENT_AUDIT_RATE", "0.05"))  # LLM re-check of lexical "benign"
+
+    # Telemetry (per-turn latency / token / cost records)
+    telemetry_log_path: str = os.getenv("TELEMETRY_LOG_PATH", "")  # JSONL file, one record per turn ("" disables)
 
     # Debug Mode (TRT Architecture)
     debug_mode: bool = os.getenv("DEBUG_MODE", "true").lower() == "true"
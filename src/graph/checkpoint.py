@@ -0,0 +1,497 @@
+"""
+Conversation Checkpointer
+Persists LangGraph state per conversation so a session survives a crash and
+can be resumed by any worker process that shares the checkpoint store.
+
+Only the latest checkpoints of each conversation are kept, and a
+conversation's thread is deleted once its session is closed and its
+support ticket filed (see SessionManager.close_session).
+"""
+
+import random
+import sqlite3
+import threading
+import zlib
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+from src.config.settings import settings
+from src.utils.concurrency import run_blocking
+
+
+# Serialized payloads above this size are zlib-compressed before storage
+COMPRESS_MIN_BYTES = 512
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+def thread_config(conversation_id: str) -> RunnableConfig:
+    """
+    Build the LangGraph config that keys checkpoints by conversation.
+
+    Args:
+        conversation_id: Conversation ID from AgentState
+
+    Returns:
+        Config to pass to app.ainvoke / app.aget_state
+    """
+    return {"configurable": {"thread_id": conversation_id}}
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpoint saver backed by a local SQLite file.
+
+    Channel values are stored once per version (unchanged channels are not
+    rewritten each step), serialized with the LangGraph msgpack serializer
+    and zlib-compressed when large. WAL mode lets several worker processes
+    on the same host share one database file.
+
+    Each thread keeps its `keep_per_thread` newest checkpoints; older ones,
+    their writes and the channel values only they reference are pruned as
+    new checkpoints are saved.
+    """
+
+    def __init__(self, path: str, keep_per_thread: int = 10):
+        """
+        Open (or create) the checkpoint database.
+
+        Args:
+            path: SQLite file path (":memory:" for a throwaway store)
+            keep_per_thread: Checkpoints kept per conversation (0 keeps all)
+        """
+        super().__init__()
+        self.path = path
+        self.keep_per_thread = keep_per_thread
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+            self.conn.commit()
+
+    # ------------------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------------------
+
+    def _dump(self, value: Any) -> tuple[str, bytes]:
+        """Serialize a value to (type, bytes), compressing large payloads"""
+        type_, data = self.serde.dumps_typed(value)
+        if len(data) >= COMPRESS_MIN_BYTES:
+            return f"zlib:{type_}", zlib.compress(data)
+        return type_, data
+
+    def _load(self, type_: str, data: bytes) -> Any:
+        """Inverse of _dump"""
+        if type_.startswith("zlib:"):
+            type_, data = type_[5:], zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> dict:
+        """Load channel values for the given channel versions"""
+        values = {}
+        for channel, version in versions.items():
+            row = self.conn.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row and row[0] != "empty":
+                values[channel] = self._load(row[0], row[1])
+        return values
+
+    def _build_tuple(self, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        """Turn a checkpoints row into a CheckpointTuple with values and pending writes"""
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_b, metadata_type, metadata_b = row
+        checkpoint = self._load(type_, checkpoint_b)
+        writes = self.conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=self._load(metadata_type, metadata_b),
+            pending_writes=[(task_id, channel, self._load(t, v)) for task_id, channel, t, v in writes],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """
+        Get a checkpoint tuple for a conversation.
+
+        Args:
+            config: Config with thread_id (and optionally checkpoint_id)
+
+        Returns:
+            The requested checkpoint, the latest one if no checkpoint_id is
+            given, or None if the conversation has no checkpoints
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = (
+            "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params = [thread_id, checkpoint_ns]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+
+        with self.lock:
+            row = self.conn.execute(query, params).fetchone()
+            if not row:
+                return None
+            return self._build_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """
+        List checkpoints, newest first.
+
+        Args:
+            config: Restrict to this thread (and namespace / checkpoint_id if set)
+            filter: Metadata key/values that must match
+            before: Only checkpoints created before this config's checkpoint
+            limit: Maximum number of checkpoints to yield
+        """
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+            "FROM checkpoints WHERE 1 = 1"
+        )
+        params = []
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_id)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            with self.lock:
+                item = self._build_tuple(thread_id, checkpoint_ns, tuple(row))
+            if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield item
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """
+        Save a checkpoint; only channels listed in new_versions are written.
+
+        Args:
+            config: Config of the parent checkpoint
+            checkpoint: Checkpoint to save
+            metadata: Metadata for the checkpoint
+            new_versions: Channel versions that changed in this step
+
+        Returns:
+            Config pointing at the saved checkpoint
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values = c.pop("channel_values")
+
+        blob_rows = []
+        for channel, version in new_versions.items():
+            type_, data = self._dump(values[channel]) if channel in values else ("empty", b"")
+            blob_rows.append((thread_id, checkpoint_ns, channel, str(version), type_, data))
+
+        type_, checkpoint_b = self._dump(c)
+        metadata_type, metadata_b = self._dump(get_checkpoint_metadata(config, metadata))
+
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blob_rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    checkpoint_b,
+                    metadata_type,
+                    metadata_b,
+                ),
+            )
+            self._prune(thread_id, checkpoint_ns)
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """
+        Save intermediate writes of a task for the given checkpoint.
+
+        Args:
+            config: Config of the checkpoint the writes belong to
+            writes: (channel, value) pairs
+            task_id: Task that produced the writes
+            task_path: Path of the task in the graph
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        rows = []
+        special = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self._dump(value)
+            rows.append((
+                thread_id, checkpoint_ns, checkpoint_id, task_id,
+                WRITES_IDX_MAP.get(channel, idx), channel, type_, data, task_path,
+            ))
+
+        # Special channels (errors, interrupts) overwrite; regular writes are kept once
+        verb = "INSERT OR REPLACE" if special else "INSERT OR IGNORE"
+        with self.lock, self.conn:
+            self.conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        """
+        Drop a thread's checkpoints beyond the newest `keep_per_thread`.
+
+        Runs once the thread holds twice that many, so the cost is spread
+        over many saves. Must be called with the lock held, inside the
+        put() transaction.
+        """
+        keep = self.keep_per_thread
+        if keep <= 0:
+            return
+        (count,) = self.conn.execute(
+            "SELECT COUNT(*) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns),
+        ).fetchone()
+        if count < 2 * keep:
+            return
+
+        kept = self.conn.execute(
+            "SELECT checkpoint_id, type, checkpoint FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT ?",
+            (thread_id, checkpoint_ns, keep),
+        ).fetchall()
+        oldest_kept = kept[-1][0]
+        self.conn.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            (thread_id, checkpoint_ns, oldest_kept),
+        )
+        self.conn.execute(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            (thread_id, checkpoint_ns, oldest_kept),
+        )
+
+        # Channel values stay while any kept checkpoint still points at their version
+        referenced = set()
+        for _, type_, checkpoint_b in kept:
+            for channel, version in self._load(type_, checkpoint_b)["channel_versions"].items():
+                referenced.add((channel, str(version)))
+        stale = [
+            (thread_id, checkpoint_ns, channel, version)
+            for channel, version in self.conn.execute(
+                "SELECT channel, version FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?",
+                (thread_id, checkpoint_ns),
+            ).fetchall()
+            if (channel, version) not in referenced
+        ]
+        self.conn.executemany(
+            "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            stale,
+        )
+
+    def delete_thread(self, thread_id: str) -> None:
+        """
+        Delete every checkpoint and write of a conversation.
+
+        Args:
+            thread_id: Conversation ID
+        """
+        with self.lock, self.conn:
+            for table in ("checkpoints", "blobs", "writes"):
+                self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    # ------------------------------------------------------------------
+    # Async API (SQLite calls run on the blocking I/O pool)
+    # ------------------------------------------------------------------
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await run_blocking(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await run_blocking(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await run_blocking(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return await run_blocking(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await run_blocking(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: Any) -> str:
+        """Monotonic, lexically sortable channel versions (same scheme as MemorySaver)"""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+# Global checkpointer instance
+_checkpointer_instance = None
+
+
+def get_checkpointer() -> Optional[BaseCheckpointSaver]:
+    """
+    Get or create the checkpointer selected by CHECKPOINT_BACKEND.
+
+    Returns:
+        SQLiteCheckpointSaver ("sqlite"), MemorySaver ("memory"),
+        or None ("none" - state lives only in the caller)
+    """
+    global _checkpointer_instance
+    if _checkpointer_instance is None:
+        backend = settings.checkpoint_backend
+        if backend == "sqlite":
+            _checkpointer_instance = SQLiteCheckpointSaver(
+                settings.checkpoint_db_path, keep_per_thread=settings.checkpoint_keep_per_thread
+            )
+        elif backend == "memory":
+            _checkpointer_instance = MemorySaver()
+        elif backend != "none":
+            raise ValueError(f"Unknown CHECKPOINT_BACKEND: {backend}")
+    return _checkpointer_instance
@@ -0,0 +1,364 @@
+"""
+Booking Dialogue State Machine
+Tracks multi-turn booking, cancellation and rescheduling flows in AgentState
+so that follow-up turns go straight to the owning agent instead of being
+re-classified.
+
+A flow is a fixed sequence of slots (e.g. service -> doctor -> time ->
+confirmation for a booking). Slots are filled from the patient's message
+(local matching against the clinic catalog) and from the tools the agent
+called (src.utils.slots). Values read from the message are only guesses:
+they are listed in unconfirmed_slots until a tool reports them. A flow ends
+when its tool succeeds, when the patient starts a different flow, or after
+DIALOGUE_FLOW_MAX_TURNS turns.
+"""
+
+import asyncio
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from src.config.settings import settings
+from src.graph.state import AgentState
+from src.services.database import get_database
+from src.utils.concurrency import run_blocking
+
+
+# Slots each flow must fill, in order ("confirmation" is filled when the tool succeeds)
+FLOW_SLOTS = {
+    "booking": ("service", "doctor", "time", "confirmation"),
+    "cancel": ("appointment", "confirmation"),
+    "reschedule": ("appointment", "time", "confirmation"),
+}
+
+# Intent (and agent) that owns each flow
+FLOW_INTENT = {
+    "booking": "booking",
+    "cancel": "management",
+    "reschedule": "management",
+}
+
+# AgentState field that holds each slot
+SLOT_FIELDS = {
+    "service": "selected_service_id",
+    "doctor": "selected_doctor_id",
+    "time": "selected_time_slot",
+    "appointment": "appointment_id",
+}
+
+# Every field a flow may set (cleared when a new flow starts)
+FLOW_STATE_FIELDS = (
+    "selected_service_id", "selected_service_name",
+    "selected_doctor_id", "selected_doctor_name",
+    "selected_time_slot", "appointment_id",
+)
+
+# Slot field -> the fields that hold the same value (a tool confirming one confirms both)
+_SLOT_GROUPS = {
+    "selected_service_id": "service", "selected_service_name": "service",
+    "selected_doctor_id": "doctor", "selected_doctor_name": "doctor",
+    "selected_time_slot": "time", "appointment_id": "appointment",
+}
+
+# Phrases that leave the active flow and send the turn back to classification
+EXIT_PHRASES = ("never mind", "nevermind", "forget it", "something else", "another question", "start over")
+
+# Replies this short stay in the active flow when they are a yes/no or pick an option ("the second one")
+SHORT_REPLY_WORDS = 4
+_YES_NO = re.compile(
+    r"^\W*(?:yes|yeah|yep|yup|sure|ok(?:ay)?|confirm(?:ed)?|correct|right|please do|go ahead|"
+    r"no|nope|not really)\b",
+    re.IGNORECASE,
+)
+_CHOICE = re.compile(
+    r"\b(?:first|second|third|fourth|fifth|last|1st|2nd|3rd|4th|5th)\b|\b(?:that|this|the\s+same)\s+one\b"
+    r"|^\W*(?:number\s+|option\s+)?\d\W*$",
+    re.IGNORECASE,
+)
+
+# Requests that start each flow (whole words: "remove" is not "move", "exchange" is not "change")
+FLOW_REQUESTS = {
+    "cancel": re.compile(r"\b(?:cancel\w*|call\s+off|delete)\b", re.IGNORECASE),
+    "reschedule": re.compile(
+        r"\b(?:reschedul\w*|mov(?:e|ed|ing)|chang(?:e|ed|ing)|postpon\w*|different\s+(?:time|day|date))\b",
+        re.IGNORECASE,
+    ),
+    "booking": re.compile(r"\b(?:book|new\s+appointment|make\s+an?\s+appointment)\b", re.IGNORECASE),
+}
+
+# Mid-booking, "change the doctor" or "move it to the afternoon" is part of the booking;
+# a cancel/reschedule request only leaves it when it names an existing appointment
+_APPOINTMENT_OBJECT = re.compile(r"\b(?:appointments?|bookings?|reservations?)\b", re.IGNORECASE)
+
+# Name words too generic to identify a doctor or service on their own
+GENERIC_WORDS = {"dr", "bin", "al", "teeth", "tooth", "treatment", "visit", "dental"}
+
+# Doctors and services change rarely; reload the catalog after this long
+CATALOG_TTL_SECONDS = 600
+
+_catalog = {"loaded_at": None, "doctors": [], "services": []}
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_ISO_SLOT = re.compile(r"\b(\d{4}-\d{2}-\d{2})[ T](\d{1,2}):(\d{2})\b")
+_CLOCK = re.compile(
+    r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b|\b(\d{1,2}):(\d{2})\b"
+    r"|\bat\s+(\d{1,2})\b(?!\s*(?:[:.%]\d|am\b|pm\b|st\b|nd\b|rd\b|th\b))",
+    re.IGNORECASE,
+)
+# A bare hour ("at 4") below this is read as afternoon (clinic hours)
+AFTERNOON_BELOW_HOUR = 8
+
+
+async def get_catalog() -> dict:
+    """Doctors and services for slot matching (cached for CATALOG_TTL_SECONDS)"""
+    loaded_at = _catalog["loaded_at"]
+    if loaded_at is None or time.monotonic() - loaded_at > CATALOG_TTL_SECONDS:
+        db = get_database()
+        doctors, services = await asyncio.gather(
+            run_blocking(db.get_available_doctors),
+            run_blocking(db.get_all_services),
+        )
+        _catalog.update(loaded_at=time.monotonic(), doctors=doctors or [], services=services or [])
+    return _catalog
+
+
+def _name_words(name: str) -> set:
+    return {w for w in re.findall(r"[a-z]+", name.lower()) if len(w) > 2 and w not in GENERIC_WORDS}
+
+
+def match_catalog_item(items: list, text: str) -> Optional[dict]:
+    """
+    Find the one doctor or service the text names.
+
+    Full names win; otherwise a distinctive name word ("Hind", "whitening")
+    must point at exactly one item.
+
+    Returns:
+        The matching item, or None if nothing or more than one item matches
+    """
+    text = text.lower()
+    full = [item for item in items if item["name"].lower() in text]
+    if len(full) == 1:
+        return full[0]
+    words = set(re.findall(r"[a-z]+", text))
+    partial = [item for item in items if _name_words(item["name"]) & words]
+    return partial[0] if len(partial) == 1 else None
+
+
+def _clock_time(match: re.Match) -> tuple[int, int]:
+    if match[1]:
+        return int(match[1]) % 12 + (12 if match[3].lower() == "pm" else 0), int(match[2] or 0)
+    if match[4]:
+        return int(match[4]), int(match[5])
+    hour = int(match[6])
+    return (hour + 12 if hour < AFTERNOON_BELOW_HOUR else hour), 0
+
+
+def extract_time_slot(text: str, now: datetime = None) -> Optional[str]:
+    """
+    Find a concrete appointment time ("2025-11-25 14:00", "tomorrow at 10",
+    "Sunday 4:30 pm").
+
+    Returns:
+        "YYYY-MM-DDTHH:MM", or None if the text has no day plus time, or
+        names more than one ("10:30 on monday, not 9:00 tuesday")
+    """
+    isos = {f"{m[1]}T{int(m[2]):02d}:{m[3]}" for m in _ISO_SLOT.finditer(text)}
+    if isos:
+        return isos.pop() if len(isos) == 1 else None
+
+    times = {_clock_time(m) for m in _CLOCK.finditer(text)}
+    if len(times) != 1:
+        return None
+    hour, minute = times.pop()
+    if hour > 23 or minute > 59:
+        return None
+
+    now = now or datetime.now()
+    lowered = text.lower()
+    days = set()
+    if re.search(r"\btomorrow\b", lowered):
+        days.add((now + timedelta(days=1)).date())
+    if re.search(r"\btoday\b", lowered):
+        days.add(now.date())
+    for weekday, name in enumerate(WEEKDAYS):
+        if re.search(rf"\b{name}\b", lowered):
+            days.add((now + timedelta(days=(weekday - now.weekday()) % 7 or 7)).date())
+    if len(days) != 1:
+        return None
+    return datetime.combine(days.pop(), datetime.min.time()).replace(hour=hour, minute=minute).strftime("%Y-%m-%dT%H:%M")
+
+
+async def extract_slots(message: str) -> dict:
+    """
+    Slots the patient's message fills, as AgentState updates.
+
+    Args:
+        message: Patient message (English, after TRT pre-processing)
+
+    Returns:
+        Dict of selected_* fields found in the message (empty if none)
+    """
+    try:
+        catalog = await get_catalog()
+    except Exception as e:
+        print(f"Could not load the doctor/service catalog: {e}")
+        catalog = {"doctors": [], "services": []}
+
+    slots = {}
+    service = match_catalog_item(catalog["services"], message)
+    if service:
+        slots.update(selected_service_id=service["id"], selected_service_name=service["name"])
+    doctor = match_catalog_item(catalog["doctors"], message)
+    if doctor:
+        slots.update(selected_doctor_id=doctor["id"], selected_doctor_name=doctor["name"])
+    time_slot = extract_time_slot(message)
+    if time_slot:
+        slots["selected_time_slot"] = time_slot
+    return slots
+
+
+def _flow_for(agent: str, message: str, active_flow: Optional[str]) -> Optional[str]:
+    """Which flow this agent turn belongs to (None for one-shot requests like viewing appointments)"""
+    if agent == "booking":
+        return "booking"
+    if FLOW_REQUESTS["cancel"].search(message):
+        return "cancel"
+    if FLOW_REQUESTS["reschedule"].search(message):
+        return "reschedule"
+    return active_flow if active_flow and FLOW_INTENT[active_flow] == agent else None
+
+
+def _requests_other_flow(message: str, flow: str) -> bool:
+    """Whether the message asks for a different flow ("cancel my appointment instead" mid-booking)"""
+    if flow == "booking" and not _APPOINTMENT_OBJECT.search(message):
+        return False
+    return any(pattern.search(message) for name, pattern in FLOW_REQUESTS.items() if name != flow)
+
+
+def next_step(flow: str, state: dict) -> str:
+    """First unfilled slot of a flow"""
+    for slot in FLOW_SLOTS[flow]:
+        if slot == "confirmation" or not state.get(SLOT_FIELDS[slot]):
+            return slot
+    return "confirmation"
+
+
+async def begin_flow_turn(agent: str, state: AgentState) -> dict:
+    """
+    Flow and slot updates to apply before the booking/management agent runs.
+
+    Starting a new flow clears the previous flow's selections; the current
+    message's slots are then filled in.
+
+    Args:
+        agent: Agent handling the turn ("booking" or "management")
+        state: Current agent state
+
+    Returns:
+        State updates (empty when dialogue flows are disabled)
+    """
+    if not settings.dialogue_flows_enabled:
+        return {}
+
+    message = state["messages"][-1].content
+    active_flow = state.get("active_flow")
+    flow = _flow_for(agent, message, active_flow)
+
+    updates = {}
+    unconfirmed = list(state.get("unconfirmed_slots") or [])
+    if flow != active_flow:
+        updates = {name: None for name in FLOW_STATE_FIELDS}
+        updates.update(active_flow=flow, flow_step=None, flow_turns=0)
+        unconfirmed = []
+    if flow:
+        guessed = await extract_slots(message)
+        updates.update(guessed)
+        unconfirmed = sorted(set(unconfirmed) | set(guessed))
+    if unconfirmed != (state.get("unconfirmed_slots") or []):
+        updates["unconfirmed_slots"] = unconfirmed
+    return updates
+
+
+def finish_flow_turn(state: dict, recorded: dict) -> dict:
+    """
+    Flow updates after the agent ran.
+
+    Args:
+        state: State as the agent saw it (with begin_flow_turn updates applied)
+        recorded: Slots the agent's tools reported (src.utils.slots)
+
+    Returns:
+        State updates: tool-resolved slots plus the next flow step, or the
+        flow cleared if it completed or ran out of turns
+    """
+    updates = {name: value for name, value in recorded.items() if name in FLOW_STATE_FIELDS}
+    confirmed = {_SLOT_GROUPS[name] for name in updates}
+    unconfirmed = [name for name in state.get("unconfirmed_slots") or [] if _SLOT_GROUPS[name] not in confirmed]
+    if unconfirmed != (state.get("unconfirmed_slots") or []):
+        updates["unconfirmed_slots"] = unconfirmed
+    flow = state.get("active_flow")
+    if not flow or not settings.dialogue_flows_enabled:
+        return updates
+
+    turns = (state.get("flow_turns") or 0) + 1
+    if recorded.get("completed") == flow or turns >= settings.dialogue_flow_max_turns:
+        updates.update(active_flow=None, flow_step=None, flow_turns=0)
+        if state.get("unconfirmed_slots"):
+            updates["unconfirmed_slots"] = []
+        return updates
+
+    updates.update(flow_step=next_step(flow, {**state, **updates}), flow_turns=turns)
+    return updates
+
+
+async def continue_flow(state: AgentState, prediction=None) -> Optional[str]:
+    """
+    Decide whether the current turn stays in the active flow.
+
+    The turn stays (and skips intent classification) when the message fills
+    a slot, is a short yes/no or choice ("yes", "the first one") or is
+    confidently predicted as the flow's own intent. Anything else - a request
+    to leave ("never mind"), a request for another flow ("cancel it
+    instead"), a short question ("what are your hours?") - is classified
+    normally.
+
+    Args:
+        state: Current agent state
+        prediction: Local pre-classifier prediction for the message (optional)
+
+    Returns:
+        Intent of the owning agent, or None to classify the turn normally
+    """
+    flow = state.get("active_flow")
+    if not flow or not settings.dialogue_flows_enabled:
+        return None
+
+    message = state["messages"][-1].content
+    text = message.lower()
+    if any(phrase in text for phrase in EXIT_PHRASES) or _requests_other_flow(message, flow):
+        return None
+
+    intent = FLOW_INTENT[flow]
+    if prediction and prediction.confident and prediction.label == intent:
+        return intent
+    if len(text.split()) <= SHORT_REPLY_WORDS and (_YES_NO.match(text) or _CHOICE.search(text)):
+        return intent
+    return intent if await extract_slots(message) else None
+
+
+def leave_flow(state: AgentState, intent: str) -> dict:
+    """
+    State updates that end the active flow when a turn was classified away from it.
+
+    Args:
+        state: Current agent state
+        intent: Intent classified for this turn
+
+    Returns:
+        Updates clearing the flow, or {} if there is none or it owns the intent
+    """
+    flow = state.get("active_flow")
+    if not flow or FLOW_INTENT[flow] == intent:
+        return {}
+    return {"active_flow": None, "flow_step": None, "flow_turns": 0, "unconfirmed_slots": []}
@@ -0,0 +1,62 @@
+"""
+Agent Executor Registry
+Builds each specialist agent once and reuses it across conversation turns
+"""
+
+from datetime import datetime
+from typing import Callable, Dict
+from langchain.agents import AgentExecutor
+from src.utils.telemetry import telemetry_callback
+
+
+# Tag on specialist agent runs: only LLM output under this tag may be streamed to the patient
+PATIENT_FACING_TAG = "patient_facing"
+
+# Factories registered by the agent node modules (name -> create_*_agent)
+_factories: Dict[str, Callable[[], AgentExecutor]] = {}
+
+# Compiled executors, built once per process
+_executors: Dict[str, AgentExecutor] = {}
+
+
+def register_agent(name: str, factory: Callable[[], AgentExecutor]):
+    """
+    Register a factory that builds the executor for a specialist agent.
+
+    Args:
+        name: Agent name (e.g., "faq", "booking", "management")
+        factory: Zero-argument function returning an AgentExecutor
+    """
+    _factories[name] = factory
+
+
+def get_executor(name: str) -> AgentExecutor:
+    """
+    Get the long-lived executor for an agent, building it on first use.
+
+    Args:
+        name: Registered agent name
+
+    Returns:
+        AgentExecutor instance shared by every turn and conversation
+    """
+    if name not in _executors:
+        if name not in _factories:
+            raise ValueError(f"No agent registered under '{name}'")
+        executor = _factories[name]()
+        # Record tool calls in the per-turn telemetry
+        for tool in executor.tools:
+            tool.callbacks = [telemetry_callback]
+        _executors[name] = executor
+    return _executors[name]
+
+
+def build_executors():
+    """Build every registered agent executor (called once by create_workflow)"""
+    for name in _factories:
+        get_executor(name)
+
+
+def current_datetime() -> str:
+    """Current date/time string for the per-turn agent input (kept out of the cacheable system prompt)"""
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S (%A)')
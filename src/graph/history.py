@@ -0,0 +1,125 @@
+"""
+Chat History Manager
+Keeps the last N turns verbatim for the specialist agents and folds older
+turns into a rolling summary stored in AgentState, so prompt size stays
+bounded as conversations grow.
+"""
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from src.config.settings import settings
+from src.graph.state import AgentState
+from src.llm.budget import with_budget
+from src.llm.client import llm_router
+from src.utils.debug import debug
+from src.utils.tokens import estimate_message_tokens
+
+
+SUMMARY_SYSTEM_PROMPT = """You maintain a running summary of a dental clinic customer service conversation.
+
+Update the existing summary with the new messages. Keep it under 120 words.
+Preserve every concrete fact the assistant may need later: services, doctors, dates, times,
+prices, appointment changes, and anything the patient asked for but did not get yet.
+Output ONLY the updated summary text."""
+
+# Router client with the summary budget
+_summarizer = with_budget(llm_router, "history_summary")
+
+# Booking-critical state fields that must survive compaction
+PINNED_FIELDS = [
+    ("selected_service_name", "Selected service"),
+    ("selected_service_id", "Selected service ID"),
+    ("selected_doctor_name", "Selected doctor"),
+    ("selected_doctor_id", "Selected doctor ID"),
+    ("selected_time_slot", "Chosen time slot"),
+    ("appointment_id", "Appointment ID"),
+    ("flow_step", "Next detail to collect"),
+]
+
+
+def pinned_facts(state: AgentState) -> str:
+    """
+    Render booking-critical state fields as a short fact list ('' if none set).
+
+    Values only read from the patient's message (not yet confirmed by a tool)
+    are marked as such, so the agent checks them instead of trusting them.
+    """
+    unconfirmed = set(state.get("unconfirmed_slots") or [])
+    lines = [
+        f"- {label}: {state[key]}" + (" (patient's words, unconfirmed - verify before using)"
+                                      if key in unconfirmed else "")
+        for key, label in PINNED_FIELDS if state.get(key)
+    ]
+    if not lines:
+        return ""
+    return "Pinned booking facts (internal - never show IDs to the patient):\n" + "\n".join(lines)
+
+
+async def _update_summary(summary: str, new_messages: list) -> str:
+    """Fold new messages into the rolling summary with the router LLM"""
+    transcript = "\n".join(
+        f"{'Patient' if msg.type == 'human' else 'Assistant'}: {msg.content}"
+        for msg in new_messages
+    )
+    response = await _summarizer.ainvoke([
+        SystemMessage(content=SUMMARY_SYSTEM_PROMPT),
+        HumanMessage(content=f"Existing summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}")
+    ])
+    return response.content.strip()
+
+
+async def compact_history(state: AgentState) -> tuple[list, dict]:
+    """
+    Build the bounded chat history for an agent call.
+
+    The last `history_max_turns` turns are kept verbatim. Older messages are
+    folded into `history_summary` once at least `history_summary_batch` of
+    them have accumulated; until then they stay verbatim, so nothing is lost.
+
+    Args:
+        state: Current agent state (last message is the current input)
+
+    Returns:
+        Tuple of (chat_history messages, state updates to persist)
+    """
+    messages = state["messages"][:-1]
+    keep = settings.history_max_turns * 2
+    split = max(len(messages) - keep, 0)
+    older, recent = messages[:split], messages[split:]
+
+    summary = state.get("history_summary")
+    summarized_count = min(state.get("history_summarized_count") or 0, len(older))
+    pending = older[summarized_count:]
+
+    if len(pending) >= settings.history_summary_batch:
+        try:
+            summary = await _update_summary(summary, pending)
+            summarized_count = len(older)
+            pending = []
+        except Exception as e:
+            print(f"History summarization failed, keeping messages verbatim: {e}")
+
+    # Most stable first (the summary changes once per batch), per-turn pinned facts last,
+    # so the prompt prefix the provider can cache stays as long as possible
+    chat_history = []
+    if summary:
+        chat_history.append(SystemMessage(content=f"Summary of earlier conversation:\n{summary}"))
+    chat_history += pending + recent
+    facts = pinned_facts(state)
+    if facts:
+        chat_history.append(SystemMessage(content=facts))
+
+    tokens = {
+        "before": estimate_message_tokens(messages),
+        "after": estimate_message_tokens(chat_history),
+    }
+    debug.print_stats("HISTORY", {
+        "messages": f"{len(messages)} -> {len(pending) + len(recent)} verbatim",
+        "summarized": summarized_count,
+        "tokens": f"{tokens['before']} -> {tokens['after']}",
+    })
+
+    return chat_history, {
+        "history_summary": summary,
+        "history_summarized_count": summarized_count,
+        "history_tokens": tokens,
+    }
@@ -3,20 +3,25 @@ Booking Agent Node
 Handles appointment booking and scheduling
 """
 
-from datetime import datetime
 from langchain_core.messages import AIMessage, SystemMessage
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate
+from src.graph.dialogue import begin_flow_turn, finish_flow_turn
 from src.graph.state import AgentState
+from src.graph.executors import register_agent, get_executor, current_datetime, PATIENT_FACING_TAG
+from src.graph.history import compact_history
+from src.llm.budget import with_budget
 from src.llm.client import llm_agent
 from src.tools.booking_tools import booking_tools
+from src.utils.slots import collect_slots
 
 
-# System prompt for booking agent - current time will be injected dynamically
+# System prompt for booking agent - static, so the provider can cache it as a prompt prefix.
+# Per-turn details (current time, patient) go in the input message after the history.
 BOOKING_SYSTEM_PROMPT_TEMPLATE = """You are a helpful appointment booking assistant for Riyadh Dental Care Clinic.
 
-**CURRENT DATE AND TIME: {current_datetime}**
-**IMPORTANT: You must NEVER book appointments in the past. Always ensure the requested date/time is after the current time shown above.**
+**CURRENT DATE AND TIME** is given at the top of each patient message.
+**IMPORTANT: You must NEVER book appointments in the past. Always ensure the requested date/time is after that current time.**
 
 **CRITICAL RULES:**
 1. You MUST ALWAYS use the provided tools - NEVER provide information without calling a tool first
@@ -125,19 +130,15 @@ You: [After BOTH tools complete, display success message including actual email
 def create_booking_agent():
     """Create the booking agent with booking tools"""
 
-    # Inject current datetime into the system prompt
-    current_datetime = datetime.now().strftime('%Y-%m-%d %H:%M:%S (%A)')
-    system_prompt = BOOKING_SYSTEM_PROMPT_TEMPLATE.format(current_datetime=current_datetime)
-
     prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
+        ("system", BOOKING_SYSTEM_PROMPT_TEMPLATE),
         ("placeholder", "{chat_history}"),
         ("human", "{input}"),
         ("placeholder", "{agent_scratchpad}"),
     ])
 
     # Create agent with tool calling
-    agent = create_tool_calling_agent(llm_agent, booking_tools, prompt)
+    agent = create_tool_calling_agent(with_budget(llm_agent, "booking"), booking_tools, prompt)
 
     # Create executor
     agent_executor = AgentExecutor(
@@ -152,7 +153,11 @@ def create_booking_agent():
     return agent_executor
 
 
-def booking_agent_node(state: AgentState) -> AgentState:
+# Register the factory so the workflow can build this agent once at startup
+register_agent("booking", create_booking_agent)
+
+
+async def booking_agent_node(state: AgentState) -> AgentState:
     """
     Booking agent that handles appointment scheduling.
 
@@ -160,12 +165,12 @@ def booking_agent_node(state: AgentState) -> AgentState:
         state: Current agent state with conversation messages and patient info
 
     Returns:
-        Updated state with AI response added to messages
+        State update: the new AI message plus the keys that changed
     """
 
     try:
-        # Get the booking agent
-        agent_executor = create_booking_agent()
+        # Get the long-lived booking agent (built once at workflow creation)
+        agent_executor = get_executor("booking")
 
         # Get the last user message
         messages = state["messages"]
@@ -176,7 +181,9 @@ def booking_agent_node(state: AgentState) -> AgentState:
         patient_name = state.get("patient_name", "")
 
         # Build context-aware input
-        input_with_context = f"""Patient Information:
+        input_with_context = f"""Current Date and Time: {current_datetime()}
+
+Patient Information:
 - Name: {patient_name}
 - Email: {patient_email}
 
@@ -185,33 +192,38 @@ Patient Request: {last_message}
 Remember to use the patient's email and name when calling booking tools.
 Note: Patient email is for tool calls only - NEVER include it in your response to the patient."""
 
-        # Get chat history (exclude the last message since it's the input)
-        chat_history = messages[:-1] if len(messages) > 1 else []
+        # Dialogue flow: which slots this message fills (pinned into the history below)
+        flow_updates = await begin_flow_turn("booking", state)
+        state_view = {**state, **flow_updates}
 
-        # Invoke the agent
-        response = agent_executor.invoke({
-            "input": input_with_context,
-            "chat_history": chat_history
-        })
+        # Bounded chat history: last N turns verbatim + rolling summary + pinned facts
+        chat_history, history_updates = await compact_history(state_view)
 
-        # Add AI response to messages
-        ai_message = AIMessage(content=response["output"])
-        state["messages"].append(ai_message)
-
-        # Set next agent to "end" (continue conversation)
-        state["next_agent"] = "end"
+        # Invoke the agent (its tools record the IDs they resolve)
+        recorded_slots = collect_slots()
+        response = await agent_executor.ainvoke({
+            "input": input_with_context,
+            "chat_history": chat_history,
+        }, config={"tags": [PATIENT_FACING_TAG]})
+
+        # Return only what changed: the reply (appended by the messages reducer) and history bookkeeping
+        return {
+            "messages": [AIMessage(content=response["output"])],
+            **history_updates,
+            **flow_updates,
+            **finish_flow_turn(state_view, recorded_slots),
+            "next_agent": "end",  # Continue conversation
+        }
 
     except Exception as e:
-        # Handle errors gracefully
-        state["error_count"] = state.get("error_count", 0) + 1
-        state["last_error"] = str(e)
-
-        # Provide a fallback response
+        # Handle errors gracefully with a fallback response
         error_message = AIMessage(
             content="I apologize, but I'm having trouble with the booking system right now. "
                     "Please try again in a moment or contact our reception at +966-11-XXX-XXXX for assistance."
         )
-        state["messages"].append(error_message)
-        state["next_agent"] = "end"
-
-    return state
+        return {
+            "messages": [error_message],
+            "error_count": state.get("error_count", 0) + 1,
+            "last_error": str(e),
+            "next_agent": "end",
+        }
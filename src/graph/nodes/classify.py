@@ -0,0 +1,164 @@
+"""
+Combined Classification Node
+Classifies intent and sentiment with a single structured-output LLM call
+(alternative to the parallel sentiment + intent nodes).
+"""
+
+import asyncio
+from typing import Literal
+from pydantic import BaseModel, Field
+from langchain_core.messages import HumanMessage, SystemMessage
+from src.config.settings import settings
+from src.graph.dialogue import continue_flow, leave_flow
+from src.graph.state import AgentState
+from src.llm.budget import with_budget
+from src.llm.cascade import run_cascade
+from src.llm.client import llm_router, llm_router_small
+from src.classifiers.sentiment_lexicon import check_message, guardrail_stats
+from src.graph.nodes.intent import ROUTER_SYSTEM_PROMPT, build_context_prompt, aget_router_classifier, intent_node
+from src.graph.nodes.sentiment import audit_lexical_benign, sentiment_node
+from src.utils.debug import debug
+
+
+# Intent categories from the router prompt, without its "respond with ONLY" footer
+_INTENT_SECTION = ROUTER_SYSTEM_PROMPT.split("IMPORTANT: When in doubt")[0].strip()
+
+COMBINED_SYSTEM_PROMPT = f"""{_INTENT_SECTION}
+
+IMPORTANT: When in doubt about intent, classify as "faq".
+
+You are ALSO the sentiment guardrail. For the current user message decide:
+- sentiment: "positive", "neutral", "negative", or "hostile"
+- should_escalate: true ONLY if hostile, threatening, or mentioning suicide/emergency
+  (escalation keywords: lawsuit, sue, police, lawyer, suicide, kill myself, emergency, bleeding heavily)
+- reason: short explanation
+
+Return all four fields using the provided schema.
+"""
+
+
+class TurnClassification(BaseModel):
+    """Intent and sentiment for the current user message"""
+    intent: Literal["faq", "booking", "management", "escalate"] = Field(description="Functional intent category")
+    sentiment: Literal["positive", "neutral", "negative", "hostile"] = Field(description="Tone of the message")
+    should_escalate: bool = Field(description="True only for hostility, threats, suicide or emergencies")
+    reason: str = Field(description="Short explanation")
+
+
+# Structured-output runnable (function calling works across OpenRouter models)
+_structured_router = with_budget(llm_router, "classify").with_structured_output(
+    TurnClassification, method="function_calling")
+_structured_router_small = with_budget(llm_router_small, "classify").with_structured_output(
+    TurnClassification, method="function_calling")
+
+
+async def classify_node(state: AgentState) -> AgentState:
+    """
+    Classify intent and sentiment in one request.
+
+    The lexical guardrail, the active dialogue flow and the local intent
+    pre-classifier still run first; the LLM is only asked when they are
+    undecided. If the structured call fails, the node falls back to the two
+    parallel calls.
+    """
+    messages = state["messages"]
+    if not messages:
+        return {"current_intent": "faq", "sentiment_score": "neutral", "should_escalate": False}
+
+    last_message = messages[-1].content.lower().strip()
+    ticket_types = state.get("ticket_types", [])
+
+    # Fast tiers (no remote call when both are decisive)
+    verdict = check_message(messages[-1].content, state.get("original_input")) if settings.sentiment_fast_path else None
+    if verdict and verdict.decision == "escalate":
+        guardrail_stats.record("lexical", True)
+        return {
+            "sentiment_score": verdict.sentiment,
+            "should_escalate": True,
+            "escalation_reason": f"Detected {verdict.reason}",
+            "sentiment_tier": "lexical",
+        }
+
+    classifier = await aget_router_classifier()
+    prediction = await classifier.apredict(last_message) if classifier else None
+
+    # Mid-flow replies skip intent classification; only sentiment may still need the LLM
+    flow_intent = await continue_flow(state, prediction)
+    if flow_intent:
+        debug.print_classification("INTENT", flow_intent, "flow")
+        if flow_intent not in ticket_types:
+            ticket_types.append(flow_intent)
+        if verdict and verdict.decision == "benign":
+            guardrail_stats.record("lexical", False)
+            audit_lexical_benign(last_message)
+            sentiment_result = {"sentiment_score": verdict.sentiment, "should_escalate": False,
+                                "escalation_reason": None, "sentiment_tier": "lexical"}
+        else:
+            sentiment_result = await sentiment_node(state)
+        return {"current_intent": flow_intent, "intent_source": "flow", "ticket_types": ticket_types,
+                **sentiment_result}
+
+    if verdict and verdict.decision == "benign" and prediction and prediction.confident \
+            and state.get("current_intent") in (None, "faq", prediction.label):
+        guardrail_stats.record("lexical", False)
+        audit_lexical_benign(last_message)
+        classifier.stats.record_hit()
+        if prediction.label not in ticket_types:
+            ticket_types.append(prediction.label)
+        return {
+            "current_intent": prediction.label,
+            "intent_source": "local",
+            "ticket_types": ticket_types,
+            **leave_flow(state, prediction.label),
+            "sentiment_score": verdict.sentiment,
+            "should_escalate": False,
+            "escalation_reason": None,
+            "sentiment_tier": "lexical",
+        }
+
+    # Single structured LLM call (small model first with CASCADE_ENABLED)
+    prompt = [
+        SystemMessage(content=COMBINED_SYSTEM_PROMPT),
+        HumanMessage(content=build_context_prompt(messages, last_message))
+    ]
+    try:
+        result: TurnClassification = await run_cascade(
+            "classify",
+            small=lambda: _structured_router_small.ainvoke(prompt),
+            large=lambda: _structured_router.ainvoke(prompt),
+            accept=lambda r: _accept_small_result(r, prediction),
+        )
+    except Exception as e:
+        print(f"Combined classification failed, falling back to parallel calls: {e}")
+        sentiment_result, intent_result = await asyncio.gather(sentiment_node(state), intent_node(state))
+        return {**sentiment_result, **intent_result}
+
+    guardrail_stats.record("llm", result.should_escalate)
+    if prediction:
+        classifier.stats.record_fallback(prediction.label, result.intent)
+    debug.print_classification("INTENT + SENTIMENT", f"{result.intent} / {result.sentiment}", "combined llm")
+
+    if result.intent not in ticket_types:
+        ticket_types.append(result.intent)
+
+    return {
+        "current_intent": result.intent,
+        "intent_source": "llm",
+        "ticket_types": ticket_types,
+        **leave_flow(state, result.intent),
+        "sentiment_score": result.sentiment,
+        "should_escalate": result.should_escalate,
+        "escalation_reason": result.reason if result.should_escalate else None,
+        "sentiment_tier": "llm",
+    }
+
+
+def _accept_small_result(result: TurnClassification, prediction) -> bool:
+    """
+    Self-check for the small model's combined classification.
+
+    Tool-call arguments carry no logprobs, so the small model's intent is
+    kept only when the local pre-classifier guessed the same label.
+    Escalations are always confirmed by the main model.
+    """
+    return prediction is not None and prediction.label == result.intent and not result.should_escalate
@@ -17,13 +17,7 @@ def decision_node(state: AgentState) -> AgentState:
     
     # Logic: Escalation trumps everything
     if should_escalate:
-        next_agent = "human_handoff"
-        state["current_intent"] = "escalate"
-        state["escalated"] = True
-    elif current_intent == "escalate":
-        next_agent = "human_handoff"
-        state["escalated"] = True
-    else:
-        next_agent = current_intent
-        
-    return {"next_agent": next_agent}
+        return {"next_agent": "human_handoff", "current_intent": "escalate", "escalated": True}
+    if current_intent == "escalate":
+        return {"next_agent": "human_handoff", "escalated": True}
+    return {"next_agent": current_intent}
@@ -3,20 +3,36 @@ FAQ Agent Node
 Answers frequently asked questions using RAG (Retrieval-Augmented Generation)
 """
 
-from datetime import datetime
 from langchain_core.messages import AIMessage, SystemMessage
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate
 from src.graph.state import AgentState
-from src.llm.client import llm_agent
+from src.graph.executors import register_agent, get_executor, current_datetime, PATIENT_FACING_TAG
+from src.graph.history import compact_history
+from src.config.settings import settings
+from src.llm.budget import with_budget
+from src.llm.cascade import run_cascade
+from src.llm.client import llm_faq, llm_faq_small
+from src.rag.answer_cache import get_answer_cache
 from src.tools.rag_tool import rag_tools
+from src.utils.debug import debug
+from src.utils.slots import collect_slots
 
 
-# System prompt for FAQ agent - current time will be injected dynamically
+# Small-model answers that admit not knowing are re-answered by the main model
+REFUSAL_PHRASES = ("couldn't find", "could not find", "don't have", "do not have", "not sure",
+                   "no information", "unable to", "connect you with")
+
+# Small talk ("hi", "thanks a lot") may be answered without a knowledge base lookup
+SMALL_TALK_WORDS = 5
+
+
+# System prompt for FAQ agent - static, so the provider can cache it as a prompt prefix.
+# Per-turn details (current time, patient) go in the input message after the history.
 FAQ_SYSTEM_PROMPT_TEMPLATE = """You are a helpful and friendly AI customer service assistant for Riyadh Dental Care Clinic.
 
-**CURRENT DATE AND TIME: {current_datetime}**
-Use this to answer questions about "today", "tomorrow", specific days of the week, etc.
+**CURRENT DATE AND TIME** is given at the top of each patient message.
+Use it to answer questions about "today", "tomorrow", specific days of the week, etc.
 
 Your role is to answer patient questions about the clinic using the knowledge base tool.
 
@@ -70,22 +86,24 @@ Response: "Yes, we accept most major insurance providers including Bupa, Tawuniy
 """
 
 
-def create_faq_agent():
-    """Create the FAQ agent with RAG tool"""
+def create_faq_agent(llm=None):
+    """
+    Create the FAQ agent with RAG tool.
 
-    # Inject current datetime into the system prompt
-    current_datetime = datetime.now().strftime('%Y-%m-%d %H:%M:%S (%A)')
-    system_prompt = FAQ_SYSTEM_PROMPT_TEMPLATE.format(current_datetime=current_datetime)
+    Args:
+        llm: Chat model for the agent (default: llm_faq)
+    """
 
     prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
+        ("system", FAQ_SYSTEM_PROMPT_TEMPLATE),
         ("placeholder", "{chat_history}"),
         ("human", "{input}"),
         ("placeholder", "{agent_scratchpad}"),
     ])
 
     # Create agent with tool calling
-    agent = create_tool_calling_agent(llm_agent, rag_tools, prompt)
+    llm = with_budget(llm or llm_faq, "faq")  # Hedged: the knowledge base tool is read-only
+    agent = create_tool_calling_agent(llm, rag_tools, prompt)
 
     # Create executor with optimized settings
     agent_executor = AgentExecutor(
@@ -95,12 +113,40 @@ def create_faq_agent():
         handle_parsing_errors=True,
         max_iterations=2,  # Reduced from 3 for faster responses
         early_stopping_method="generate",  # Stop as soon as answer is generated
+        return_intermediate_steps=True,  # Tells the answer cache whether the knowledge base was used
     )
 
     return agent_executor
 
 
-def faq_agent_node(state: AgentState) -> AgentState:
+# Register the factories so the workflow can build these agents once at startup
+register_agent("faq", create_faq_agent)
+register_agent("faq_small", lambda: create_faq_agent(llm_faq_small))  # Cascade tier (CASCADE_ENABLED)
+
+
+def _used_knowledge_base(response: dict) -> bool:
+    """Whether the agent run called the knowledge base tool"""
+    return any(action.tool == "query_knowledge_base" for action, _ in response.get("intermediate_steps", []))
+
+
+def _accept_small_answer(response: dict, question: str, recorded: dict) -> bool:
+    """
+    Confidence check for the cascade's small-model answer.
+
+    Kept when it is not a refusal and is either grounded in a close
+    knowledge base match (CASCADE_MAX_RETRIEVAL_DISTANCE) or a reply to
+    short small talk that needed no lookup.
+    """
+    answer = response.get("output", "")
+    if not answer.strip() or any(phrase in answer.lower() for phrase in REFUSAL_PHRASES):
+        return False
+    distance = recorded.get("retrieval_distance")
+    if distance is None:
+        return not _used_knowledge_base(response) and len(question.split()) <= SMALL_TALK_WORDS
+    return distance <= settings.cascade_max_retrieval_distance
+
+
+async def faq_agent_node(state: AgentState) -> AgentState:
     """
     FAQ agent that answers questions using the knowledge base.
 
@@ -108,12 +154,12 @@ def faq_agent_node(state: AgentState) -> AgentState:
         state: Current agent state with conversation messages
 
     Returns:
-        Updated state with AI response added to messages
+        State update: the new AI message plus the keys that changed
     """
 
     try:
-        # Get the FAQ agent
-        agent_executor = create_faq_agent()
+        # Get the long-lived FAQ agent (built once at workflow creation)
+        agent_executor = get_executor("faq")
 
         # Get the last user message
         messages = state["messages"]
@@ -124,7 +170,9 @@ def faq_agent_node(state: AgentState) -> AgentState:
         patient_email = state.get("patient_email", "")
 
         # Build context-aware input
-        input_with_context = f"""Patient Information:
+        input_with_context = f"""Current Date and Time: {current_datetime()}
+
+Patient Information:
 - Name: {patient_name}
 - Email: {patient_email}
 
@@ -133,33 +181,63 @@ Patient Question: {last_message}
 Remember: You know who this patient is from the system. Use their name when appropriate.
 Note: Patient email is for reference only - NEVER include it in your response to the patient."""
 
-        # Get chat history (exclude the last message since it's the input)
-        chat_history = messages[:-1] if len(messages) > 1 else []
-
-        # Invoke the agent
-        response = agent_executor.invoke({
-            "input": input_with_context,
-            "chat_history": chat_history
-        })
+        # Repeated questions are answered from the cache without running the agent
+        cache = get_answer_cache()
+        probe = None
+        if cache:
+            try:
+                cached_answer, probe = await cache.lookup(last_message, patient_name)
+            except Exception as e:
+                print(f"FAQ answer cache lookup failed: {e}")
+                cached_answer = None
+            if cached_answer:
+                debug.print_stats("FAQ ANSWER CACHE", {"hit": last_message, **cache.stats.summary()})
+                return {
+                    "messages": [AIMessage(content=cached_answer)],
+                    "next_agent": "end",
+                }
+
+        # Bounded chat history: last N turns verbatim + rolling summary + pinned facts
+        chat_history, history_updates = await compact_history(state)
+
+        # Invoke the agent (small model first with CASCADE_ENABLED). The small tier is not
+        # patient-facing: its answer is only shown once accepted, so it is never streamed.
+        inputs = {"input": input_with_context, "chat_history": chat_history}
+        recorded = {}
+
+        async def small_tier():
+            slots = collect_slots()  # The knowledge base tool records its retrieval distance here
+            response = await get_executor("faq_small").ainvoke(inputs)
+            recorded.update(slots)
+            return response
+
+        response = await run_cascade(
+            "faq",
+            small=small_tier,
+            large=lambda: agent_executor.ainvoke(inputs, config={"tags": [PATIENT_FACING_TAG]}),
+            accept=lambda r: _accept_small_answer(r, last_message, recorded),
+        )
 
-        # Add AI response to messages
-        ai_message = AIMessage(content=response["output"])
-        state["messages"].append(ai_message)
+        # Only answers grounded in the knowledge base are reused (not greetings or small talk)
+        if probe and _used_knowledge_base(response):
+            cache.store(probe, last_message, response["output"], patient_name, patient_email)
 
-        # Set next agent to "end" (conversation complete)
-        state["next_agent"] = "end"
+        # Return only what changed: the reply (appended by the messages reducer) and history bookkeeping
+        return {
+            "messages": [AIMessage(content=response["output"])],
+            **history_updates,
+            "next_agent": "end",  # Conversation complete
+        }
 
     except Exception as e:
-        # Handle errors gracefully
-        state["error_count"] = state.get("error_count", 0) + 1
-        state["last_error"] = str(e)
-
-        # Provide a fallback response
+        # Handle errors gracefully with a fallback response
         error_message = AIMessage(
             content="I apologize, but I'm having trouble accessing the information right now. "
                     "Would you like me to connect you with our staff for assistance?"
         )
-        state["messages"].append(error_message)
-        state["next_agent"] = "end"
-
-    return state
+        return {
+            "messages": [error_message],
+            "error_count": state.get("error_count", 0) + 1,
+            "last_error": str(e),
+            "next_agent": "end",
+        }
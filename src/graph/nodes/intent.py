@@ -4,8 +4,15 @@ Classifies user intent into functional categories.
 """
 
 from langchain_core.messages import HumanMessage, SystemMessage
+from src.config.settings import settings
+from src.graph.dialogue import continue_flow, leave_flow
 from src.graph.state import AgentState
-from src.llm.client import llm_router
+from src.llm.budget import OutputBudgetExhausted, with_budget
+from src.llm.cascade import accept_label, run_cascade
+from src.llm.client import llm_router, llm_router_small
+from src.classifiers.intent_embedding import get_intent_classifier, VALID_INTENTS
+from src.utils.concurrency import run_blocking, run_in_background
+from src.utils.debug import debug
 
 # System prompt for intent classification
 ROUTER_SYSTEM_PROMPT = """You are an intent classification expert for a dental clinic AI customer service system.
@@ -47,6 +54,11 @@ IMPORTANT: When in doubt, classify as "faq".
 Respond with ONLY the category name: faq, booking, management, or escalate
 """
 
+# Router clients with the one-label intent budget
+_router = with_budget(llm_router, "intent")
+_router_small = with_budget(llm_router_small, "intent")
+
+
 async def intent_node(state: AgentState) -> AgentState:
     """
     Classifies the user's intent.
@@ -56,51 +68,142 @@ async def intent_node(state: AgentState) -> AgentState:
         return {"current_intent": "faq"}
 
     last_message = messages[-1].content.lower().strip()
-
-    # Context-aware check (Synchronous part, fast)
     previous_intent = state.get("current_intent")
-    if len(messages) >= 2:
-        last_assistant_msg = None
-        for msg in reversed(messages[:-1]):
-            if hasattr(msg, 'type') and msg.type == 'ai':
-                last_assistant_msg = msg.content.lower()
-                break
-        
-        if previous_intent == "booking" and last_assistant_msg:
-            booking_keywords = ["which doctor", "service you need", "preferred time", "date and time", 
-                              "available doctors", "available services", "select the service"]
-            if any(keyword in last_assistant_msg for keyword in booking_keywords):
-                return {"current_intent": "booking"}
-
-    # LLM Classification
+    classifier = await aget_router_classifier()
+    prediction = await classifier.apredict(last_message) if classifier else None
+
+    # Mid-flow replies ("Dr. Hind", "tomorrow at 10") go straight back to the owning agent
+    flow_intent = await continue_flow(state, prediction)
+    if flow_intent:
+        debug.print_classification("INTENT", flow_intent, "flow")
+        return {
+            "current_intent": flow_intent,
+            "intent_source": "flow",
+            "ticket_types": _with_ticket_type(state, flow_intent)
+        }
+
+    final_intent = None
+    intent_source = "llm"
+
+    # Local pre-classifier: answer without a remote call when confident.
+    # Leaving a booking/management conversation is left to the LLM, which sees context.
+    if prediction and prediction.confident:
+        if previous_intent not in ("booking", "management") or prediction.label == previous_intent:
+            final_intent = prediction.label
+            intent_source = "local"
+            classifier.stats.record_hit()
+            if classifier.should_shadow():
+                run_in_background(_shadow_check(classifier, messages, last_message, prediction.label),
+                                  name="intent-shadow-check")
+
+    # LLM Classification (fallback)
+    if final_intent is None:
+        try:
+            final_intent = await _classify_with_llm(messages, last_message, prediction)
+            if prediction:
+                classifier.stats.record_fallback(prediction.label, final_intent)
+        except OutputBudgetExhausted as e:
+            # No label came back: keep the best guess we have instead of defaulting to "faq"
+            print(f"Intent classification failed ({e}); using the local prediction")
+            final_intent = prediction.label if prediction else previous_intent or "faq"
+            intent_source = "fallback"
+
+    debug.print_classification("INTENT", final_intent, intent_source,
+                               prediction.confidence if prediction else None)
+
+    return {
+        "current_intent": final_intent,
+        "intent_source": intent_source,
+        "ticket_types": _with_ticket_type(state, final_intent),
+        **leave_flow(state, final_intent),
+    }
+
+
+def _with_ticket_type(state: AgentState, intent: str) -> list:
+    """Ticket types for the conversation, including this turn's intent"""
+    ticket_types = state.get("ticket_types", [])
+    if intent not in ticket_types:
+        ticket_types.append(intent)
+    return ticket_types
+
+
+def build_context_prompt(messages: list, last_message: str) -> str:
+    """Render the last few turns plus the current message for LLM classification"""
     recent_messages = messages[-4:] if len(messages) > 4 else messages
     context = "\n".join([
         f"{'User' if hasattr(msg, 'type') and msg.type == 'human' else 'Assistant'}: {msg.content}"
         for msg in recent_messages[:-1]
     ])
     
-    prompt = f"""Previous conversation:
+    return f"""Previous conversation:
 {context}
 
 Current user message: {last_message}
 
 Based on the conversation context and the current message, classify the intent."""
 
-    response = await llm_router.ainvoke([
+
+async def _classify_with_llm(messages: list, last_message: str, prediction=None) -> str:
+    """
+    Classify the current message with the router LLM using recent context.
+
+    With CASCADE_ENABLED the small model answers first; its label is kept
+    when confident (logprobs, or agreement with the local prediction).
+    """
+    prompt = [
         SystemMessage(content=ROUTER_SYSTEM_PROMPT),
-        HumanMessage(content=prompt)
-    ])
-    
+        HumanMessage(content=build_context_prompt(messages, last_message))
+    ]
+    expected = prediction.label if prediction else None
+    response = await run_cascade(
+        "intent",
+        small=lambda: _router_small.ainvoke(prompt),
+        large=lambda: _router.ainvoke(prompt),
+        accept=lambda r: accept_label(r, r.content.strip().lower(), VALID_INTENTS, expected),
+    )
+
     intent = response.content.strip().lower()
-    valid_intents = ["faq", "booking", "management", "escalate"]
-    final_intent = intent if intent in valid_intents else "faq"
-    
-    # Update ticket types
-    ticket_types = state.get("ticket_types", [])
-    if final_intent not in ticket_types:
-        ticket_types.append(final_intent)
+    return intent if intent in VALID_INTENTS else "faq"
 
-    return {
-        "current_intent": final_intent,
-        "ticket_types": ticket_types
-    }
+
+async def _shadow_check(classifier, messages: list, last_message: str, local_label: str):
+    """Background LLM spot check of a local hit, used only for agreement stats"""
+    try:
+        llm_label = await _classify_with_llm(messages, last_message)
+        classifier.stats.record_comparison(local_label, llm_label)
+    except Exception as e:
+        print(f"Intent shadow check failed: {e}")
+
+
+def get_router_classifier():
+    """
+    Get the local intent pre-classifier seeded from ROUTER_SYSTEM_PROMPT.
+
+    Returns:
+        IntentPreClassifier, or None if disabled in settings
+    """
+    if not settings.intent_classifier_enabled:
+        return None
+    return get_intent_classifier(ROUTER_SYSTEM_PROMPT)
+
+
+_router_classifier_seeded = False
+
+
+async def aget_router_classifier():
+    """
+    get_router_classifier for the graph nodes: the first call seeds the
+    classifier on the blocking pool (ticket examples come from Supabase), so
+    building the graph needs no database access and the event loop never waits.
+
+    Returns:
+        IntentPreClassifier, or None if disabled in settings
+    """
+    global _router_classifier_seeded
+    if not settings.intent_classifier_enabled:
+        return None
+    if not _router_classifier_seeded:
+        classifier = await run_blocking(get_router_classifier)
+        _router_classifier_seeded = True
+        return classifier
+    return get_router_classifier()
@@ -17,7 +17,7 @@ def placeholder_node(state: AgentState) -> AgentState:
         state: Current agent state
 
     Returns:
-        Updated state with placeholder message
+        State update with the placeholder message
     """
 
     intent = state.get("current_intent", "unknown")
@@ -53,11 +53,8 @@ def placeholder_node(state: AgentState) -> AgentState:
         "Please call us at +966-11-234-5678 for assistance."
     )
 
-    # Add AI message
-    ai_message = AIMessage(content=message_content)
-    state["messages"].append(ai_message)
-
-    # End conversation
-    state["next_agent"] = "end"
-
-    return state
+    # Only the new message and the routing change (the messages reducer appends it)
+    return {
+        "messages": [AIMessage(content=message_content)],
+        "next_agent": "end",
+    }
@@ -1,11 +1,22 @@
 """
 Sentiment Analysis Node
 Guardrail that checks for hostility and emergencies.
+
+Two tiers: a compiled English/Arabic keyword matcher settles clearly critical
+and plainly benign (allow-listed) messages instantly; everything else reaches
+the LLM. A sample of the benign decisions is re-checked by the LLM
+(SENTIMENT_AUDIT_RATE).
 """
 
 from langchain_core.messages import HumanMessage, SystemMessage
+from src.config.settings import settings
 from src.graph.state import AgentState
-from src.llm.client import llm_router
+from src.llm.budget import with_budget
+from src.llm.cascade import accept_label, run_cascade
+from src.llm.client import llm_router, llm_router_small
+from src.classifiers.sentiment_lexicon import check_message, guardrail_stats
+from src.utils.concurrency import run_in_background
+from src.utils.debug import debug
 
 # System prompt for sentiment analysis
 SENTIMENT_SYSTEM_PROMPT = """You are a sentiment analysis guardrail.
@@ -19,6 +30,12 @@ Return a JSON object with:
 Keywords for escalation: lawsuit, sue, police, lawyer, suicide, kill myself, emergency, bleeding heavily.
 """
 
+SENTIMENT_LABELS = ("positive", "neutral", "negative", "hostile")
+
+# Router clients with the sentiment budget
+_router = with_budget(llm_router, "sentiment")
+_router_small = with_budget(llm_router_small, "sentiment")
+
 async def sentiment_node(state: AgentState) -> AgentState:
     """
     Analyzes sentiment and checks for escalation triggers.
@@ -28,25 +45,86 @@ async def sentiment_node(state: AgentState) -> AgentState:
         return {"sentiment_score": "neutral", "should_escalate": False}
 
     last_message = messages[-1].content.lower().strip()
-    
+
+    # Tier 1: lexical fast path
+    if settings.sentiment_fast_path:
+        # Raw content (not lowercased) so shouting can be detected
+        verdict = check_message(messages[-1].content, state.get("original_input"))
+
+        if verdict.decision != "ambiguous":
+            should_escalate = verdict.decision == "escalate"
+            guardrail_stats.record("lexical", should_escalate)
+            debug.print_classification("SENTIMENT", verdict.sentiment, "lexical")
+
+            if not should_escalate:
+                audit_lexical_benign(last_message)
+
+            return {
+                "sentiment_score": verdict.sentiment,
+                "should_escalate": should_escalate,
+                "escalation_reason": f"Detected {verdict.reason}" if should_escalate else None,
+                "sentiment_tier": "lexical",
+            }
+
+    # Tier 2: LLM for ambiguous messages
     try:
-        response = await llm_router.ainvoke([
-            SystemMessage(content=SENTIMENT_SYSTEM_PROMPT),
-            HumanMessage(content=f"User message: {last_message}")
-        ])
-        
-        content = response.content.lower()
-        should_escalate = "true" in content and ("hostile" in content or "emergency" in content)
-        sentiment = "neutral"
-        if "hostile" in content: sentiment = "hostile"
-        elif "negative" in content: sentiment = "negative"
-        elif "positive" in content: sentiment = "positive"
-        
+        sentiment, should_escalate = await _classify_with_llm(last_message)
+        guardrail_stats.record("llm", should_escalate)
+        debug.print_classification("SENTIMENT", sentiment, "llm")
+
         return {
             "sentiment_score": sentiment,
             "should_escalate": should_escalate,
-            "escalation_reason": "Detected hostility" if should_escalate else None
+            "escalation_reason": "Detected hostility" if should_escalate else None,
+            "sentiment_tier": "llm",
         }
     except Exception as e:
         print(f"Sentiment check failed: {e}")
-        return {"sentiment_score": "neutral", "should_escalate": False}
+        return {"sentiment_score": "neutral", "should_escalate": False, "sentiment_tier": "llm"}
+
+
+async def _classify_with_llm(last_message: str) -> tuple[str, bool]:
+    """
+    Ask the router LLM for sentiment; returns (sentiment, should_escalate).
+
+    With CASCADE_ENABLED the small model answers first and is kept only when
+    its logprobs show it confident about the sentiment label.
+    """
+    prompt = [
+        SystemMessage(content=SENTIMENT_SYSTEM_PROMPT),
+        HumanMessage(content=f"User message: {last_message}")
+    ]
+    response = await run_cascade(
+        "sentiment",
+        small=lambda: _router_small.ainvoke(prompt),
+        large=lambda: _router.ainvoke(prompt),
+        accept=lambda r: accept_label(r, _parse_sentiment(r.content)[0], SENTIMENT_LABELS),
+    )
+    return _parse_sentiment(response.content)
+
+
+def _parse_sentiment(content: str) -> tuple[str, bool]:
+    """Read (sentiment, should_escalate) from the LLM's answer"""
+    content = content.lower()
+    should_escalate = "true" in content and ("hostile" in content or "emergency" in content)
+    sentiment = "neutral"
+    if "hostile" in content: sentiment = "hostile"
+    elif "negative" in content: sentiment = "negative"
+    elif "positive" in content: sentiment = "positive"
+
+    return sentiment, should_escalate
+
+
+def audit_lexical_benign(last_message: str):
+    """Start a background LLM re-check of a lexical "benign" decision for SENTIMENT_AUDIT_RATE of messages"""
+    if guardrail_stats.should_audit():
+        run_in_background(_audit_benign(last_message), name="sentiment-audit")
+
+
+async def _audit_benign(last_message: str):
+    """Background LLM re-check of a lexical 'benign' decision (audit only)"""
+    try:
+        _, should_escalate = await _classify_with_llm(last_message)
+        guardrail_stats.record_audit(should_escalate)
+    except Exception as e:
+        print(f"Sentiment audit failed: {e}")
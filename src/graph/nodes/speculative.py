@@ -0,0 +1,113 @@
+"""
+Speculative Classification Node
+Runs sentiment and intent in parallel and starts the chosen agent as soon as
+intent is known, instead of waiting for the sentiment guardrail.
+
+The classifiers are the ones the regular workflow uses (CLASSIFIER_MODE), and
+every step is recorded as its own telemetry span like a regular graph node.
+"""
+
+import asyncio
+from langchain_core.callbacks import adispatch_custom_event
+from src.config.settings import settings
+from src.graph.state import AgentState
+from src.utils.speculation import GUARDRAIL_CLEARED_EVENT, open_gate, reset_gate
+from src.utils.telemetry import instrument_node
+from src.graph.nodes.sentiment import sentiment_node
+from src.graph.nodes.intent import intent_node
+from src.graph.nodes.classify import classify_node
+from src.graph.nodes.decision import decision_node
+from src.graph.nodes.faq_agent import faq_agent_node
+from src.graph.nodes.booking_agent import booking_agent_node
+from src.graph.nodes.management_agent import management_agent_node
+from src.utils.debug import debug
+
+
+# Agents that may be started before the guardrail result is known
+SPECULATIVE_AGENTS = {
+    "faq": instrument_node("faq_agent", faq_agent_node),
+    "booking": instrument_node("booking_agent", booking_agent_node),
+    "management": instrument_node("management_agent", management_agent_node),
+}
+
+_sentiment = instrument_node("sentiment", sentiment_node)
+_intent = instrument_node("intent", intent_node)
+_classify = instrument_node("classify", classify_node)
+
+
+async def _cancel_pending(*tasks: asyncio.Task):
+    """Cancel the tasks that are still running and wait for them to finish"""
+    pending = [task for task in tasks if task is not None and not task.done()]
+    for task in pending:
+        task.cancel()
+    # Also retrieves the exceptions of finished tasks, so none is reported as never retrieved
+    await asyncio.gather(*(task for task in tasks if task is not None), return_exceptions=True)
+
+
+async def speculative_node(state: AgentState) -> AgentState:
+    """
+    Classify the turn and run the specialist agent speculatively.
+
+    Flow:
+    1. Sentiment and intent start in parallel (CLASSIFIER_MODE=combined: one
+       classify call answers both, so the agent starts once it returns)
+    2. As soon as intent returns, the chosen agent starts running
+    3. If sentiment escalates, the agent run is cancelled and its output discarded
+    4. Otherwise the agent's reply is returned together with both classifications
+
+    Side-effecting tools wait for the guardrail (see wait_for_guardrail), so a
+    cancelled run can never have booked, cancelled or emailed anything.
+    """
+    if settings.classifier_mode == "combined":
+        sentiment_task = asyncio.create_task(_classify(state))
+    else:
+        sentiment_task = asyncio.create_task(_sentiment(state))
+    agent_task = None
+    try:
+        # The combined result carries the intent too
+        intent_result = await (sentiment_task if settings.classifier_mode == "combined" else _intent(state))
+
+        agent_node = SPECULATIVE_AGENTS.get(intent_result.get("current_intent"))
+        if agent_node is None:
+            # Nothing to speculate on (e.g. explicit escalation) - plain decision
+            sentiment_result = await sentiment_task
+            merged = {**state, **intent_result, **sentiment_result}
+            return {**intent_result, **sentiment_result, **decision_node(merged)}
+
+        # Start the agent behind a guardrail gate (agents return deltas, so the state is not mutated)
+        speculative_state = {**state, **intent_result}
+        gate, token = open_gate()
+        try:
+            agent_task = asyncio.create_task(agent_node(speculative_state))
+        finally:
+            reset_gate(token)
+
+        sentiment_result = await sentiment_task
+        merged = {**state, **intent_result, **sentiment_result}
+        decision = decision_node(merged)
+
+        if decision["next_agent"] != intent_result["current_intent"]:
+            # Guardrail overrode the intent - throw the speculative run away (in finally)
+            debug.print_error(f"Speculative {intent_result['current_intent']} run discarded (escalation)")
+            return {
+                **intent_result,
+                **sentiment_result,
+                "current_intent": "escalate",
+                "escalated": True,
+                **decision,
+            }
+
+        # Guardrail cleared - release any tools waiting on it (and held streamed tokens) and collect the reply
+        gate.set()
+        await adispatch_custom_event(GUARDRAIL_CLEARED_EVENT, {})
+        agent_result = await agent_task
+
+        return {
+            **intent_result,
+            **sentiment_result,
+            **agent_result,  # Reply, history bookkeeping, errors and next_agent="end"
+        }
+    finally:
+        # Intent failed, the run was discarded or this node was cancelled: nothing may keep running
+        # (an agent left waiting on the gate would block forever)
+        await _cancel_pending(sentiment_task, agent_task)
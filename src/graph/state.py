@@ -18,6 +18,12 @@ class AgentState(TypedDict):
     # Conversation context
     messages: Annotated[list, add_messages]  # LangChain messages with automatic deduplication
     current_intent: Optional[str]  # Current classified intent: "faq", "booking", "management", "escalate"
+    intent_source: Optional[str]  # Which tier classified the intent: "local", "llm", "flow", "fallback"
+
+    # Bounded agent history (older turns folded into a rolling summary)
+    history_summary: Optional[str]  # Rolling summary of messages no longer sent verbatim
+    history_summarized_count: int  # How many of the oldest messages the summary covers
+    history_tokens: Optional[dict]  # Estimated history tokens {"before": n, "after": n} for the last turn
 
     # TRT (Translate-Reason-Translate) architecture
     original_language: Optional[str]  # "arabic" or "english" - tracks user's input language
@@ -37,6 +43,12 @@ class AgentState(TypedDict):
     selected_time_slot: Optional[str]  # ISO format datetime string
     appointment_id: Optional[str]  # For modifications/cancellations
 
+    # Dialogue flow (slot filling across turns, see src/graph/dialogue.py)
+    active_flow: Optional[str]  # "booking", "cancel", "reschedule" or None
+    flow_step: Optional[str]  # Next slot to fill: "service", "doctor", "time", "appointment", "confirmation"
+    flow_turns: int  # Agent turns spent in the active flow
+    unconfirmed_slots: list[str]  # selected_* fields read from the patient's message, not yet reported by a tool
+
     # Error handling
     error_count: int  # Track number of errors for graceful degradation
     last_error: Optional[str]  # Last error message for debugging
@@ -51,6 +63,7 @@ class AgentState(TypedDict):
     sentiment_score: Optional[str]  # "positive", "neutral", "negative", "hostile"
     escalation_reason: Optional[str]  # Why we are escalating
     should_escalate: bool  # Signal to override normal routing
+    sentiment_tier: Optional[str]  # Which guardrail tier decided: "lexical" or "llm"
 
     # Agent routing
     next_agent: Optional[str]  # Next agent to route to: "faq", "booking", "management", "end"
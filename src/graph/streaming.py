@@ -0,0 +1,123 @@
+"""
+Response Streaming
+Streams the specialist agent's answer out of a graph run as its tokens arrive.
+
+Only LLM runs tagged PATIENT_FACING_TAG (the specialist agents) are streamed;
+classifier, summary and translation calls never are. A run's text is held
+only until it is known not to be a tool call (see _RunBuffer).
+"""
+
+from dataclasses import dataclass
+from typing import AsyncIterator
+from langchain_core.runnables import RunnableConfig
+from src.graph.executors import PATIENT_FACING_TAG
+from src.graph.state import AgentState
+from src.utils.speculation import GUARDRAIL_CLEARED_EVENT
+
+
+@dataclass
+class _RunBuffer:
+    """
+    Per-LLM-run text, held until the run is known to be an answer.
+
+    Providers send tool-call deltas before any content, so a run is an answer
+    from its first non-blank content chunk with no tool call before it; from
+    then on its text is released as it arrives. Runs that start a tool call
+    drop their text. If a model writes text and only then calls a tool, the
+    text has already gone out; astream_turn follows it with the final reply.
+    """
+    text: str = ""
+    tool_call: bool = False
+    answering: bool = False
+
+    def feed(self, content: str) -> str:
+        """Add streamed content; return the text that can be sent now"""
+        if self.tool_call:
+            return ""
+        if self.answering:
+            return content
+        self.text += content
+        if not self.text.strip():
+            return ""
+        self.answering = True
+        text, self.text = self.text, ""
+        return text
+
+    def start_tool_call(self):
+        """A tool-call delta arrived: drop whatever is still held"""
+        self.tool_call = True
+        self.text = ""
+
+    def finish(self) -> str:
+        """The run ended; return the text still held (none after a tool call)"""
+        text, self.text = ("" if self.tool_call else self.text), ""
+        return text
+
+
+async def astream_turn(app, state: AgentState, config: RunnableConfig) -> AsyncIterator[dict]:
+    """
+    Run one graph turn and stream the patient-facing answer.
+
+    Yields:
+        {"type": "token", "text": ...} for each piece of answer text as it arrives, then
+        {"type": "final", "state": final_state}. If the final message is not
+        what was streamed (handoff, error fallback after partial output) it is
+        emitted as one more token.
+    """
+    runs: dict[str, _RunBuffer] = {}
+    held: list[str] = []  # Speculative output waiting for the guardrail
+    guardrail_cleared = False
+    streamed = []
+    final_state = None
+
+    async for event in app.astream_events(state, config=config, version="v2"):
+        kind = event["event"]
+
+        if kind == "on_custom_event" and event["name"] == GUARDRAIL_CLEARED_EVENT:
+            guardrail_cleared = True
+            for text in held:
+                streamed.append(text)
+                yield {"type": "token", "text": text}
+            held.clear()
+            continue
+
+        if kind == "on_chain_end" and not event.get("parent_ids"):
+            final_state = event["data"].get("output")
+            continue
+
+        if kind not in ("on_chat_model_stream", "on_chat_model_end"):
+            continue
+        if PATIENT_FACING_TAG not in event.get("tags", []):
+            continue
+
+        run = runs.setdefault(event["run_id"], _RunBuffer())
+        if kind == "on_chat_model_stream":
+            chunk = event["data"]["chunk"]
+            if getattr(chunk, "tool_call_chunks", None) or chunk.additional_kwargs.get("tool_calls"):
+                run.start_tool_call()
+                continue
+            text = run.feed(chunk.content if isinstance(chunk.content, str) else "")
+        else:
+            if getattr(event["data"].get("output"), "tool_calls", None):
+                run.start_tool_call()
+            text = run.finish()
+
+        if not text:
+            continue
+        # A speculative agent may still be discarded by the guardrail
+        if event.get("metadata", {}).get("langgraph_node") == "speculative" and not guardrail_cleared:
+            held.append(text)
+            continue
+        streamed.append(text)
+        yield {"type": "token", "text": text}
+
+    if final_state is None:
+        final_state = await app.aget_state(config)
+        final_state = final_state.values
+
+    reply = final_state["messages"][-1].content if final_state.get("messages") else ""
+    if reply and "".join(streamed).strip() != reply.strip():
+        # Nothing streamed (handoff, cached answer) or the agent fell back after partial output
+        yield {"type": "token", "text": f"\n\n{reply}" if streamed else reply}
+
+    yield {"type": "final", "state": final_state}
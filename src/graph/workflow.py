@@ -4,17 +4,25 @@ Defines the state graph and routing logic
 """
 
 import uuid
+from typing import Optional
 from datetime import datetime
+from langchain_core.messages import RemoveMessage
 from langgraph.graph import StateGraph, END
+from src.config.settings import settings
 from src.graph.state import AgentState
+from src.graph.executors import build_executors
+from src.graph.checkpoint import get_checkpointer, thread_config
 from src.graph.nodes.sentiment import sentiment_node
 from src.graph.nodes.intent import intent_node
 from src.graph.nodes.decision import decision_node
+from src.graph.nodes.classify import classify_node
 from src.graph.nodes.faq_agent import faq_agent_node
 from src.graph.nodes.booking_agent import booking_agent_node
 from src.graph.nodes.management_agent import management_agent_node
 from src.graph.nodes.placeholder import placeholder_node
 from src.graph.nodes.human_handoff import human_handoff_node
+from src.graph.nodes.speculative import speculative_node
+from src.utils.telemetry import instrument_node
 
 
 def route_to_agent(state: AgentState) -> str:
@@ -77,26 +85,39 @@ def create_workflow():
         Compiled LangGraph application
     """
 
+    # Build the specialist agent executors once; nodes reuse them every turn
+    build_executors()
+
+    if settings.speculative_execution:
+        return create_speculative_workflow()
+
     # Initialize the state graph
     workflow = StateGraph(AgentState)
 
-    # Add nodes
-    workflow.add_node("sentiment", sentiment_node)
-    workflow.add_node("intent", intent_node)
-    workflow.add_node("decision", decision_node)
-    workflow.add_node("faq_agent", faq_agent_node)
-    workflow.add_node("booking_agent", booking_agent_node)
-    workflow.add_node("management_agent", management_agent_node)
-    workflow.add_node("placeholder", placeholder_node)
-    workflow.add_node("human_handoff", human_handoff_node)
-
-    # Set entry point - Start goes to BOTH sentiment and intent in parallel
-    workflow.set_entry_point("sentiment")
-    workflow.set_entry_point("intent")
-    
-    # Both parallel nodes feed into decision
-    workflow.add_edge("sentiment", "decision")
-    workflow.add_edge("intent", "decision")
+    # Add nodes (each wrapped to record a per-turn telemetry span)
+    workflow.add_node("decision", instrument_node("decision", decision_node))
+    workflow.add_node("faq_agent", instrument_node("faq_agent", faq_agent_node))
+    workflow.add_node("booking_agent", instrument_node("booking_agent", booking_agent_node))
+    workflow.add_node("management_agent", instrument_node("management_agent", management_agent_node))
+    workflow.add_node("placeholder", instrument_node("placeholder", placeholder_node))
+    workflow.add_node("human_handoff", instrument_node("human_handoff", human_handoff_node))
+
+    if settings.classifier_mode == "combined":
+        # One structured call classifies intent and sentiment together
+        workflow.add_node("classify", instrument_node("classify", classify_node))
+        workflow.set_entry_point("classify")
+        workflow.add_edge("classify", "decision")
+    else:
+        workflow.add_node("sentiment", instrument_node("sentiment", sentiment_node))
+        workflow.add_node("intent", instrument_node("intent", intent_node))
+
+        # Set entry point - Start goes to BOTH sentiment and intent in parallel
+        workflow.set_entry_point("sentiment")
+        workflow.set_entry_point("intent")
+
+        # Both parallel nodes feed into decision
+        workflow.add_edge("sentiment", "decision")
+        workflow.add_edge("intent", "decision")
 
     # Add conditional routing from decision to specialized agents
     workflow.add_conditional_edges(
@@ -119,12 +140,126 @@ def create_workflow():
     workflow.add_edge("placeholder", END)
     workflow.add_edge("human_handoff", END)
 
-    # Compile the graph
-    app = workflow.compile()
+    # Compile the graph (checkpoints are keyed by conversation_id via thread_config)
+    app = workflow.compile(checkpointer=get_checkpointer())
 
     return app
 
 
+def create_speculative_workflow():
+    """
+    Create the opt-in speculative variant of the workflow.
+
+    Sentiment, intent and the chosen agent all run inside a single
+    speculative node; only escalations continue to the human handoff node.
+
+    Returns:
+        Compiled LangGraph application
+    """
+    workflow = StateGraph(AgentState)
+
+    workflow.add_node("speculative", instrument_node("speculative", speculative_node))
+    workflow.add_node("human_handoff", instrument_node("human_handoff", human_handoff_node))
+
+    workflow.set_entry_point("speculative")
+
+    # The agent already ran inside the speculative node unless we escalated
+    workflow.add_conditional_edges(
+        "speculative",
+        route_to_agent,
+        {
+            "human_handoff": "human_handoff",
+            END: END,
+        }
+    )
+    workflow.add_edge("human_handoff", END)
+
+    return workflow.compile(checkpointer=get_checkpointer())
+
+
+async def load_conversation(app, conversation_id: str) -> Optional[AgentState]:
+    """
+    Resume a conversation from its last checkpoint.
+
+    Args:
+        app: Compiled workflow (must have a checkpointer)
+        conversation_id: Conversation to resume
+
+    Returns:
+        The saved AgentState, or None if there is no checkpoint for it
+    """
+    if app.checkpointer is None:
+        return None
+    snapshot = await app.aget_state(thread_config(conversation_id))
+    return snapshot.values or None
+
+
+# State fields the caller sets between turns (everything else is written by the graph)
+CALLER_FIELDS = ("original_language", "original_input", "error_count", "last_error")
+
+
+def turn_input(app, state: AgentState, new_messages: int = 1) -> dict:
+    """
+    Graph input for one turn.
+
+    Without a checkpointer the graph only sees what it is given, so the whole
+    state is sent. With one, the thread already holds the conversation: only
+    this turn's input messages and the caller-set fields are sent, so the
+    reducer merges one message per turn instead of the whole history. A
+    thread's first run sends everything (including the patient fields).
+
+    Args:
+        app: Compiled workflow
+        state: Caller's state with this turn's input appended
+        new_messages: Number of messages appended for this turn
+
+    Returns:
+        Input for app.ainvoke / astream_turn
+    """
+    if app.checkpointer is None or len(state["messages"]) <= new_messages:
+        return state
+    return {"messages": state["messages"][-new_messages:], **{key: state.get(key) for key in CALLER_FIELDS}}
+
+
+def fail_turn(app, state: AgentState, error: BaseException, failed_inputs: list):
+    """
+    Drop the unanswered input of a failed turn so a retry does not see it twice.
+
+    Args:
+        app: Compiled workflow
+        state: Caller's state, with the failed input as its last message
+        error: Why the turn failed (recorded in last_error)
+        failed_inputs: Receives the input's message ID when it was already written
+            to the checkpointed thread (remove it with discard_failed_inputs)
+    """
+    failed = state["messages"].pop()
+    if app.checkpointer is not None:
+        # Removed from the thread before the next turn (this may run mid-cancellation)
+        failed_inputs.append(failed.id)
+    state["error_count"] = state.get("error_count", 0) + 1
+    state["last_error"] = str(error)
+
+
+async def discard_failed_inputs(app, conversation_id: str, failed_inputs: list):
+    """
+    Remove the inputs recorded by fail_turn from the checkpointed thread.
+
+    Args:
+        app: Compiled workflow
+        conversation_id: Conversation the inputs belong to
+        failed_inputs: Message IDs to remove (cleared afterwards)
+    """
+    if not failed_inputs:
+        return
+    config = thread_config(conversation_id)
+    for message_id in failed_inputs:
+        try:
+            await app.aupdate_state(config, {"messages": [RemoveMessage(id=message_id)]})
+        except Exception as e:  # E.g. the run failed before its input was written
+            print(f"Could not remove failed input {message_id} from {conversation_id}: {e}")
+    failed_inputs.clear()
+
+
 def initialize_state(conversation_id: str = None) -> AgentState:
     """
     Initialize a new conversation state.
@@ -137,6 +272,9 @@ def initialize_state(conversation_id: str = None) -> AgentState:
     """
     return {
         "messages": [],
+        "history_summary": None,
+        "history_summarized_count": 0,
+        "history_tokens": None,
         "current_intent": None,
         "patient_id": None,
         "patient_name": None,
@@ -148,6 +286,10 @@ def initialize_state(conversation_id: str = None) -> AgentState:
         "selected_service_name": None,
         "selected_time_slot": None,
         "appointment_id": None,
+        "active_flow": None,
+        "flow_step": None,
+        "flow_turns": 0,
+        "unconfirmed_slots": [],
         "error_count": 0,
         "last_error": None,
         "conversation_id": conversation_id or str(uuid.uuid4()),
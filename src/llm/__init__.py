@@ -1,4 +1,4 @@
 """LLM client module"""
-from .client import get_llm, llm_router, llm_agent
+from .client import get_llm, llm_router, llm_agent, llm_faq
 
-__all__ = ["get_llm", "llm_router", "llm_agent"]
+__all__ = ["get_llm", "llm_router", "llm_agent", "llm_faq"]
@@ -0,0 +1,286 @@
+"""
+Token Budgets
+Per call site output cap (max_tokens) and prompt budget for every LLM call.
+
+The prompt is measured locally before it is sent. When it is over the call
+site's input budget, it is trimmed in priority order until it fits:
+1. History: the oldest conversation messages before the current input
+   (the rolling summary and pinned booking facts are kept)
+2. Retrieved context: tool results, longest first
+3. Examples: example blocks in the system prompt
+
+The current message and the instructions are never trimmed; a prompt that
+still does not fit is sent as is and counted as unresolved. Overruns are
+counted per call site and in the turn's telemetry record.
+
+Label call sites have caps too small for the model to reason first, so
+reasoning is switched off for them. A response cut off by the cap before
+any content is raised as OutputBudgetExhausted rather than read as an answer.
+"""
+
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Optional
+from langchain_core.messages import BaseMessage
+from src.config.settings import settings
+from src.utils.telemetry import current_turn
+from src.utils.tokens import estimate_message_tokens, estimate_tokens
+
+
+@dataclass(frozen=True)
+class CallBudget:
+    """Token limits for one call site"""
+    max_tokens: int  # Output cap sent with the request
+    input_tokens: int  # Prompt budget, measured locally
+    reasoning: bool = True  # False: ask the provider not to reason (label call sites)
+
+
+# Defaults per call site (override with TOKEN_BUDGETS="intent=16/1500,faq=800/6000")
+DEFAULT_BUDGETS: Dict[str, CallBudget] = {
+    "intent": CallBudget(max_tokens=16, input_tokens=1500, reasoning=False),  # One label
+    "sentiment": CallBudget(max_tokens=96, input_tokens=800, reasoning=False),  # Three short fields
+    "classify": CallBudget(max_tokens=192, input_tokens=2500, reasoning=False),  # Structured intent + sentiment
+    "history_summary": CallBudget(max_tokens=320, input_tokens=3000),  # Summary under 120 words
+    "faq": CallBudget(max_tokens=600, input_tokens=6000),
+    "booking": CallBudget(max_tokens=1000, input_tokens=9000),
+    "management": CallBudget(max_tokens=1000, input_tokens=9000),
+    "translation": CallBudget(max_tokens=1500, input_tokens=4000),
+    "ticket": CallBudget(max_tokens=600, input_tokens=12000),  # Whole conversation, once per session
+}
+
+# Retrieved context is never cut below this many tokens per tool result
+MIN_CONTEXT_TOKENS = 150
+
+# Section headers that open / close an examples block in a system prompt
+_EXAMPLES_START = re.compile(r"^\s*(\*\*Example[^\n]*\*\*:?|Examples?:)\s*$")
+_SECTION_HEADER = re.compile(r"^\s*\*\*[^\n]+\*\*:?\s*$")
+
+# Sent with requests of call sites whose budget has reasoning=False (OpenRouter)
+NO_REASONING = {"reasoning": {"enabled": False}}
+
+_budgets: Optional[Dict[str, CallBudget]] = None
+
+
+class OutputBudgetExhausted(Exception):
+    """The output cap was reached before the model wrote any content"""
+
+
+def get_budget(site: str) -> CallBudget:
+    """
+    Budget for a call site (defaults plus TOKEN_BUDGETS overrides).
+
+    Args:
+        site: Call site name (e.g., "intent", "faq")
+
+    Returns:
+        CallBudget for the site
+
+    Raises:
+        KeyError: If the site has no budget
+    """
+    global _budgets
+    if _budgets is None:
+        budgets = dict(DEFAULT_BUDGETS)
+        for spec in filter(None, (part.strip() for part in settings.token_budgets.split(","))):
+            try:
+                name, _, limits = spec.partition("=")
+                max_tokens, _, input_tokens = limits.partition("/")
+                default = DEFAULT_BUDGETS.get(name.strip())
+                budgets[name.strip()] = CallBudget(int(max_tokens), int(input_tokens),
+                                                   reasoning=default.reasoning if default else True)
+            except ValueError:
+                print(f"Ignoring invalid TOKEN_BUDGETS entry '{spec}' (expected site=max_tokens/input_tokens)")
+        _budgets = budgets
+    return _budgets[site]
+
+
+class BudgetStats:
+    """Prompt sizes and overruns per call site"""
+
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self.max_prompt_tokens = defaultdict(int)
+        self.overruns = defaultdict(int)  # Prompts over the input budget before trimming
+        self.unresolved = defaultdict(int)  # Still over after trimming
+        self.trimmed_tokens = defaultdict(int)
+        self.exhausted = defaultdict(int)  # Responses cut off by max_tokens with no content
+
+    def summary(self) -> dict:
+        return {
+            site: {
+                "calls": self.calls[site],
+                "max_prompt_tokens": self.max_prompt_tokens[site],
+                "input_budget": get_budget(site).input_tokens,
+                "overruns": self.overruns[site],
+                "unresolved": self.unresolved[site],
+                "trimmed_tokens": self.trimmed_tokens[site],
+                "exhausted": self.exhausted[site],
+            }
+            for site in self.calls
+        }
+
+
+budget_stats = BudgetStats()
+
+
+def _tokens(message: BaseMessage) -> int:
+    return estimate_message_tokens([message])
+
+
+def _truncate(text: str, tokens: int) -> str:
+    """Cut text to about `tokens` tokens, at a paragraph or line break when possible"""
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    for separator in ("\n\n", "\n", ". "):
+        index = cut.rfind(separator)
+        if index > limit // 2:
+            cut = cut[:index]
+            break
+    return cut.rstrip() + "\n[truncated to fit the token budget]"
+
+
+def strip_examples(text: str) -> str:
+    """Remove example blocks ("**Example Flow:**", "Examples:") from a system prompt"""
+    kept, skipping = [], False
+    for line in text.split("\n"):
+        if _EXAMPLES_START.match(line):
+            skipping = True
+            continue
+        if skipping and _SECTION_HEADER.match(line) and not line.strip().startswith("**Example"):
+            skipping = False
+        if not skipping:
+            kept.append(line)
+    return "\n".join(kept).rstrip()
+
+
+def trim_prompt(messages: list, limit: int) -> list:
+    """
+    Trim a prompt to an input budget (history, then retrieved context, then examples).
+
+    Args:
+        messages: Prompt messages as they would be sent
+        limit: Input budget in estimated tokens
+
+    Returns:
+        New message list (the input list is not modified)
+    """
+    messages = list(messages)
+    excess = estimate_message_tokens(messages) - limit
+    if excess <= 0:
+        return messages
+
+    # 1. History: plain conversation messages before the current input, oldest first
+    humans = [i for i, m in enumerate(messages) if m.type == "human"]
+    current = humans[-1] if humans else len(messages)
+    history = [i for i, m in enumerate(messages[:current])
+               if m.type in ("human", "ai") and not getattr(m, "tool_calls", None)]
+    dropped = set()
+    for i in history:
+        if excess <= 0:
+            break
+        dropped.add(i)
+        excess -= _tokens(messages[i])
+    messages = [m for i, m in enumerate(messages) if i not in dropped]
+
+    # 2. Retrieved context: tool results, longest first
+    tool_results = sorted((i for i, m in enumerate(messages) if m.type == "tool"),
+                          key=lambda i: -_tokens(messages[i]))
+    for i in tool_results:
+        if excess <= 0:
+            break
+        size = estimate_tokens(str(messages[i].content))
+        target = max(MIN_CONTEXT_TOKENS, size - excess)
+        if target < size:
+            trimmed = messages[i].model_copy(update={"content": _truncate(str(messages[i].content), target)})
+            excess -= _tokens(messages[i]) - _tokens(trimmed)
+            messages[i] = trimmed
+
+    # 3. Examples in the system prompt
+    if excess > 0 and messages and messages[0].type == "system":
+        compact = messages[0].model_copy(update={"content": strip_examples(str(messages[0].content))})
+        excess -= _tokens(messages[0]) - _tokens(compact)
+        messages[0] = compact
+
+    return messages
+
+
+def apply_budget(site: Optional[str], messages: list, kwargs: dict) -> tuple[list, dict]:
+    """
+    Apply a call site's budget to an outgoing request.
+
+    Args:
+        site: Call site name (None: no budget)
+        messages: Prompt messages
+        kwargs: Request parameters
+
+    Returns:
+        Tuple of (messages trimmed to the input budget, kwargs with max_tokens
+        and, for label call sites, reasoning switched off)
+    """
+    if not site or not settings.token_budgets_enabled:
+        return messages, kwargs
+    budget = get_budget(site)
+    kwargs = {"max_tokens": budget.max_tokens, **kwargs}
+    if not budget.reasoning:
+        kwargs["extra_body"] = {**NO_REASONING, **(kwargs.get("extra_body") or {})}
+
+    tokens = estimate_message_tokens(messages)
+    budget_stats.calls[site] += 1
+    budget_stats.max_prompt_tokens[site] = max(budget_stats.max_prompt_tokens[site], tokens)
+    if tokens <= budget.input_tokens:
+        return messages, kwargs
+
+    budget_stats.overruns[site] += 1
+    record = current_turn()
+    if record is not None:
+        record.budget_overruns += 1
+    messages = trim_prompt(messages, budget.input_tokens)
+    remaining = estimate_message_tokens(messages)
+    budget_stats.trimmed_tokens[site] += tokens - remaining
+    if remaining > budget.input_tokens:
+        budget_stats.unresolved[site] += 1
+    return messages, kwargs
+
+
+def check_output(site: Optional[str], result) -> None:
+    """
+    Reject a response the output cap cut off before it had any content.
+
+    A reasoning model can spend the whole cap thinking; the empty answer
+    must not be parsed as a label (every label parser has a default).
+
+    Args:
+        site: Call site name (None: no budget)
+        result: ChatResult of the request
+
+    Raises:
+        OutputBudgetExhausted: If the response has no content or tool calls and
+            finished because of the length limit
+    """
+    if not site or not settings.token_budgets_enabled or not result.generations:
+        return
+    generation = result.generations[0]
+    message = generation.message
+    finish_reason = ((generation.generation_info or {}).get("finish_reason")
+                     or (message.response_metadata or {}).get("finish_reason"))
+    if finish_reason == "length" and not str(message.content).strip() and not getattr(message, "tool_calls", None):
+        budget_stats.exhausted[site] += 1
+        raise OutputBudgetExhausted(f"{site}: max_tokens={get_budget(site).max_tokens} reached with no content")
+
+
+def with_budget(llm, site: str):
+    """
+    Copy of a chat model that applies a call site's budget to every request.
+
+    Args:
+        llm: Client from src.llm.client (or a benchmark stand-in)
+        site: Call site name in DEFAULT_BUDGETS / TOKEN_BUDGETS
+
+    Returns:
+        The budgeted copy (tool binding and structured output keep the budget)
+    """
+    get_budget(site)  # Fail fast on unknown sites
+    return llm.model_copy(update={"budget": site})
@@ -0,0 +1,170 @@
+"""
+Model Cascade
+Answers with a small, fast model first and escalates to the main model only
+when a confidence check on the small model's output fails (CASCADE_ENABLED).
+
+Confidence signals:
+- Classifiers: probability of the label tokens in the small model's
+  logprobs (CASCADE_MIN_LABEL_PROB). Providers that return no logprobs fall
+  back to a self-check: the label must match the local intent
+  pre-classifier's top guess.
+- FAQ agent: distance of the best knowledge base chunk the answer was
+  grounded in (CASCADE_MAX_RETRIEVAL_DISTANCE), plus a check that the answer
+  is not a refusal (see faq_agent.py)
+
+Hit rate (answers kept from the small model) and latency are recorded per
+call site and tier.
+"""
+
+import math
+import re
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Iterable, Optional
+from src.config.settings import settings
+
+
+# Latencies kept per tier for the percentiles
+LATENCY_WINDOW = 500
+
+
+class TierStats:
+    """Calls and recent latency of one model tier at one call site"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def percentile(self, pct: float) -> float:
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+class CascadeStats:
+    """Per call site: how often the small model's answer was kept, and tier latencies"""
+
+    def __init__(self):
+        self.tiers = defaultdict(lambda: {"small": TierStats(), "large": TierStats()})
+        self.kept = defaultdict(int)
+
+    def record(self, site: str, tier: str, latency_ms: float, error: bool = False):
+        stats = self.tiers[site][tier]
+        stats.calls += 1
+        stats.errors += int(error)
+        stats.latencies_ms.append(latency_ms)
+
+    def summary(self) -> dict:
+        """Counters per call site (e.g. {"intent": {...}, "faq": {...}})"""
+        sites = {}
+        for site, tiers in self.tiers.items():
+            small, large = tiers["small"], tiers["large"]
+            sites[site] = {
+                "small_calls": small.calls,
+                "small_kept": self.kept[site],
+                "small_hit_rate": round(self.kept[site] / small.calls, 3) if small.calls else 0.0,
+                "small_errors": small.errors,
+                "small_p50_ms": round(small.percentile(50)),
+                "small_p95_ms": round(small.percentile(95)),
+                "large_calls": large.calls,
+                "large_p50_ms": round(large.percentile(50)),
+                "large_p95_ms": round(large.percentile(95)),
+            }
+        return sites
+
+
+cascade_stats = CascadeStats()
+
+
+async def run_cascade(site: str, small: Callable[[], Awaitable], large: Callable[[], Awaitable],
+                      accept: Callable[[Any], bool]) -> Any:
+    """
+    Try the small model tier first; fall back to the large one if its answer is not accepted.
+
+    Args:
+        site: Call site name for the stats (e.g., "intent", "faq")
+        small: Runs the call on the small model
+        large: Runs the call on the main model
+        accept: Confidence check on the small model's result
+
+    Returns:
+        The kept small-model result, or the large model's result
+        (the large model only when the cascade is disabled)
+    """
+    if not settings.cascade_enabled:
+        return await large()
+
+    start = time.perf_counter()
+    try:
+        result = await small()
+        kept = accept(result)
+        error = False
+    except Exception as e:
+        print(f"Cascade small model failed at {site}: {e}")
+        kept, error = False, True
+    cascade_stats.record(site, "small", (time.perf_counter() - start) * 1000, error)
+    if kept:
+        cascade_stats.kept[site] += 1
+        return result
+
+    start = time.perf_counter()
+    try:
+        return await large()
+    finally:
+        cascade_stats.record(site, "large", (time.perf_counter() - start) * 1000)
+
+
+def label_probability(message, labels: Iterable[str]) -> Optional[float]:
+    """
+    Probability the model gave to the first label it wrote.
+
+    Multiplies the token probabilities (from logprobs) of the tokens that
+    spell the label.
+
+    Args:
+        message: AIMessage from a client created with logprobs=True
+        labels: Possible labels (e.g., intent names)
+
+    Returns:
+        Probability in [0, 1], or None if the provider returned no logprobs
+        or the output contains no label
+    """
+    tokens = ((getattr(message, "response_metadata", None) or {}).get("logprobs") or {}).get("content") or []
+    if not tokens:
+        return None
+    text = "".join(token["token"] for token in tokens).lower()
+    match = re.search(r"\b(" + "|".join(re.escape(label) for label in labels) + r")\b", text)
+    if not match:
+        return None
+
+    probability, offset = 1.0, 0
+    for token in tokens:
+        end = offset + len(token["token"])
+        if end > match.start() and offset < match.end():
+            probability *= math.exp(token["logprob"])
+        offset = end
+    return probability
+
+
+def accept_label(message, label: str, labels: Iterable[str], expected: Optional[str] = None) -> bool:
+    """
+    Confidence check for a small-model classification.
+
+    Args:
+        message: Small model response
+        label: Label parsed from it
+        labels: Valid labels
+        expected: Local pre-classifier's top guess, used when there are no logprobs
+
+    Returns:
+        True to keep the small model's label
+    """
+    labels = list(labels)
+    if label not in labels:
+        return False
+    probability = label_probability(message, labels)
+    if probability is not None:
+        return probability >= settings.cascade_min_label_prob
+    return expected is not None and label == expected
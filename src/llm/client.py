@@ -1,22 +1,39 @@
 """
 LLM Client for OpenRouter
-Simple client using Qwen via OpenRouter
+Simple client using Qwen via OpenRouter; every client shares one pooled HTTP transport
+and the request policy (per-turn deadlines, hedging for idempotent calls)
 """
 
+from typing import Optional
 from langchain_openai import ChatOpenAI
 from src.config.settings import settings
+from src.llm.policy import RequestPolicyMixin
+from src.llm.transport import get_http_client
+from src.utils.telemetry import telemetry_callback
 
 
-def get_llm(temperature: float = None, streaming: bool = False):
+class PolicyChatOpenAI(RequestPolicyMixin, ChatOpenAI):
+    """ChatOpenAI with per-turn deadlines and optional hedging (src/llm/policy.py)"""
+
+    hedged: bool = False  # Only for idempotent calls - never for tool-executing agents
+    budget: Optional[str] = None  # Token budget call site (src/llm/budget.py, set with with_budget)
+
+
+def get_llm(temperature: float = None, streaming: bool = False, name: str = None, hedged: bool = False,
+            model: str = None, logprobs: bool = False):
     """
     Get LLM instance for OpenRouter (Qwen).
 
     Args:
         temperature: Override the default temperature (0-1)
         streaming: Enable streaming mode for faster responses
+        name: Client name shown in telemetry (e.g., "llm_router")
+        hedged: Send a duplicate request when the first is slow (idempotent calls only)
+        model: Override the default model (e.g., the cascade's small model)
+        logprobs: Return token logprobs (confidence signal for the cascade)
 
     Returns:
-        ChatOpenAI instance configured for OpenRouter
+        PolicyChatOpenAI instance configured for OpenRouter
 
     Raises:
         ValueError: If OPENROUTER_API_KEY is missing
@@ -27,27 +44,36 @@ def get_llm(temperature: float = None, streaming: bool = False):
     temp = temperature if temperature is not None else settings.temperature
 
     # OpenRouter uses OpenAI-compatible API
-    return ChatOpenAI(
-        model=settings.openrouter_model,
+    return PolicyChatOpenAI(
+        model=model or settings.openrouter_model,
         temperature=temp,
+        logprobs=logprobs or None,
         api_key=settings.openrouter_api_key,
         base_url=settings.openrouter_base_url,
         streaming=streaming,
+        stream_usage=True,  # Token usage on streamed responses too (telemetry)
         request_timeout=30,  # 30 second timeout
+        http_async_client=get_http_client(),  # Shared keep-alive pool (src/llm/transport.py)
         max_tokens=10000,  # Limit output tokens to control costs
+        name=name,
+        hedged=hedged,
+        callbacks=[telemetry_callback],  # Per-turn latency/token/cost spans
     )
 
 
-def get_translation_llm(temperature: float = 0.1, streaming: bool = False):
+def get_translation_llm(temperature: float = 0.1, streaming: bool = False, name: str = None,
+                        hedged: bool = False):
     """
     Get LLM instance for translation (Cohere).
 
     Args:
         temperature: Temperature for translation (default 0.1 for consistency)
         streaming: Enable streaming mode
+        name: Client name shown in telemetry (e.g., "llm_translator")
+        hedged: Send a duplicate request when the first is slow (idempotent calls only)
 
     Returns:
-        ChatOpenAI instance configured for Cohere translation model
+        PolicyChatOpenAI instance configured for Cohere translation model
 
     Raises:
         ValueError: If OPENROUTER_API_KEY is missing
@@ -56,18 +82,29 @@ def get_translation_llm(temperature: float = 0.1, streaming: bool = False):
         raise ValueError("OPENROUTER_API_KEY is not set in .env file")
 
     # Use Cohere model for translation via OpenRouter
-    return ChatOpenAI(
+    return PolicyChatOpenAI(
         model=settings.translation_model,
         temperature=temperature,
         api_key=settings.openrouter_api_key,
         base_url=settings.openrouter_base_url,
         streaming=streaming,
+        stream_usage=True,  # Token usage on streamed responses too (telemetry)
         request_timeout=30,  # 30 second timeout
+        http_async_client=get_http_client(),  # Shared keep-alive pool (src/llm/transport.py)
         max_tokens=10000,  # Translations are short
+        name=name,
+        hedged=hedged,
+        callbacks=[telemetry_callback],  # Per-turn latency/token/cost spans
     )
 
 
 # Singleton instances for different use cases
-llm_router = get_llm(temperature=0.0)  # Router needs deterministic intent classification
-llm_agent = get_llm()  # Default temperature for conversational agents
-llm_translator = get_translation_llm()  # Translation model (Cohere)
+llm_router = get_llm(temperature=0.0, name="llm_router", hedged=True)  # Router needs deterministic intent classification
+llm_agent = get_llm(name="llm_agent")  # Booking/management agents execute tools: never hedged
+llm_faq = get_llm(name="llm_faq", hedged=True)  # FAQ agent only reads the knowledge base
+llm_translator = get_translation_llm(name="llm_translator", hedged=True)  # Translation model (Cohere)
+
+# Cascade tier: small, fast model tried first when CASCADE_ENABLED (src/llm/cascade.py)
+llm_router_small = get_llm(temperature=0.0, name="llm_router_small", hedged=True,
+                           model=settings.cascade_small_model, logprobs=True)
+llm_faq_small = get_llm(name="llm_faq_small", hedged=True, model=settings.cascade_small_model)
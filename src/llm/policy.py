@@ -0,0 +1,273 @@
+"""
+LLM Request Policy
+Deadlines and hedged requests for the OpenRouter clients.
+
+Deadlines: every LLM call gets what is left of the turn's budget
+(LLM_TURN_BUDGET_SECONDS minus the time the turn has already taken), capped
+by the client's request timeout and never below LLM_MIN_CALL_SECONDS. Once
+a booking, cancellation, reschedule or email tool has run in the turn, the
+remaining calls get the client timeout instead: the action already happened,
+so the agent must still get to confirm it to the patient.
+
+Hedging: a client created with hedged=True sends a duplicate request when
+the first has not answered within LLM_HEDGE_PERCENTILE of that client's
+recent latency, uses whichever answers first and cancels the other. Only
+idempotent calls are hedged (classification, translation, FAQ synthesis).
+Tool-executing agent steps never are: a duplicated step could plan a second
+booking or email. Streamed calls race on their first chunk.
+"""
+
+import asyncio
+import math
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Optional
+from src.config.settings import settings
+from src.llm.budget import apply_budget, check_output
+from src.utils.telemetry import current_turn
+
+
+# Recent latencies kept per client for the hedge percentile
+LATENCY_WINDOW = 200
+
+# Used when a client has no numeric request timeout
+DEFAULT_TIMEOUT_SECONDS = 30.0
+
+# Tools that change a booking or send an email; later calls of the turn are exempt from its deadline
+SIDE_EFFECT_TOOLS = frozenset({
+    "create_new_booking",
+    "send_booking_confirmation_email",
+    "cancel_appointment",
+    "reschedule_appointment",
+    "send_cancellation_email",
+    "send_reschedule_email",
+})
+
+# Marks the end of a pumped stream
+_END = object()
+
+
+class DeadlineExceeded(TimeoutError):
+    """An LLM call ran past its share of the turn's budget"""
+
+
+class LatencyTracker:
+    """Recent call latencies per client, for the hedge delay"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, key: str, seconds: float):
+        self._samples[key].append(seconds)
+
+    def percentile(self, key: str, pct: float) -> Optional[float]:
+        """Latency percentile in seconds (None until LLM_HEDGE_MIN_SAMPLES calls were seen)"""
+        samples = self._samples.get(key)
+        if not samples or len(samples) < settings.llm_hedge_min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+    def hedge_delay(self, key: str) -> float:
+        """Seconds to wait for the first request before sending the hedge"""
+        observed = self.percentile(key, settings.llm_hedge_percentile)
+        delay = observed if observed is not None else settings.llm_hedge_default_delay_ms / 1000
+        return max(delay, settings.llm_hedge_min_delay_ms / 1000)
+
+
+class PolicyStats:
+    """Hedge and deadline counters over all LLM calls"""
+
+    def __init__(self):
+        self.calls = 0
+        self.hedgeable_calls = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0  # Calls answered by the hedge rather than the first request
+        self.deadline_exceeded = 0
+        self.deadline_exempt = 0  # Calls after a side-effecting tool, run with the client timeout only
+
+    def summary(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedgeable_calls": self.hedgeable_calls,
+            "hedges_sent": self.hedges_sent,
+            "hedge_rate": round(self.hedges_sent / self.hedgeable_calls, 3) if self.hedgeable_calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded,
+            "deadline_exempt": self.deadline_exempt,
+        }
+
+
+latency_tracker = LatencyTracker()
+policy_stats = PolicyStats()
+
+
+def call_timeout(request_timeout: Any = None) -> float:
+    """
+    Deadline for one LLM call, in seconds.
+
+    Args:
+        request_timeout: The client's own timeout (ignored unless numeric)
+
+    Returns:
+        The turn's remaining budget, capped by the client timeout and floored
+        at LLM_MIN_CALL_SECONDS (the client timeout alone outside a turn or
+        after a side-effecting tool ran in it)
+    """
+    timeout = float(request_timeout) if isinstance(request_timeout, (int, float)) else DEFAULT_TIMEOUT_SECONDS
+    record = current_turn()
+    if record is None:
+        return timeout
+    # Failed tool calls count too: the booking may have been written before the error
+    if any(s.kind == "tool" and s.name in SIDE_EFFECT_TOOLS for s in list(record.spans)):
+        policy_stats.deadline_exempt += 1
+        return timeout
+    elapsed = record.offset_ms(time.perf_counter()) / 1000
+    remaining = settings.llm_turn_budget_seconds - elapsed
+    return min(timeout, max(remaining, settings.llm_min_call_seconds))
+
+
+async def race(attempt: Callable[[], Awaitable], key: str, hedge: bool, timeout: float,
+               discard: Callable[[Any], None] = None) -> Any:
+    """
+    Run an LLM request under a deadline, hedging it if allowed.
+
+    Args:
+        attempt: Starts one request and returns its result
+        key: Latency tracker key of the client
+        hedge: Whether a duplicate request may be sent (idempotent calls only)
+        timeout: Deadline in seconds
+        discard: Called with a successful result that lost the race
+
+    Returns:
+        The first successful result
+
+    Raises:
+        The last request's error if every request failed, or DeadlineExceeded
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline = start + timeout
+    hedge = hedge and settings.llm_hedging_enabled
+    hedge_at = start + latency_tracker.hedge_delay(key) if hedge else None
+
+    policy_stats.calls += 1
+    policy_stats.hedgeable_calls += int(hedge)
+    tasks = {asyncio.ensure_future(attempt()): False}  # Task -> is the hedge
+    error = None
+    try:
+        while tasks:
+            now = loop.time()
+            if now >= deadline:
+                break
+            wake = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, _ = await asyncio.wait(tasks, timeout=wake - now, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                is_hedge = tasks.pop(task)
+                if task.exception() is None:
+                    latency_tracker.record(key, loop.time() - start)
+                    policy_stats.hedge_wins += int(is_hedge)
+                    return task.result()
+                error = task.exception()
+            # Hedge only while the first request is still outstanding
+            if hedge_at is not None and loop.time() >= hedge_at and tasks:
+                tasks[asyncio.ensure_future(attempt())] = True
+                policy_stats.hedges_sent += 1
+                hedge_at = None
+
+        if not tasks:
+            raise error
+        policy_stats.deadline_exceeded += 1
+        raise DeadlineExceeded(f"LLM call exceeded its {timeout:.1f}s deadline")
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled() and task.exception() is None and discard:
+                discard(task.result())
+
+
+class _StreamPump:
+    """Reads a chunk stream in its own task, so it can be raced and cancelled"""
+
+    def __init__(self, stream):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.ensure_future(self._run(stream))
+
+    async def _run(self, stream):
+        try:
+            async for chunk in stream:
+                self.queue.put_nowait(chunk)
+        except Exception as e:
+            self.queue.put_nowait(e)
+        else:
+            self.queue.put_nowait(_END)
+
+    async def get(self):
+        """Next chunk, or _END (re-raises the stream's error)"""
+        item = await self.queue.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def cancel(self):
+        self.task.cancel()
+
+
+class RequestPolicyMixin:
+    """
+    Chat model mixin that applies the request policy to every async call,
+    after the call site's token budget (src/llm/budget.py).
+
+    Concrete classes declare the pydantic fields `hedged: bool = False` and
+    `budget: Optional[str] = None`.
+    """
+
+    def _policy_key(self, streamed: bool) -> str:
+        return f"{self.name or self._llm_type}:{'stream' if streamed else 'call'}"
+
+    def _policy_timeout(self) -> float:
+        return call_timeout(getattr(self, "request_timeout", None))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if getattr(self, "streaming", False):
+            # Streaming clients generate through _astream, which applies the policy
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        messages, kwargs = apply_budget(self.budget, messages, kwargs)
+        parent = super()
+        result = await race(
+            lambda: parent._agenerate(messages, stop=stop, **kwargs),
+            key=self._policy_key(streamed=False),
+            hedge=self.hedged,
+            timeout=self._policy_timeout(),
+        )
+        check_output(self.budget, result)
+        return result
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        messages, kwargs = apply_budget(self.budget, messages, kwargs)
+        parent = super()
+
+        async def first_chunk():
+            pump = _StreamPump(parent._astream(messages, stop=stop, **kwargs))
+            try:
+                return await pump.get(), pump
+            except BaseException:
+                pump.cancel()
+                raise
+
+        chunk, pump = await race(
+            first_chunk,
+            key=self._policy_key(streamed=True),
+            hedge=self.hedged,
+            timeout=self._policy_timeout(),
+            discard=lambda result: result[1].cancel(),
+        )
+        try:
+            while chunk is not _END:
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+                chunk = await pump.get()
+        finally:
+            pump.cancel()
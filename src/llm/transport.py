@@ -0,0 +1,178 @@
+"""
+Shared LLM HTTP Transport
+One keep-alive, HTTP/2-capable connection pool used by every OpenRouter
+client (llm_router, llm_agent, llm_translator), so a turn's 3-5 requests
+reuse warm connections instead of each client opening its own.
+
+Connections belong to an event loop, so the pool is kept per running loop
+(the server has one; the CLI reuses one across turns). Every request is
+traced to count new TCP connections and TLS handshakes, and which of them
+were opened while a patient turn was waiting (the hot path).
+
+Requests made for a conversation with a cassette (CASSETTE_MODE) are
+recorded here, or answered from the cassette on replay.
+"""
+
+import asyncio
+import weakref
+from typing import Optional
+import httpx
+from src.config.settings import settings
+from src.utils.cassette import current_cassette
+from src.utils.telemetry import current_turn
+
+
+try:
+    import h2  # noqa: F401 - HTTP/2 support for httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class ConnectionStats:
+    """Request, connection and handshake counters for the shared pool"""
+
+    def __init__(self):
+        self.requests = 0
+        self.http2_requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+        self.turn_connections = 0  # Connections (TCP + TLS setup) opened while a patient turn was waiting
+        self.warmup_connections = 0
+
+    @property
+    def reuse_rate(self) -> float:
+        """Share of requests sent on an already open connection"""
+        return 1 - self.new_connections / self.requests if self.requests else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "requests": self.requests,
+            "http2_requests": self.http2_requests,
+            "new_connections": self.new_connections,
+            "tls_handshakes": self.tls_handshakes,
+            "connections_in_turns": self.turn_connections,
+            "warmup_connections": self.warmup_connections,
+            "reuse_rate": round(self.reuse_rate, 3),
+        }
+
+
+connection_stats = ConnectionStats()
+
+
+async def _trace(event: str, info: dict):
+    """httpcore trace hook: count connections and handshakes as they happen"""
+    if event == "connection.connect_tcp.complete":
+        connection_stats.new_connections += 1
+        if current_turn() is not None:
+            connection_stats.turn_connections += 1
+    elif event == "connection.start_tls.complete":
+        connection_stats.tls_handshakes += 1
+    elif event == "http2.send_request_headers.started":
+        connection_stats.http2_requests += 1
+
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """Keep-alive connection pool per event loop, shared by every client using it"""
+
+    def __init__(self, http2: bool, limits: httpx.Limits):
+        self.http2 = http2
+        self.limits = limits
+        self._pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = \
+            weakref.WeakKeyDictionary()
+
+    def _pool(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None:
+            pool = httpx.AsyncHTTPTransport(http2=self.http2, limits=self.limits)
+            self._pools[loop] = pool
+        return pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        cassette = current_cassette()
+        if cassette is not None:
+            return await cassette.http(request, self._send)
+        return await self._send(request)
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = _trace
+        connection_stats.requests += 1
+        return await self._pool().handle_async_request(request)
+
+    async def aclose(self):
+        pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.aclose()
+
+
+# Singleton instances
+_http_client_instance: Optional[httpx.AsyncClient] = None
+_transport_instance: Optional[PooledTransport] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared async HTTP client for the LLM clients.
+
+    Returns:
+        httpx.AsyncClient over the pooled transport (HTTP/2 when enabled and
+        the h2 package is installed)
+    """
+    global _http_client_instance, _transport_instance
+    if _http_client_instance is None:
+        http2 = settings.llm_http2 and HTTP2_AVAILABLE
+        if settings.llm_http2 and not HTTP2_AVAILABLE:
+            print("LLM_HTTP2 is on but the h2 package is missing; using HTTP/1.1 keep-alive (pip install h2)")
+        limits = httpx.Limits(
+            max_connections=settings.llm_pool_max_connections,
+            max_keepalive_connections=settings.llm_pool_max_keepalive,
+            keepalive_expiry=settings.llm_pool_keepalive_seconds,
+        )
+        _transport_instance = PooledTransport(http2=http2, limits=limits)
+        _http_client_instance = httpx.AsyncClient(
+            transport=_transport_instance,
+            timeout=httpx.Timeout(30.0, connect=10.0),
+        )
+    return _http_client_instance
+
+
+async def warmup_connections(connections: int = None) -> int:
+    """
+    Open connections to the LLM provider before the first patient turn.
+
+    Sends lightweight HEAD requests so TCP and TLS setup (and HTTP/2
+    negotiation) happen at startup instead of on a patient's first request.
+
+    Args:
+        connections: Parallel requests to send (default LLM_WARMUP_CONNECTIONS)
+
+    Returns:
+        Number of connections opened
+    """
+    connections = settings.llm_warmup_connections if connections is None else connections
+    if connections <= 0 or settings.cassette_mode == "replay":
+        return 0
+
+    client = get_http_client()
+    before = connection_stats.new_connections
+    url = f"{settings.openrouter_base_url.rstrip('/')}/models"
+    results = await asyncio.gather(*(client.head(url) for _ in range(connections)), return_exceptions=True)
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        print(f"LLM connection warmup failed for {len(failures)} of {connections} request(s): {failures[0]}")
+
+    opened = connection_stats.new_connections - before
+    connection_stats.warmup_connections += opened
+    return opened
+
+
+async def close_connections():
+    """
+    Close the pooled connections of the running event loop (on shutdown).
+
+    The shared client itself stays open: the LLM clients keep a reference to
+    it, and a later event loop (another server lifespan) gets a new pool.
+    """
+    if _transport_instance is not None:
+        await _transport_instance.aclose()
@@ -0,0 +1,297 @@
+"""
+FAQ Answer Cache
+Answers repeated FAQ questions (hours, parking, insurance, prices) without
+running the FAQ agent's tool loop and LLM generations.
+
+A cached answer is reused only when the new question's embedding is close
+to the cached question's AND the knowledge base retrieves the same chunks
+for it, so an answer is never reused for a question grounded in different
+source text. Entries are dropped when:
+- the Chroma collection is rebuilt by init_chromadb.py
+- they expire (answers about "today"/"tomorrow" expire with the date)
+- the cache is full (least recently used first)
+
+The patient's name is stored as a placeholder and filled in on every hit;
+doctors' names that match it are left as written.
+"""
+
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+from src.config.settings import settings
+from src.rag.retriever import get_retriever
+from src.utils.concurrency import run_blocking
+
+
+# Chunks retrieved per question for the cache key (same k as the knowledge base tool)
+RETRIEVAL_K = 2
+
+# How often to check whether init_chromadb.py rebuilt the collection
+INDEX_CHECK_SECONDS = 30
+
+# Placeholders for personal details in stored answers
+NAME_PLACEHOLDER = "{{patient_name}}"
+FIRST_NAME_PLACEHOLDER = "{{patient_first_name}}"
+
+# Questions that only make sense after an earlier message ("and on Friday?") are never cached
+FOLLOW_UP_PREFIXES = ("and ", "what about", "how about", "also", "then ", "same ", "that ", "it ", "is it", "does it")
+MIN_QUESTION_WORDS = 3
+
+# Answers mentioning relative days or explicit dates are only valid until midnight
+_DATE_BOUND = re.compile(
+    r"\b(today|tonight|tomorrow|yesterday|now|right now|this (week|weekend|morning|afternoon|evening)|next week)\b"
+    r"|\b\d{4}-\d{2}-\d{2}\b"
+    r"|\b(january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2}\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class CachedAnswer:
+    """One stored FAQ answer"""
+    question: str
+    vector: List[float]
+    chunk_ids: tuple
+    template: str  # Answer with personal details replaced by placeholders
+    expires_at: float  # Epoch seconds
+    hits: int = 0
+
+
+@dataclass
+class CacheProbe:
+    """Embedding and retrieval done for a lookup, reused to store the answer after a miss"""
+    vector: List[float]
+    chunk_ids: tuple
+    index_version: str
+
+
+class AnswerCacheStats:
+    """Hit rate and invalidation counters for the answer cache"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.expired = 0
+        self.invalidations = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "lookups": self.hits + self.misses,
+            "hits": self.hits,
+            "hit_rate": round(self.hit_rate, 3),
+            "stores": self.stores,
+            "expired": self.expired,
+            "invalidations": self.invalidations,
+        }
+
+
+def _similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def is_cacheable_question(question: str) -> bool:
+    """Whether a question stands on its own (follow-ups depend on earlier turns)"""
+    text = question.lower().strip()
+    return len(text.split()) >= MIN_QUESTION_WORDS and not text.startswith(FOLLOW_UP_PREFIXES)
+
+
+# Names after a title belong to a doctor ("Dr. Omar Fahad"), not to the patient
+_TITLE = r"(?<!Dr\. )(?<!Dr )(?<!Doctor )"
+
+# Where the answer addresses the patient: "Hi Omar,", "Sure, Omar!", "Omar, ..." at the start
+_GREETING = r"(?:hi|hello|hey|dear|thanks|thank you|welcome|sure|certainly|of course|great)"
+
+
+def _first_name(patient_name: str) -> str:
+    parts = (patient_name or "").split()
+    return parts[0] if parts and len(parts[0]) > 2 else ""
+
+
+def templatize(answer: str, patient_name: str) -> Optional[str]:
+    """
+    Replace the patient's name in an answer with placeholders.
+
+    The full name is replaced wherever it is not a doctor's name; the first name
+    only where it addresses the patient, since doctors can share it.
+
+    Returns:
+        Answer template, or None if the patient is still mentioned elsewhere
+    """
+    if patient_name:
+        answer = re.sub(_TITLE + re.escape(patient_name) + r"\b", NAME_PLACEHOLDER, answer)
+    first = _first_name(patient_name)
+    if first:
+        name = re.escape(first)
+        answer = re.sub(
+            rf"(^\W*|\b{_GREETING},?\s+|,\s*)(?-i:{name})(?=\s*(?:[,.!?:;]|$))",
+            lambda match: match.group(1) + FIRST_NAME_PLACEHOLDER,
+            answer,
+            flags=re.IGNORECASE | re.MULTILINE,
+        )
+        if re.search(_TITLE + rf"\b{name}\b", answer):
+            return None
+    return answer
+
+
+def render(template: str, patient_name: str) -> str:
+    """Fill the patient's name into a stored answer"""
+    return (template.replace(NAME_PLACEHOLDER, patient_name or "")
+            .replace(FIRST_NAME_PLACEHOLDER, _first_name(patient_name)))
+
+
+class FAQAnswerCache:
+    """In-process semantic cache of FAQ agent answers"""
+
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: int):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold: Minimum cosine similarity between questions for a hit
+            max_entries: Entries kept before the least recently used is evicted
+            ttl_seconds: Lifetime of answers that are not date-bound
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: OrderedDict[int, CachedAnswer] = OrderedDict()
+        self.index_version: Optional[str] = None
+        self.stats = AnswerCacheStats()
+        self._next_key = 0
+        self._index_checked_at = 0.0
+
+    def clear(self):
+        """Drop every entry"""
+        self.entries.clear()
+
+    def _check_index(self, retriever) -> str:
+        """Current index version; clears the cache if the collection was rebuilt"""
+        if self.index_version is None or time.monotonic() - self._index_checked_at > INDEX_CHECK_SECONDS:
+            version = retriever.refresh_index()
+            if self.index_version is not None and version != self.index_version:
+                self.stats.invalidations += 1
+                self.clear()
+            self.index_version = version
+            self._index_checked_at = time.monotonic()
+        return self.index_version
+
+    async def lookup(self, question: str, patient_name: str = "") -> tuple[Optional[str], Optional[CacheProbe]]:
+        """
+        Find a cached answer for a question.
+
+        Args:
+            question: Patient question (English, after TRT pre-processing)
+            patient_name: Name to fill into the answer
+
+        Returns:
+            Tuple of (answer or None, probe to pass to store() after a miss;
+            None if the question is not cacheable)
+        """
+        if not is_cacheable_question(question):
+            return None, None
+
+        retriever = await run_blocking(get_retriever)
+        version = await run_blocking(self._check_index, retriever)
+        vector = await retriever.embeddings.aembed_query(question)
+        chunks = await run_blocking(retriever.search_by_vector, vector, RETRIEVAL_K)
+        probe = CacheProbe(vector=vector, chunk_ids=tuple(chunk_id for chunk_id, _ in chunks),
+                           index_version=version)
+
+        now = time.time()
+        best_key, best_score = None, self.threshold
+        for key, entry in list(self.entries.items()):
+            if entry.expires_at <= now:
+                del self.entries[key]
+                self.stats.expired += 1
+                continue
+            if entry.chunk_ids != probe.chunk_ids:
+                continue
+            if not patient_name and (NAME_PLACEHOLDER in entry.template or FIRST_NAME_PLACEHOLDER in entry.template):
+                continue
+            score = _similarity(vector, entry.vector)
+            if score >= best_score:
+                best_key, best_score = key, score
+
+        if best_key is None:
+            self.stats.misses += 1
+            return None, probe
+
+        entry = self.entries[best_key]
+        self.entries.move_to_end(best_key)
+        entry.hits += 1
+        self.stats.hits += 1
+        return render(entry.template, patient_name), probe
+
+    def store(self, probe: CacheProbe, question: str, answer: str,
+              patient_name: str = "", patient_email: str = ""):
+        """
+        Store an answer produced by the FAQ agent after a miss.
+
+        Args:
+            probe: Probe returned by lookup() for this question
+            question: Patient question
+            answer: Agent answer
+            patient_name: Patient name to replace with a placeholder
+            patient_email: Answers containing it are never stored (nor answers naming the patient
+                other than when addressing them)
+        """
+        if probe is None or probe.index_version != self.index_version or not probe.chunk_ids:
+            return
+        if patient_email and patient_email in answer:
+            return
+        template = templatize(answer, patient_name)
+        if template is None:
+            return
+
+        if _DATE_BOUND.search(question) or _DATE_BOUND.search(answer):
+            midnight = datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time())
+            expires_at = midnight.timestamp()
+        else:
+            expires_at = time.time() + self.ttl_seconds
+
+        self.entries[self._next_key] = CachedAnswer(
+            question=question,
+            vector=probe.vector,
+            chunk_ids=probe.chunk_ids,
+            template=template,
+            expires_at=expires_at,
+        )
+        self._next_key += 1
+        self.stats.stores += 1
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+# Singleton instance
+_answer_cache_instance = None
+
+
+def get_answer_cache() -> Optional[FAQAnswerCache]:
+    """
+    Get the singleton FAQ answer cache.
+
+    Returns:
+        FAQAnswerCache, or None if disabled in settings
+    """
+    global _answer_cache_instance
+    if not settings.faq_cache_enabled:
+        return None
+    if _answer_cache_instance is None:
+        _answer_cache_instance = FAQAnswerCache(
+            threshold=settings.faq_cache_similarity,
+            max_entries=settings.faq_cache_max_entries,
+            ttl_seconds=settings.faq_cache_ttl_seconds,
+        )
+    return _answer_cache_instance
@@ -1,11 +1,197 @@
 """
 RAG Retriever for Dental Clinic FAQ
 Connects to existing ChromaDB vector store
+
+Query embeddings go through a two-level cache (EMBEDDING_CACHE_ENABLED): an
+in-process LRU, then an SQLite store on disk (EMBEDDING_CACHE_PATH) that
+survives restarts. Entries are keyed by a hash of the embedding model and
+the normalized query (case, punctuation and spacing ignored), so a repeated
+question never reaches the Jina API. The store keeps only the hash and the
+vector, never the patient's question, and drops entries older than
+EMBEDDING_CACHE_MAX_AGE_DAYS or beyond EMBEDDING_CACHE_MAX_ROWS. Document
+embeddings (indexing) are not cached.
 """
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
 import chromadb
 from langchain_chroma import Chroma
 from langchain_community.embeddings import JinaEmbeddings
+from langchain_core.embeddings import Embeddings
 from src.config.settings import settings
+from src.utils.concurrency import run_blocking
+
+
+# Stores between two prunes of the on-disk cache
+PRUNE_EVERY_STORES = 200
+
+# Punctuation, except inside numbers ("3.5", "9:00")
+_PUNCTUATION = re.compile(r"(?<!\d)[^\w\s]|[^\w\s](?!\d)")
+
+
+def normalize_query(text: str) -> str:
+    """Cache form of a query: NFKC, case-folded, punctuation dropped, single spaces"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+class EmbeddingCacheStats:
+    """Hit/miss counters for the query-embedding cache"""
+
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0  # Sent to the embedding API
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / total if total else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "lookups": self.memory_hits + self.disk_hits + self.misses,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3),
+        }
+
+
+embedding_cache_stats = EmbeddingCacheStats()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Query-embedding cache in front of an embedding model.
+
+    Level 1 is an LRU of EMBEDDING_CACHE_MAX_ENTRIES vectors; level 2 is an
+    SQLite table at EMBEDDING_CACHE_PATH ("" keeps the cache in memory only),
+    pruned by age (EMBEDDING_CACHE_MAX_AGE_DAYS) and size (EMBEDDING_CACHE_MAX_ROWS).
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str,
+                 path: str = None, max_entries: int = None):
+        """
+        Args:
+            embeddings: Model that embeds cache misses
+            model_name: Part of the cache key (vectors of different models never mix)
+            path: SQLite file (default EMBEDDING_CACHE_PATH)
+            max_entries: LRU size (default EMBEDDING_CACHE_MAX_ENTRIES)
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries or settings.embedding_cache_max_entries
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._stores_since_prune = 0
+        path = settings.embedding_cache_path if path is None else path
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS query_embeddings "
+                    "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, stored_at REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS query_embeddings_stored_at "
+                                 "ON query_embeddings (stored_at)")
+                self._db.commit()
+                self._prune()
+            except sqlite3.Error as e:
+                print(f"Embedding cache store unavailable ({path}), using memory only: {e}")
+                self._db = None
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _from_memory(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                embedding_cache_stats.memory_hits += 1
+            return vector
+
+    def _from_disk(self, key: str) -> Optional[List[float]]:
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT vector FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        vector = array("d", row[0]).tolist()
+        embedding_cache_stats.disk_hits += 1
+        self._remember(key, vector)
+        return vector
+
+    def _prune(self):
+        """Delete on-disk entries past the age limit, then the oldest beyond the row limit"""
+        with self._lock:
+            self._db.execute("DELETE FROM query_embeddings WHERE stored_at < ?",
+                             (time.time() - settings.embedding_cache_max_age_days * 86400,))
+            self._db.execute(
+                "DELETE FROM query_embeddings WHERE key IN "
+                "(SELECT key FROM query_embeddings ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (settings.embedding_cache_max_rows,),
+            )
+            self._db.commit()
+            self._stores_since_prune = 0
+
+    def _store(self, key: str, vector: List[float]):
+        embedding_cache_stats.misses += 1
+        self._remember(key, vector)
+        if self._db is None:
+            return
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (key, vector, stored_at) VALUES (?, ?, ?)",
+                    (key, array("d", vector).tobytes(), time.time()),
+                )
+                self._db.commit()
+                self._stores_since_prune += 1
+            if self._stores_since_prune >= PRUNE_EVERY_STORES:
+                self._prune()
+        except sqlite3.Error as e:
+            print(f"Failed to store query embedding: {e}")
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self._from_memory(key) or self._from_disk(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._store(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self._from_memory(key)
+        if vector is None and self._db is not None:
+            vector = await run_blocking(self._from_disk, key)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            await run_blocking(self._store, key, vector)
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
 
 
 class KnowledgeBaseRetriever:
@@ -30,16 +216,22 @@ class KnowledgeBaseRetriever:
             jina_api_key=settings.jina_api_key,
             model_name=settings.jina_embedding_model
         )
+        if settings.embedding_cache_enabled:
+            # Repeated questions skip the Jina round trip (see the module docstring)
+            self.embeddings = CachedEmbeddings(self.embeddings, settings.jina_embedding_model)
 
         # Connect to existing ChromaDB
         self.chroma_client = chromadb.PersistentClient(path=settings.chroma_db_path)
+        self._connect()
 
-        # Load existing collection
+    def _connect(self):
+        """Load the existing collection (again, after init_chromadb.py rebuilt it)"""
         self.vectorstore = Chroma(
             client=self.chroma_client,
             collection_name=settings.chroma_collection_name,
             embedding_function=self.embeddings,
         )
+        self.index_version = self._read_index_version()
 
         # Create retriever with optimized parameters
         self.retriever = self.vectorstore.as_retriever(
@@ -47,6 +239,22 @@ class KnowledgeBaseRetriever:
             search_kwargs={"k": 2}  # Retrieve top 2 chunks (reduced from 3 for speed)
         )
 
+    def _read_index_version(self) -> str:
+        collection = self.chroma_client.get_collection(settings.chroma_collection_name)
+        return f"{collection.id}:{(collection.metadata or {}).get('indexed_at', '')}"
+
+    def refresh_index(self) -> str:
+        """
+        Reconnect if init_chromadb.py has rebuilt the collection since it was loaded.
+
+        Returns:
+            Version of the current index (changes with every rebuild)
+        """
+        version = self._read_index_version()
+        if version != self.index_version:
+            self._connect()
+        return self.index_version
+
     def query(self, question: str, k: int = 2) -> list[str]:
         """
         Query the knowledge base and return relevant documents.
@@ -85,6 +293,22 @@ class KnowledgeBaseRetriever:
         results = self.vectorstore.similarity_search_with_score(question, k=k)
         return [(doc.page_content, score) for doc, score in results]
 
+    def search_by_vector(self, vector: list[float], k: int = 2) -> list[tuple[str, str]]:
+        """
+        Find the chunks nearest to an already computed query embedding.
+
+        Args:
+            vector: Query embedding from self.embeddings
+            k: Number of chunks to retrieve
+
+        Returns:
+            List of tuples (chunk_id, document_text)
+        """
+        results = self.vectorstore._collection.query(
+            query_embeddings=[vector], n_results=k, include=["documents"]
+        )
+        return list(zip(results["ids"][0], results["documents"][0]))
+
 
 # Singleton instance
 _retriever_instance = None
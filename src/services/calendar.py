@@ -10,6 +10,7 @@ from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from src.config.settings import settings
+from src.utils.cassette import cassette_service
 
 
 class CalendarService:
@@ -560,5 +561,5 @@ def get_calendar() -> CalendarService:
     """Get or create calendar service instance"""
     global _calendar_instance
     if _calendar_instance is None:
-        _calendar_instance = CalendarService()
+        _calendar_instance = cassette_service("calendar", CalendarService)
     return _calendar_instance
@@ -5,6 +5,7 @@ Provides simple functions to query the database
 
 from supabase import create_client, Client
 from src.config.settings import settings
+from src.utils.cassette import cassette_service
 
 
 class DatabaseService:
@@ -37,6 +38,32 @@ class DatabaseService:
         response = self.client.table("services").select("*").execute()
         return response.data
 
+    def get_doctor_by_id(self, doctor_id: str):
+        """Get a specific doctor by ID"""
+        response = self.client.table("doctors").select("*").eq("id", doctor_id).execute()
+        return response.data[0] if response.data else None
+
+    def get_service_by_id(self, service_id: str):
+        """Get a specific service by ID"""
+        response = self.client.table("services").select("*").eq("id", service_id).execute()
+        return response.data[0] if response.data else None
+
+    def get_support_tickets(self, limit: int = 200):
+        """Get the most recent support tickets (type + conversation history)"""
+        response = (
+            self.client.table("support_tickets")
+            .select("type, conversation_history")
+            .order("created_at", desc=True)
+            .limit(limit)
+            .execute()
+        )
+        return response.data
+
+    def insert_support_ticket(self, ticket_data: dict):
+        """Insert a support ticket row"""
+        response = self.client.table("support_tickets").insert(ticket_data).execute()
+        return response.data
+
 
 # Singleton instance
 _db_instance = None
@@ -46,5 +73,5 @@ def get_database() -> DatabaseService:
     """Get or create database service instance"""
     global _db_instance
     if _db_instance is None:
-        _db_instance = DatabaseService()
+        _db_instance = cassette_service("database", DatabaseService)
     return _db_instance
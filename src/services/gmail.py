@@ -8,6 +8,7 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from src.config.settings import settings
+from src.utils.cassette import cassette_service
 
 
 class GmailService:
@@ -531,5 +532,5 @@ def get_gmail() -> GmailService:
     """Get or create Gmail service instance"""
     global _gmail_instance
     if _gmail_instance is None:
-        _gmail_instance = GmailService()
+        _gmail_instance = cassette_service("gmail", GmailService)
     return _gmail_instance
\ No newline at end of file
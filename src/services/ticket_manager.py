@@ -6,9 +6,11 @@ Handles post-conversation processing: summarization, categorization, and databas
 import json
 from datetime import datetime
 from langchain_core.messages import SystemMessage, HumanMessage
+from src.llm.budget import with_budget
 from src.llm.client import llm_router
 from src.services.database import get_database
 from src.graph.state import AgentState
+from src.utils.concurrency import run_blocking
 
 # System prompt for the ticket analyzer
 TICKET_ANALYZER_PROMPT = """You are a Support Ticket Analyst for Riyadh Dental Care Clinic.
@@ -41,7 +43,7 @@ class TicketManager:
     
     def __init__(self):
         self.db = get_database()
-        self.llm = llm_router  # Use the router model (Qwen) for analysis as it's smart enough
+        self.llm = with_budget(llm_router, "ticket")  # Use the router model (Qwen) for analysis as it's smart enough
 
     async def process_conversation(self, state: AgentState):
         """
@@ -88,7 +90,7 @@ class TicketManager:
                     analysis["ticket_types"].append("complaint")
 
             # 4. Save to Supabase
-            self._save_ticket(state, analysis, formatted_history)
+            await run_blocking(self._save_ticket, state, analysis, formatted_history)
             
         except Exception as e:
             print(f"❌ Error processing ticket: {e}")
@@ -194,7 +196,7 @@ Please analyze the conversation again and provide a corrected JSON response with
         print(f"💾 Saving ticket: {analysis['subject']} ({analysis['status']})")
         
         try:
-            self.db.client.table("support_tickets").insert(ticket_data).execute()
+            self.db.insert_support_ticket(ticket_data)
             print("✅ Ticket saved successfully!")
         except Exception as e:
             print(f"❌ Database insert failed: {e}")
@@ -3,11 +3,14 @@ Translation service for TRT (Translate-Reason-Translate) architecture.
 Handles language detection and bidirectional Arabic-English translation.
 """
 
+import asyncio
 import re
 import time
-from typing import Literal
+from typing import AsyncIterator, Literal
 from langchain_core.messages import HumanMessage, SystemMessage
+from src.llm.budget import with_budget
 from src.utils.debug import debug
+from src.utils.sentences import split_sentences
 
 
 # =============================================================================
@@ -105,6 +108,64 @@ def _build_names_prompt_en_to_ar() -> str:
     return "\n".join(lines)
 
 
+
+# System prompts are built once: the glossary and name tables never change at runtime,
+# so every translation call sends a byte-identical prefix the provider can cache
+TO_ENGLISH_SYSTEM_PROMPT = f"""You are a deterministic translation engine. You are NOT an AI assistant.
+You do not converse, explain, summarize, or add commentary.
+Output ONLY the English translation - nothing else.
+
+RULES:
+1. Translate Arabic to English accurately
+2. Preserve all formatting, numbers, dates, times, and punctuation
+3. Use glossary terms exactly as specified
+4. Convert Arabic names to their English equivalents using the name mappings
+
+{_build_glossary_prompt()}
+
+{_build_names_prompt_ar_to_en()}
+
+Examples:
+Arabic: أريد حجز موعد لتنظيف الأسنان
+English: I want to book an appointment for Teeth Cleaning
+
+Arabic: موعدي مع د. سعد بن عبدالعزيز الخالد
+English: My appointment with Dr. Saad bin Abdulaziz Al-Khaled
+
+Arabic: أحتاج علاج قناة الجذر مع دكتور عمر فهد الراشد
+English: I need Root Canal Treatment with Dr. Omar Fahad Al-Rashed
+
+Arabic: أنا محمد علي القحطاني
+English: I am Mohammed Ali Al-Qahtani"""
+
+TO_ARABIC_SYSTEM_PROMPT = f"""You are a deterministic translation engine. You are NOT an AI assistant.
+You do not converse, explain, summarize, or add commentary.
+Output ONLY the Arabic translation - nothing else.
+
+RULES:
+1. Translate English to Arabic accurately
+2. Preserve all formatting, numbers, dates, times, emails, and punctuation
+3. Use glossary terms exactly as specified (use the Arabic equivalents)
+4. Convert English names to their Arabic equivalents using the name mappings
+
+{_build_glossary_prompt()}
+
+{_build_names_prompt_en_to_ar()}
+
+Examples:
+English: I've booked your Teeth Cleaning appointment with Dr. Saad bin Abdulaziz Al-Khaled
+Arabic: لقد حجزت موعد تنظيف الأسنان مع د. سعد بن عبدالعزيز الخالد
+
+English: Your Root Canal Treatment is scheduled for November 25 at 3:30 PM
+Arabic: موعد علاج قناة الجذر الخاص بك في 25 نوفمبر الساعة 3:30 مساءً
+
+English: Dr. Omar Fahad Al-Rashed specializes in Periodontics
+Arabic: د. عمر فهد الراشد متخصص في أمراض اللثة
+
+English: Mohammed Ali Al-Qahtani, your appointment is confirmed
+Arabic: محمد علي القحطاني، تم تأكيد موعدك"""
+
+
 class TranslationService:
     """Service for detecting language and translating between Arabic and English."""
 
@@ -115,7 +176,7 @@ class TranslationService:
         Args:
             translation_llm: LangChain LLM instance for translation (Cohere model)
         """
-        self.translation_llm = translation_llm
+        self.translation_llm = with_budget(translation_llm, "translation")
 
     def detect_language(self, text: str) -> Literal["arabic", "english"]:
         """
@@ -148,39 +209,8 @@ class TranslationService:
         """
         start_time = time.time()
 
-        # Build dynamic prompts
-        glossary = _build_glossary_prompt()
-        names = _build_names_prompt_ar_to_en()
-
-        system_prompt = f"""You are a deterministic translation engine. You are NOT an AI assistant.
-You do not converse, explain, summarize, or add commentary.
-Output ONLY the English translation - nothing else.
-
-RULES:
-1. Translate Arabic to English accurately
-2. Preserve all formatting, numbers, dates, times, and punctuation
-3. Use glossary terms exactly as specified
-4. Convert Arabic names to their English equivalents using the name mappings
-
-{glossary}
-
-{names}
-
-Examples:
-Arabic: أريد حجز موعد لتنظيف الأسنان
-English: I want to book an appointment for Teeth Cleaning
-
-Arabic: موعدي مع د. سعد بن عبدالعزيز الخالد
-English: My appointment with Dr. Saad bin Abdulaziz Al-Khaled
-
-Arabic: أحتاج علاج قناة الجذر مع دكتور عمر فهد الراشد
-English: I need Root Canal Treatment with Dr. Omar Fahad Al-Rashed
-
-Arabic: أنا محمد علي القحطاني
-English: I am Mohammed Ali Al-Qahtani"""
-
         messages = [
-            SystemMessage(content=system_prompt),
+            SystemMessage(content=TO_ENGLISH_SYSTEM_PROMPT),
             HumanMessage(content=f"Arabic: {text}\nEnglish:")
         ]
 
@@ -221,39 +251,8 @@ English: I am Mohammed Ali Al-Qahtani"""
         """
         start_time = time.time()
 
-        # Build dynamic prompts
-        glossary = _build_glossary_prompt()
-        names = _build_names_prompt_en_to_ar()
-
-        system_prompt = f"""You are a deterministic translation engine. You are NOT an AI assistant.
-You do not converse, explain, summarize, or add commentary.
-Output ONLY the Arabic translation - nothing else.
-
-RULES:
-1. Translate English to Arabic accurately
-2. Preserve all formatting, numbers, dates, times, emails, and punctuation
-3. Use glossary terms exactly as specified (use the Arabic equivalents)
-4. Convert English names to their Arabic equivalents using the name mappings
-
-{glossary}
-
-{names}
-
-Examples:
-English: I've booked your Teeth Cleaning appointment with Dr. Saad bin Abdulaziz Al-Khaled
-Arabic: لقد حجزت موعد تنظيف الأسنان مع د. سعد بن عبدالعزيز الخالد
-
-English: Your Root Canal Treatment is scheduled for November 25 at 3:30 PM
-Arabic: موعد علاج قناة الجذر الخاص بك في 25 نوفمبر الساعة 3:30 مساءً
-
-English: Dr. Omar Fahad Al-Rashed specializes in Periodontics
-Arabic: د. عمر فهد الراشد متخصص في أمراض اللثة
-
-English: Mohammed Ali Al-Qahtani, your appointment is confirmed
-Arabic: محمد علي القحطاني، تم تأكيد موعدك"""
-
         messages = [
-            SystemMessage(content=system_prompt),
+            SystemMessage(content=TO_ARABIC_SYSTEM_PROMPT),
             HumanMessage(content=f"English: {text}\nArabic:")
         ]
 
@@ -283,6 +282,52 @@ Arabic: محمد علي القحطاني، تم تأكيد موعدك"""
         return translated
 
 
+    async def translate_stream_to_arabic(self, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        """
+        Translate a streamed English answer to Arabic sentence by sentence.
+
+        Each sentence is sent for translation as soon as it is complete, so
+        translations overlap with the rest of the English generation. Results
+        are yielded in the original sentence order.
+
+        Args:
+            chunks: Streamed English text pieces
+
+        Yields:
+            Arabic sentences, each followed by its original separator
+        """
+        pending: asyncio.Queue = asyncio.Queue()
+
+        async def translate(sentence: str) -> str:
+            separator = "\n" if "\n" in sentence else " "
+            try:
+                translated = await self.translate_to_arabic(sentence.strip())
+            except Exception as e:
+                print(f"Translation error, sending English sentence: {e}")
+                translated = sentence.strip()
+            return translated + separator
+
+        async def produce():
+            buffer = ""
+            try:
+                async for chunk in chunks:
+                    sentences, buffer = split_sentences(buffer + chunk)
+                    for sentence in sentences:
+                        pending.put_nowait(asyncio.create_task(translate(sentence)))
+                if buffer.strip():
+                    pending.put_nowait(asyncio.create_task(translate(buffer)))
+            finally:
+                pending.put_nowait(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (task := await pending.get()) is not None:
+                yield await task
+            await producer  # Surface errors from the English stream
+        finally:
+            producer.cancel()
+
+
 # Singleton instance (initialized in main.py after LLM client is created)
 _translator_instance = None
 
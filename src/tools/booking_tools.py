@@ -8,10 +8,13 @@ from langchain.tools import tool
 from src.services.calendar import get_calendar
 from src.services.database import get_database
 from src.services.gmail import get_gmail
+from src.utils.concurrency import run_blocking
+from src.utils.slots import record_slots
+from src.utils.speculation import wait_for_guardrail
 
 
 @tool
-def check_my_bookings(patient_email: str) -> str:
+async def check_my_bookings(patient_email: str) -> str:
     """
     Check all upcoming appointments for the patient.
 
@@ -22,8 +25,8 @@ def check_my_bookings(patient_email: str) -> str:
         Formatted string with appointment details
     """
     try:
-        calendar = get_calendar()
-        appointments = calendar.get_patient_appointments(patient_email)
+        calendar = await run_blocking(get_calendar)
+        appointments = await run_blocking(calendar.get_patient_appointments, patient_email)
 
         if not appointments:
             return "You don't have any upcoming appointments."
@@ -53,7 +56,7 @@ def check_my_bookings(patient_email: str) -> str:
 
 
 @tool
-def get_available_doctors() -> str:
+async def get_available_doctors() -> str:
     """
     Get list of all available doctors.
 
@@ -62,7 +65,7 @@ def get_available_doctors() -> str:
     """
     try:
         db = get_database()
-        doctors = db.get_available_doctors()
+        doctors = await run_blocking(db.get_available_doctors)
 
         if not doctors:
             return "No doctors are currently available."
@@ -80,7 +83,7 @@ def get_available_doctors() -> str:
 
 
 @tool
-def get_available_services() -> str:
+async def get_available_services() -> str:
     """
     Get list of all dental services.
 
@@ -89,7 +92,7 @@ def get_available_services() -> str:
     """
     try:
         db = get_database()
-        services = db.get_all_services()
+        services = await run_blocking(db.get_all_services)
 
         if not services:
             return "No services are currently available."
@@ -109,7 +112,7 @@ def get_available_services() -> str:
 
 
 @tool
-def create_new_booking(
+async def create_new_booking(
     patient_email: str,
     patient_name: str,
     doctor_id: str,
@@ -134,16 +137,14 @@ def create_new_booking(
         db = get_database()
 
         # Get doctor info
-        doctor = db.client.table("doctors").select("*").eq("id", doctor_id).execute()
-        if not doctor.data:
+        doctor = await run_blocking(db.get_doctor_by_id, doctor_id)
+        if not doctor:
             return f"Error: Doctor with ID {doctor_id} not found."
-        doctor = doctor.data[0]
 
         # Get service info
-        service = db.client.table("services").select("*").eq("id", service_id).execute()
-        if not service.data:
+        service = await run_blocking(db.get_service_by_id, service_id)
+        if not service:
             return f"Error: Service with ID {service_id} not found."
-        service = service.data[0]
 
         # Parse datetime
         try:
@@ -162,9 +163,11 @@ def create_new_booking(
         # Get doctor's email for calendar
         doctor_email = doctor.get('email', f"doctor_{doctor_id}@clinic.com")
 
-        # Create appointment in Google Calendar
-        calendar = get_calendar()
-        result = calendar.create_appointment(
+        # Create appointment in Google Calendar (only once the guardrail has cleared)
+        await wait_for_guardrail()
+        calendar = await run_blocking(get_calendar)
+        result = await run_blocking(
+            calendar.create_appointment,
             patient_email=patient_email,
             patient_name=patient_name,
             doctor_name=doctor['name'],
@@ -181,7 +184,16 @@ def create_new_booking(
         if result.get('error'):
             return f"❌ Failed to create appointment: {result['message']}"
 
-        # Success
+        # Success - fill the booking flow's slots (and complete it)
+        record_slots(
+            selected_doctor_id=str(doctor_id),
+            selected_doctor_name=doctor['name'],
+            selected_service_id=str(service_id),
+            selected_service_name=service['name'],
+            selected_time_slot=start_time.strftime('%Y-%m-%dT%H:%M'),
+            appointment_id=result.get('id'),
+            completed="booking",
+        )
         formatted_time = start_time.strftime('%A, %B %d, %Y at %I:%M %p')
         return f"""✅ Appointment successfully booked!
 
@@ -203,7 +215,7 @@ IMPORTANT: You MUST now call send_booking_confirmation_email() using the patient
 
 
 @tool
-def send_booking_confirmation_email(
+async def send_booking_confirmation_email(
     patient_email: str,
     patient_name: str,
     service_name: str,
@@ -244,12 +256,14 @@ def send_booking_confirmation_email(
         dt = datetime.strptime(appointment_datetime, "%Y-%m-%d %H:%M")
         print(f"[TOOL DEBUG] Parsed datetime: {dt}")
 
-        # Send email
+        # Send email (only once the guardrail has cleared)
+        await wait_for_guardrail()
         print(f"[TOOL DEBUG] Getting Gmail service...")
         gmail = get_gmail()
 
         print(f"[TOOL DEBUG] Calling gmail.send_booking_confirmation()...")
-        result = gmail.send_booking_confirmation(
+        result = await run_blocking(
+            gmail.send_booking_confirmation,
             patient_email=patient_email,
             patient_name=patient_name,
             service_name=service_name,
@@ -7,10 +7,13 @@ from datetime import datetime
 from langchain.tools import tool
 from src.services.calendar import get_calendar
 from src.services.gmail import get_gmail
+from src.utils.concurrency import run_blocking
+from src.utils.slots import record_slots
+from src.utils.speculation import wait_for_guardrail
 
 
 @tool
-def view_my_appointments(patient_email: str) -> str:
+async def view_my_appointments(patient_email: str) -> str:
     """
     View all upcoming appointments for the patient.
     Shows appointment details in a user-friendly format without IDs.
@@ -22,8 +25,8 @@ def view_my_appointments(patient_email: str) -> str:
         Formatted string with appointment details
     """
     try:
-        calendar = get_calendar()
-        appointments = calendar.get_patient_appointments(patient_email)
+        calendar = await run_blocking(get_calendar)
+        appointments = await run_blocking(calendar.get_patient_appointments, patient_email)
 
         if not appointments:
             return "You don't have any upcoming appointments."
@@ -65,7 +68,7 @@ def view_my_appointments(patient_email: str) -> str:
 
 
 @tool
-def cancel_appointment(
+async def cancel_appointment(
     patient_email: str,
     doctor_name: str = None,
     service_name: str = None,
@@ -84,10 +87,11 @@ def cancel_appointment(
         Success or error message
     """
     try:
-        calendar = get_calendar()
+        calendar = await run_blocking(get_calendar)
 
         # Find the appointment using the criteria
-        appointment = calendar.find_appointment_by_criteria(
+        appointment = await run_blocking(
+            calendar.find_appointment_by_criteria,
             patient_email=patient_email,
             doctor_name=doctor_name,
             service_name=service_name,
@@ -106,6 +110,8 @@ def cancel_appointment(
             criteria_str = " ".join(criteria_parts) if criteria_parts else ""
             return f"I couldn't find an appointment {criteria_str}. Please check your appointments and try again."
 
+        record_slots(appointment_id=appointment['id'])
+
         # Get appointment details for confirmation message
         summary = appointment.get('summary', '')
         service = summary.split(' - ')[0] if ' - ' in summary else 'appointment'
@@ -124,10 +130,12 @@ def cancel_appointment(
         except:
             formatted_time = start_time
 
-        # Delete the appointment
-        result = calendar.delete_appointment(appointment['id'])
+        # Delete the appointment (only once the guardrail has cleared)
+        await wait_for_guardrail()
+        result = await run_blocking(calendar.delete_appointment, appointment['id'])
 
         if result.get('status') == 'success':
+            record_slots(completed="cancel")
             return f"""✅ Appointment cancelled successfully!
 
 Cancelled appointment:
@@ -144,7 +152,7 @@ If you need to book a new appointment, just let me know!"""
 
 
 @tool
-def reschedule_appointment(
+async def reschedule_appointment(
     patient_email: str,
     new_datetime: str,
     doctor_name: str = None,
@@ -169,10 +177,11 @@ def reschedule_appointment(
         Success or error message
     """
     try:
-        calendar = get_calendar()
+        calendar = await run_blocking(get_calendar)
 
         # Find the appointment using the criteria
-        appointment = calendar.find_appointment_by_criteria(
+        appointment = await run_blocking(
+            calendar.find_appointment_by_criteria,
             patient_email=patient_email,
             doctor_name=doctor_name,
             service_name=service_name,
@@ -191,6 +200,8 @@ def reschedule_appointment(
             criteria_str = " ".join(criteria_parts) if criteria_parts else ""
             return f"I couldn't find the appointment {criteria_str}. Please check your appointments and try again."
 
+        record_slots(appointment_id=appointment['id'])
+
         # Get current appointment datetime
         old_start_time = appointment['start_time']
         try:
@@ -240,8 +251,10 @@ def reschedule_appointment(
                 doctor = line.replace('Doctor:', '').split('(')[0].strip()
                 break
 
-        # Update the appointment
-        result = calendar.update_appointment(
+        # Update the appointment (only once the guardrail has cleared)
+        await wait_for_guardrail()
+        result = await run_blocking(
+            calendar.update_appointment,
             event_id=appointment['id'],
             new_start_time=new_start_time
         )
@@ -253,7 +266,8 @@ def reschedule_appointment(
         if result.get('error'):
             return f"❌ Failed to reschedule appointment: {result['message']}"
 
-        # Success
+        # Success - fill the reschedule flow's slots (and complete it)
+        record_slots(selected_time_slot=new_start_time.strftime('%Y-%m-%dT%H:%M'), completed="reschedule")
         new_formatted_time = new_start_time.strftime('%A, %B %d, %Y at %I:%M %p')
         return f"""✅ Appointment rescheduled successfully!
 
@@ -270,7 +284,7 @@ See you at the new time!"""
 
 
 @tool
-def send_cancellation_email(
+async def send_cancellation_email(
     patient_email: str,
     patient_name: str,
     service_name: str,
@@ -308,9 +322,11 @@ def send_cancellation_email(
             except:
                 return f"⚠️ Cancellation successful but email failed: Invalid datetime format"
 
-        # Send email
+        # Send email (only once the guardrail has cleared)
+        await wait_for_guardrail()
         gmail = get_gmail()
-        result = gmail.send_cancellation_confirmation(
+        result = await run_blocking(
+            gmail.send_cancellation_confirmation,
             patient_email=patient_email,
             patient_name=patient_name,
             service_name=service_name,
@@ -328,7 +344,7 @@ def send_cancellation_email(
 
 
 @tool
-def send_reschedule_email(
+async def send_reschedule_email(
     patient_email: str,
     patient_name: str,
     service_name: str,
@@ -383,9 +399,11 @@ def send_reschedule_email(
         if not old_dt or not new_dt:
             return f"⚠️ Reschedule successful but email failed: Invalid datetime format"
 
-        # Send email
+        # Send email (only once the guardrail has cleared)
+        await wait_for_guardrail()
         gmail = get_gmail()
-        result = gmail.send_reschedule_confirmation(
+        result = await run_blocking(
+            gmail.send_reschedule_confirmation,
             patient_email=patient_email,
             patient_name=patient_name,
             service_name=service_name,
@@ -5,10 +5,12 @@ Wraps the knowledge base retriever as a callable tool
 
 from langchain.tools import tool
 from src.rag.retriever import get_retriever
+from src.utils.concurrency import run_blocking
+from src.utils.slots import record_slots
 
 
 @tool
-def query_knowledge_base(question: str) -> str:
+async def query_knowledge_base(question: str) -> str:
     """
     Search the dental clinic knowledge base for relevant information.
 
@@ -34,10 +36,11 @@ def query_knowledge_base(question: str) -> str:
         A string containing the most relevant information from the knowledge base
     """
     try:
-        retriever = get_retriever()
+        retriever = await run_blocking(get_retriever)
 
         # Query the knowledge base (k=2 for faster responses)
-        docs = retriever.query(question, k=2)
+        results = await run_blocking(retriever.query_with_scores, question, k=2)
+        docs = [doc for doc, _ in results]
 
         if not docs:
             return (
@@ -45,6 +48,9 @@ def query_knowledge_base(question: str) -> str:
                 "Could you rephrase your question, or I can connect you with our staff for assistance."
             )
 
+        # Best match distance: the model cascade's confidence signal for the answer
+        record_slots(retrieval_distance=min(score for _, score in results))
+
         # Combine retrieved documents with separators
         context = "\n\n---\n\n".join(docs)
 
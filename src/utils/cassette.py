@@ -0,0 +1,440 @@
+"""
+Conversation Cassettes
+Record and replay of a conversation's external calls (CASSETTE_MODE).
+
+record: every outbound LLM request (at the shared HTTP transport, streamed
+        responses chunk by chunk), Supabase query, Google Calendar call and
+        Gmail send made for a conversation is written, with its timing, to
+        CASSETTE_DIR/<conversation_id>.json.gz, along with the patient turns.
+replay: the same calls are answered from the cassette instead of the
+        network, after their recorded latency times CASSETTE_SPEED
+        (1 = original timings, 0.1 = ten times faster, 0 = instant).
+
+Replayed calls are matched by a fingerprint of the request (LLM body,
+service method and arguments, with second-precision timestamps masked). A
+request that still differs from the recording falls back to the next unused
+call of the same kind, and is counted as a fallback. Services are recorded at their
+public methods, so Gmail sends are captured but never made on replay.
+
+The cassette is bound to the running context with use_cassette(), like the
+turn telemetry record; calls made outside one go to the network as usual.
+While recording, the file is rewritten after each turn on the blocking thread
+pool (save_soon), never on the event loop; flush_cassettes() waits for the
+pending writes on shutdown.
+Replay a recorded conversation with `python -m benchmarks.replay`.
+"""
+
+import asyncio
+import codecs
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+import httpx
+from src.config.settings import settings
+from src.utils.concurrency import get_blocking_executor, run_in_background
+from src.utils.telemetry import current_turn
+
+
+CASSETTE_VERSION = 1
+
+# Response headers kept for replay
+_KEPT_HEADERS = ("content-type",)
+
+# "Now" timestamps (prompt headers, ticket times) are masked in request fingerprints
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(\.\d+)?")
+
+
+class CassetteMiss(LookupError):
+    """A replayed call has no recorded counterpart"""
+
+
+class RecordedError(Exception):
+    """Replays an error a service call raised while recording"""
+
+
+def _jsonable(value: Any) -> Any:
+    """JSON round trip (datetimes and other objects become strings)"""
+    return json.loads(json.dumps(value, default=str, ensure_ascii=False))
+
+
+def _fingerprint(*parts: Any) -> str:
+    payload = _TIMESTAMP.sub("<now>", json.dumps(parts, default=str, sort_keys=True, ensure_ascii=False))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class Cassette:
+    """Recorded external calls and turns of one conversation"""
+
+    def __init__(self, conversation_id: str, path: str, mode: str):
+        self.conversation_id = conversation_id
+        self.path = path
+        self.mode = mode
+        self.meta: dict = {}
+        self.turns: list = []  # Recorded turns: message, response, latency
+        self.calls: list = []
+        self.replayed_turns: list = []
+        self.fallbacks = 0  # Replayed calls served by order instead of fingerprint
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # One file write at a time
+        self._save_pending = False
+        self._start = time.perf_counter()
+        self._used: set = set()
+        if os.path.exists(path):
+            self._load()
+        elif mode == "replay":
+            raise FileNotFoundError(f"No cassette for conversation {conversation_id} at {path}")
+
+    # ---- persistence -------------------------------------------------------
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        self.meta = data.get("meta", {})
+        self.turns = data.get("turns", [])
+        self.calls = data.get("calls", [])
+        if self.mode == "record":
+            # Resumed conversation: keep appending after the earlier calls
+            self._start -= max((c["at_ms"] + c["elapsed_ms"] for c in self.calls), default=0) / 1000
+
+    def save(self):
+        """Write the cassette (record mode only)"""
+        if self.mode != "record":
+            return
+        with self._lock:
+            data = {"version": CASSETTE_VERSION, "conversation_id": self.conversation_id,
+                    "meta": self.meta, "turns": list(self.turns), "calls": list(self.calls)}
+        with self._write_lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+
+    def save_soon(self):
+        """
+        Write the cassette on the blocking thread pool without waiting (record mode only).
+
+        At most one write is queued: turns added before it starts go into it,
+        later ones schedule the next. Writes right away outside an event loop.
+        """
+        if self.mode != "record":
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        with self._lock:
+            if self._save_pending:
+                return
+            self._save_pending = True
+        task = run_in_background(self._pending_save(), name=f"cassette-save-{self.conversation_id}")
+        _pending_saves.add(task)
+        task.add_done_callback(_pending_saves.discard)
+
+    async def _pending_save(self):
+        def write():
+            with self._lock:
+                self._save_pending = False
+            self.save()
+
+        await asyncio.get_running_loop().run_in_executor(get_blocking_executor(), write)
+
+    # ---- turns -------------------------------------------------------------
+
+    def add_turn(self, state: dict, message: str, response: str):
+        """
+        Record a finished patient turn (replay mode: keep it for comparison).
+
+        Args:
+            state: AgentState after the turn (patient fields go into the metadata)
+            message: Patient message as received
+            response: Reply as sent to the patient
+        """
+        record = current_turn()
+        turn = {
+            "message": message,
+            "response": response,
+            "intent": state.get("current_intent"),
+            "latency_ms": round(record.offset_ms(time.perf_counter()), 1) if record else None,
+        }
+        if self.mode == "replay":
+            self.replayed_turns.append(turn)
+            return
+        self.meta.setdefault("patient", {key: state.get(f"patient_{key}") for key in ("id", "name", "email", "phone")})
+        self.meta.setdefault("recorded_at", time.strftime("%Y-%m-%dT%H:%M:%S"))
+        with self._lock:
+            self.turns.append(turn)
+        self.save_soon()
+
+    # ---- calls -------------------------------------------------------------
+
+    def _now_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def _add(self, call: dict):
+        with self._lock:
+            self.calls.append(call)
+
+    def _take(self, kind: str, name: str, key: str) -> dict:
+        """Recorded call for a replayed request: same fingerprint, else next of the same kind"""
+        with self._lock:
+            same_key = [i for i, c in enumerate(self.calls) if c["kind"] == kind and c["key"] == key]
+            unused = [i for i in same_key if i not in self._used]
+            if not unused and same_key:
+                return self.calls[same_key[-1]]  # A duplicate (hedged) request gets the same answer
+            if not unused:
+                unused = [i for i, c in enumerate(self.calls)
+                          if c["kind"] == kind and c["name"] == name and i not in self._used][:1]
+                if not unused:
+                    raise CassetteMiss(f"No recorded {kind} call '{name}' left in {self.path}")
+                self.fallbacks += 1
+            self._used.add(unused[0])
+            return self.calls[unused[0]]
+
+    def call(self, kind: str, name: str, args: tuple, kwargs: dict, run: Callable[[], Any]) -> Any:
+        """
+        Record or replay one blocking service call.
+
+        Args:
+            kind: Service ("database", "calendar", "gmail")
+            name: Method name
+            args: Positional arguments
+            kwargs: Keyword arguments
+            run: Makes the real call (record mode)
+
+        Returns:
+            The real result, or the recorded one (as JSON values)
+        """
+        key = _fingerprint(name, args, kwargs)
+        if self.mode == "replay":
+            call = self._take(kind, name, key)
+            time.sleep(call["elapsed_ms"] * settings.cassette_speed / 1000)
+            if "error" in call:
+                raise RecordedError(call["error"])
+            return _jsonable(call["result"])
+
+        at = self._now_ms()
+        entry = {"kind": kind, "name": name, "key": key, "at_ms": round(at, 1),
+                 "args": _jsonable([list(args), kwargs])}
+        try:
+            result = run()
+            entry["result"] = _jsonable(result)
+            return result
+        except Exception as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            entry["elapsed_ms"] = round(self._now_ms() - at, 1)
+            self._add(entry)
+
+    async def http(self, request: httpx.Request,
+                   send: Callable[[httpx.Request], Any]) -> httpx.Response:
+        """
+        Record or replay one LLM HTTP request (at the transport).
+
+        Args:
+            request: Outgoing request
+            send: Sends it on the real connection pool (record mode)
+
+        Returns:
+            The response; its body is recorded as it is read
+        """
+        body = (await request.aread()).decode("utf-8", "replace")
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            payload = body
+        # Endpoint without the base URL's path, so a cassette replays against any provider URL
+        name = f"{request.method} {'/'.join(request.url.path.rstrip('/').split('/')[-2:])}"
+        if isinstance(payload, dict) and payload.get("stream"):
+            name += " (stream)"  # Never served to a non-streamed request, or the other way round
+        key = _fingerprint(name, payload)
+
+        if self.mode == "replay":
+            call = self._take("llm", name, key)
+            await asyncio.sleep(call["elapsed_ms"] * settings.cassette_speed / 1000)
+            return httpx.Response(call["status"], headers=call["headers"],
+                                  stream=_ReplayStream(call["chunks"], call["elapsed_ms"]))
+
+        request.headers["accept-encoding"] = "identity"  # Plain-text bodies in the cassette
+        at = self._now_ms()
+        response = await send(request)
+        entry = {"kind": "llm", "name": name, "key": key, "at_ms": round(at, 1),
+                 "elapsed_ms": round(self._now_ms() - at, 1), "request": payload,
+                 "status": response.status_code,
+                 "headers": {h: response.headers[h] for h in _KEPT_HEADERS if h in response.headers}}
+        recording = _RecordingStream(response.stream, lambda chunks: self._add({**entry, "chunks": chunks}),
+                                     started=self._start + at / 1000)
+        return httpx.Response(response.status_code, headers=response.headers, stream=recording,
+                              extensions=response.extensions)
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    """Passes a response body through, keeping each chunk with its offset from the request"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_complete: Callable[[list], None], started: float):
+        self.stream = stream
+        self.on_complete = on_complete
+        self.started = started
+        self.chunks = []
+        self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+
+    async def __aiter__(self):
+        async for data in self.stream:
+            text = self._decoder.decode(data)
+            if text:
+                self.chunks.append([round((time.perf_counter() - self.started) * 1000, 1), text])
+            yield data
+        # Only complete bodies are kept (a cancelled hedge is not)
+        self.on_complete(self.chunks)
+
+    async def aclose(self):
+        await self.stream.aclose()
+
+
+class _ReplayStream(httpx.AsyncByteStream):
+    """Serves recorded body chunks at their recorded offsets (times CASSETTE_SPEED)"""
+
+    def __init__(self, chunks: list, headers_ms: float):
+        self.chunks = chunks
+        self.headers_ms = headers_ms
+
+    async def __aiter__(self):
+        previous = self.headers_ms
+        for offset_ms, text in self.chunks:
+            await asyncio.sleep(max(0.0, offset_ms - previous) * settings.cassette_speed / 1000)
+            previous = offset_ms
+            yield text.encode("utf-8")
+
+
+class CassetteService:
+    """
+    Service wrapper that sends public method calls through the current cassette.
+
+    The real service is only created for calls that reach it, so replay
+    works without its credentials.
+    """
+
+    def __init__(self, kind: str, service_class: type):
+        self._kind = kind
+        self._service_class = service_class
+        self._service = None
+        self._lock = threading.Lock()
+
+    def _real(self):
+        with self._lock:
+            if self._service is None:
+                self._service = self._service_class()
+            return self._service
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or not callable(getattr(self._service_class, name, None)):
+            return getattr(self._real(), name)
+
+        def call(*args, **kwargs):
+            cassette = current_cassette()
+            if cassette is None:
+                return getattr(self._real(), name)(*args, **kwargs)
+            return cassette.call(self._kind, name, args, kwargs, lambda: getattr(self._real(), name)(*args, **kwargs))
+
+        return call
+
+
+def cassette_service(kind: str, service_class: type):
+    """
+    Create a service singleton, wrapped for recording/replay when CASSETTE_MODE is on.
+
+    Args:
+        kind: Name in the cassette (e.g., "database")
+        service_class: Service to create
+
+    Returns:
+        service_class() when cassettes are off, else a CassetteService
+    """
+    if settings.cassette_mode not in ("record", "replay"):
+        return service_class()
+    return CassetteService(kind, service_class)
+
+
+# =============================================================================
+# ACTIVE CASSETTE
+# =============================================================================
+
+_current_cassette: ContextVar[Optional[Cassette]] = ContextVar("current_cassette", default=None)
+_cassettes: dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+_pending_saves: set = set()  # Background writes started by save_soon()
+
+
+def current_cassette() -> Optional[Cassette]:
+    """The cassette bound to this context (None when off or outside a conversation)"""
+    return _current_cassette.get()
+
+
+def get_cassette(conversation_id: Optional[str]) -> Optional[Cassette]:
+    """
+    Get or open the cassette of a conversation.
+
+    Args:
+        conversation_id: Conversation to record or replay
+
+    Returns:
+        The Cassette, or None when CASSETTE_MODE is off
+
+    Raises:
+        FileNotFoundError: In replay mode, if the conversation was not recorded
+    """
+    if settings.cassette_mode not in ("record", "replay") or not conversation_id:
+        return None
+    with _cassettes_lock:
+        cassette = _cassettes.get(conversation_id)
+        if cassette is None:
+            path = os.path.join(settings.cassette_dir, f"{conversation_id}.json.gz")
+            cassette = _cassettes[conversation_id] = Cassette(conversation_id, path, settings.cassette_mode)
+        return cassette
+
+
+def activate_cassette(conversation_id: Optional[str]) -> Optional[Cassette]:
+    """Bind a conversation's cassette to the current context until replaced (CLI sessions)"""
+    cassette = get_cassette(conversation_id)
+    _current_cassette.set(cassette)
+    return cassette
+
+
+@contextmanager
+def use_cassette(conversation_id: Optional[str], close: bool = False):
+    """
+    Record or replay the enclosed work in a conversation's cassette.
+
+    Args:
+        conversation_id: Conversation the work belongs to
+        close: Drop the cassette from memory afterwards (conversation finished)
+
+    Yields:
+        The Cassette, or None when CASSETTE_MODE is off
+    """
+    cassette = get_cassette(conversation_id)
+    token = _current_cassette.set(cassette)
+    try:
+        yield cassette
+    finally:
+        _current_cassette.reset(token)
+        if cassette is not None:
+            cassette.save_soon()
+            if close:
+                with _cassettes_lock:
+                    _cassettes.pop(conversation_id, None)
+
+
+async def flush_cassettes():
+    """Wait for the cassette writes still running in the background (on shutdown)"""
+    while _pending_saves:
+        await asyncio.gather(*list(_pending_saves), return_exceptions=True)
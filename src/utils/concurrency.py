@@ -0,0 +1,76 @@
+"""
+Concurrency helpers
+Offloads blocking client libraries (Google Calendar, Supabase, SMTP, Chroma)
+to a bounded thread pool so they never stall the event loop
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from src.config.settings import settings
+from src.utils.telemetry import span
+
+
+# Shared pool for blocking I/O (created lazily, sized from settings)
+_executor = None
+
+# Fire-and-forget tasks, referenced until they finish (the event loop only keeps weak references)
+_background_tasks: set = set()
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """Get or create the bounded thread pool used for blocking I/O"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.blocking_io_workers,
+            thread_name_prefix="blocking-io",
+        )
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking function on the bounded thread pool and await its result.
+
+    Context variables are copied into the worker thread so per-turn state
+    set by the caller stays visible inside the blocking call. The call
+    (including time queued for a worker) is recorded as a "service" span.
+
+    Args:
+        func: Blocking callable (e.g., calendar.get_patient_appointments)
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        Whatever func returns
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    with span("service", getattr(func, "__qualname__", type(func).__name__)):
+        return await loop.run_in_executor(get_blocking_executor(), call)
+
+
+def _log_background_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background task {task.get_name()} failed: {task.exception()!r}")
+
+
+def run_in_background(coro, name: str) -> asyncio.Task:
+    """
+    Start a fire-and-forget task (shadow checks, audits) that is kept alive until it finishes.
+
+    Args:
+        coro: Coroutine to run
+        name: Task name, used when its failure is logged
+
+    Returns:
+        The started task
+    """
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    task.add_done_callback(_log_background_failure)
+    return task
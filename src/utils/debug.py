@@ -97,6 +97,8 @@ class DebugLogger:
         if tokens:
             print(f"{Fore.CYAN}├─ Input Tokens: {tokens.get('input_tokens', 'N/A')}{Style.RESET_ALL}")
             print(f"{Fore.CYAN}├─ Output Tokens: {tokens.get('output_tokens', 'N/A')}{Style.RESET_ALL}")
+            if tokens.get('cached_tokens'):
+                print(f"{Fore.CYAN}├─ Cached Input Tokens: {tokens['cached_tokens']}{Style.RESET_ALL}")
             print(f"{Fore.CYAN}└─ Total Tokens: {tokens.get('total_tokens', 'N/A')}{Style.RESET_ALL}")
         else:
             print(f"{Fore.CYAN}└─ Tokens: N/A{Style.RESET_ALL}")
@@ -109,6 +111,25 @@ class DebugLogger:
         print(f"{Fore.YELLOW}├─ Intent: {intent}{Style.RESET_ALL}")
         print(f"{Fore.YELLOW}└─ Agent: {agent_name}{Style.RESET_ALL}")
 
+    def print_classification(self, kind: str, label: str, source: str,
+                             confidence: Optional[float] = None):
+        """Print a classification decision and which tier made it"""
+        if not self.enabled:
+            return
+        detail = f" (confidence {confidence:.2f})" if confidence is not None else ""
+        print(f"\n{Fore.YELLOW}{Style.BRIGHT}🎯 {kind}: {label}{Style.RESET_ALL}"
+              f"{Fore.YELLOW} via {source}{detail}{Style.RESET_ALL}")
+
+    def print_stats(self, title: str, stats: dict):
+        """Print a block of counters (e.g. classifier hit rates)"""
+        if not self.enabled:
+            return
+        print(f"\n{Fore.CYAN}{Style.BRIGHT}📈 {title}:{Style.RESET_ALL}")
+        items = list(stats.items())
+        for i, (key, value) in enumerate(items):
+            branch = "└─" if i == len(items) - 1 else "├─"
+            print(f"{Fore.CYAN}{branch} {key}: {value}{Style.RESET_ALL}")
+
     def print_state_info(self, language: str, message_count: int):
         """Print state information"""
         if not self.enabled:
@@ -0,0 +1,30 @@
+"""
+Sentence splitting for streamed text
+Used to release streamed answers and translate them one sentence at a time
+"""
+
+import re
+
+
+# Sentence boundary: terminal punctuation (incl. Arabic question mark) + space, or a newline
+SENTENCE_END = re.compile(r"(?<=[.!?؟])\s+|\n+")
+
+
+def split_sentences(buffer: str) -> tuple[list[str], str]:
+    """
+    Split complete sentences off the front of a text buffer.
+
+    Args:
+        buffer: Accumulated streamed text
+
+    Returns:
+        Tuple of (complete sentences, remaining partial sentence). Each
+        sentence keeps its trailing separator so line breaks can be restored.
+    """
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(buffer):
+        if buffer[start:match.start()].strip():
+            sentences.append(buffer[start:match.end()])
+        start = match.end()
+    return sentences, buffer[start:]
@@ -0,0 +1,36 @@
+"""
+Tool Slot Recorder
+Lets tools report the booking facts they resolved (doctor, service, time,
+appointment ID, completed action) back to the agent node that ran them,
+without putting IDs into the text the LLM sees. The knowledge base tool
+reports its best retrieval distance the same way (model cascade).
+
+The agent node calls collect_slots() before invoking its executor; tools
+running inside that invocation call record_slots(). Outside a collecting
+run (e.g. a tool called directly) recording is a no-op.
+"""
+
+from contextvars import ContextVar
+from typing import Optional
+
+
+_recorded_slots: ContextVar[Optional[dict]] = ContextVar("recorded_slots", default=None)
+
+
+def collect_slots() -> dict:
+    """
+    Start collecting slots in the current context.
+
+    Returns:
+        The dict that tools fill in (read it after the agent run)
+    """
+    slots = {}
+    _recorded_slots.set(slots)
+    return slots
+
+
+def record_slots(**values):
+    """Report resolved slots from a tool (keys are AgentState field names, plus "completed" and "retrieval_distance")"""
+    slots = _recorded_slots.get()
+    if slots is not None:
+        slots.update(values)
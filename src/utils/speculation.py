@@ -0,0 +1,51 @@
+"""
+Speculative Execution Support
+Lets a specialist agent start before the sentiment guardrail has finished,
+while keeping side-effecting tools behind the guardrail's verdict
+"""
+
+import asyncio
+from contextvars import ContextVar, Token
+from typing import Optional
+
+
+# Custom callback event dispatched when the guardrail clears a speculative run;
+# streaming holds speculative agent output until it sees this event
+GUARDRAIL_CLEARED_EVENT = "guardrail_cleared"
+
+# Set by the speculative node for the duration of a speculative agent run.
+# None means the guardrail has already cleared the turn (normal execution).
+_guardrail_gate: ContextVar[Optional[asyncio.Event]] = ContextVar("guardrail_gate", default=None)
+
+
+def open_gate() -> tuple[asyncio.Event, Token]:
+    """
+    Install a guardrail gate in the current context.
+
+    Tasks created afterwards inherit the gate; call reset_gate(token) once the
+    speculative task has been started.
+
+    Returns:
+        Tuple of (Event that must be set once the guardrail clears the turn,
+        token that restores the previous gate)
+    """
+    gate = asyncio.Event()
+    return gate, _guardrail_gate.set(gate)
+
+
+def reset_gate(token: Token):
+    """Restore the gate that was in place before open_gate()"""
+    _guardrail_gate.reset(token)
+
+
+async def wait_for_guardrail():
+    """
+    Wait until the sentiment guardrail has cleared the current turn.
+
+    Tools that change the outside world (bookings, cancellations, emails)
+    call this before acting. Outside speculative mode it returns at once;
+    inside it, the run is either released or cancelled by the speculative node.
+    """
+    gate = _guardrail_gate.get()
+    if gate is not None:
+        await gate.wait()
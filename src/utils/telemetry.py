@@ -0,0 +1,430 @@
+"""
+Turn Telemetry
+Per-turn record of latency, tokens and estimated cost for every graph node,
+LLM call, tool call and blocking service call.
+
+A turn is opened by the caller (CLI or server) with `turn_telemetry()` or
+`start_turn()` / `finish_turn()`; the
+record lives in a ContextVar, so nodes, callbacks and `run_blocking` workers
+all append their spans to the same record without any plumbing.
+
+Records for TELEMETRY_LOG_PATH are written by a background thread, never on
+the event loop; the queue is flushed at exit (or by flush_telemetry_log()).
+"""
+
+import asyncio
+import atexit
+import json
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Optional
+from uuid import UUID
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+from src.config.settings import settings
+from src.utils.tokens import estimate_tokens
+
+
+# USD per 1M tokens (input, output) - OpenRouter list prices, used for estimates only
+MODEL_PRICES = {
+    "qwen/qwen3-14b": (0.06, 0.24),
+    "qwen/qwen3-8b": (0.035, 0.138),
+    "cohere/command-r7b-12-2024": (0.0375, 0.15),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    Estimate the USD cost of one LLM call.
+
+    Args:
+        model: Model name as sent to OpenRouter
+        prompt_tokens: Input tokens
+        completion_tokens: Output tokens
+
+    Returns:
+        Estimated cost (0.0 for models without a known price)
+    """
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+@dataclass
+class Span:
+    """One timed unit of work inside a turn"""
+    kind: str  # "node", "llm", "tool" or "service"
+    name: str
+    start_ms: float  # Offset from turn start
+    latency_ms: float
+    model: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0  # Prompt tokens the provider served from its prefix cache
+    cost_usd: float = 0.0
+    tokens_estimated: bool = False  # Provider returned no usage; counted locally
+    truncated: bool = False  # Output stopped at the call site's max_tokens
+    error: Optional[str] = None
+
+
+@dataclass
+class TurnRecord:
+    """Everything measured during one patient turn"""
+    conversation_id: Optional[str]
+    started_at: float = field(default_factory=time.time)
+    spans: list = field(default_factory=list)
+    latency_ms: float = 0.0
+    queue_ms: float = 0.0  # Time spent waiting for a turn slot before the graph ran
+    budget_overruns: int = 0  # Prompts over their call site's input budget (src/llm/budget.py)
+    _start: float = field(default_factory=time.perf_counter, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def offset_ms(self, at: float) -> float:
+        """Milliseconds between turn start and a perf_counter timestamp"""
+        return (at - self._start) * 1000
+
+    def add(self, span: Span):
+        """Append a span (thread-safe: service spans come from worker threads)"""
+        with self._lock:
+            self.spans.append(span)
+
+    def totals(self) -> dict:
+        """Token and cost totals over all LLM spans"""
+        llm = [s for s in self.spans if s.kind == "llm"]
+        prompt_tokens = sum(s.prompt_tokens for s in llm)
+        cached_tokens = sum(s.cached_tokens for s in llm)
+        return {
+            "llm_calls": len(llm),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": sum(s.completion_tokens for s in llm),
+            "cached_tokens": cached_tokens,
+            "cache_hit_rate": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else 0.0,
+            "cost_usd": round(sum(s.cost_usd for s in llm), 6),
+            "budget_overruns": self.budget_overruns,
+            "output_cap_hits": sum(1 for s in llm if s.truncated),
+        }
+
+    def token_metrics(self) -> dict:
+        """Token totals in the shape debug.print_metrics expects"""
+        totals = self.totals()
+        return {
+            "input_tokens": totals["prompt_tokens"],
+            "output_tokens": totals["completion_tokens"],
+            "total_tokens": totals["prompt_tokens"] + totals["completion_tokens"],
+            "cached_tokens": totals["cached_tokens"],
+        }
+
+    def summary(self) -> dict:
+        """Compact per-span summary for debug output"""
+        lines = {"turn": f"{self.latency_ms:.0f} ms"}
+        if self.queue_ms:
+            lines["queued"] = f"{self.queue_ms:.0f} ms"
+        for span in self.spans:
+            label = f"{span.kind}:{span.name}"
+            detail = f"{span.latency_ms:.0f} ms"
+            if span.kind == "llm":
+                detail += f", {span.prompt_tokens}+{span.completion_tokens} tok"
+                if span.cached_tokens:
+                    detail += f" ({span.cached_tokens} cached)"
+                if span.tokens_estimated:
+                    detail += " (est)"
+                if span.truncated:
+                    detail += " (hit max_tokens)"
+            if span.error:
+                detail += f", error: {span.error}"
+            # Repeated spans (e.g. several agent LLM rounds) get numbered labels
+            key, n = label, 2
+            while key in lines:
+                key, n = f"{label} #{n}", n + 1
+            lines[key] = detail
+        totals = self.totals()
+        lines["total"] = f"{totals['prompt_tokens']}+{totals['completion_tokens']} tok, ${totals['cost_usd']:.6f}"
+        if totals["cached_tokens"]:
+            lines["prompt cache"] = f"{totals['cached_tokens']} tok ({totals['cache_hit_rate']:.0%} of input)"
+        if totals["budget_overruns"] or totals["output_cap_hits"]:
+            lines["token budgets"] = (f"{totals['budget_overruns']} prompt(s) trimmed, "
+                                      f"{totals['output_cap_hits']} output(s) hit max_tokens")
+        return lines
+
+    def to_dict(self) -> dict:
+        """JSON-serializable record"""
+        return {
+            "conversation_id": self.conversation_id,
+            "started_at": self.started_at,
+            "latency_ms": round(self.latency_ms, 1),
+            "queue_ms": round(self.queue_ms, 1),
+            **self.totals(),
+            "spans": [asdict(s) for s in self.spans],
+        }
+
+
+_current_turn: ContextVar[Optional[TurnRecord]] = ContextVar("current_turn", default=None)
+_log_lock = threading.Lock()
+_log_queue: queue.Queue = queue.Queue()  # Finished records waiting for the log writer
+_log_writer: Optional[threading.Thread] = None
+
+# Extra consumers of finished records (e.g. the load-test harness)
+_sinks: list[Callable[[TurnRecord], None]] = []
+
+
+def current_turn() -> Optional[TurnRecord]:
+    """The record of the turn running in this context (None outside a turn)"""
+    return _current_turn.get()
+
+
+def add_sink(sink: Callable[[TurnRecord], None]):
+    """Register a callable that receives every finished TurnRecord"""
+    _sinks.append(sink)
+
+
+def remove_sink(sink: Callable[[TurnRecord], None]):
+    """Unregister a sink added with add_sink"""
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+def start_turn(conversation_id: Optional[str] = None) -> TurnRecord:
+    """
+    Open a turn record in the current context.
+
+    Args:
+        conversation_id: Conversation the turn belongs to
+
+    Returns:
+        The TurnRecord that spans are appended to
+    """
+    record = TurnRecord(conversation_id=conversation_id)
+    _current_turn.set(record)
+    return record
+
+
+def finish_turn() -> Optional[TurnRecord]:
+    """
+    Close the current turn record.
+
+    Sets the total latency, hands the record to any registered sinks and,
+    if TELEMETRY_LOG_PATH is set, queues it for the log writer (one JSON line).
+
+    Returns:
+        The finished record (None if no turn was open)
+    """
+    record = _current_turn.get()
+    if record is None:
+        return None
+    record.latency_ms = record.offset_ms(time.perf_counter())
+    _current_turn.set(None)
+    for sink in _sinks:
+        try:
+            sink(record)
+        except Exception as e:
+            print(f"Telemetry sink failed: {e}")
+    if settings.telemetry_log_path:
+        _append_log(record)
+    return record
+
+
+@contextmanager
+def turn_telemetry(conversation_id: Optional[str] = None):
+    """
+    Record the enclosed work as one turn (start_turn / finish_turn).
+
+    Yields:
+        The TurnRecord being filled
+    """
+    record = start_turn(conversation_id)
+    try:
+        yield record
+    finally:
+        finish_turn()
+
+
+def _append_log(record: TurnRecord):
+    """Queue a finished record for the JSONL telemetry log"""
+    global _log_writer
+    with _log_lock:
+        if _log_writer is None:
+            _log_writer = threading.Thread(target=_write_log, name="telemetry-log", daemon=True)
+            _log_writer.start()
+            atexit.register(flush_telemetry_log)
+    _log_queue.put(record.to_dict())
+
+
+def _write_log():
+    """Log writer thread: appends queued records, batching those that arrived together"""
+    while True:
+        records = [_log_queue.get()]
+        while True:
+            try:
+                records.append(_log_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+            with open(settings.telemetry_log_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except Exception as e:
+            print(f"Failed to write {len(records)} telemetry record(s): {e}")
+        finally:
+            for _ in records:
+                _log_queue.task_done()
+
+
+def flush_telemetry_log():
+    """Block until every queued telemetry record is written"""
+    _log_queue.join()
+
+
+@contextmanager
+def span(kind: str, name: str):
+    """Time a block of work as a span of the current turn (no-op outside a turn)"""
+    record = _current_turn.get()
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        end = time.perf_counter()
+        record.add(Span(kind=kind, name=name, start_ms=record.offset_ms(start),
+                        latency_ms=(end - start) * 1000, error=error))
+
+
+def instrument_node(name: str, func):
+    """
+    Wrap a graph node so each execution is recorded as a "node" span.
+
+    Args:
+        name: Node name in the workflow
+        func: Node function (sync or async)
+
+    Returns:
+        Async node function with the same behaviour
+    """
+    async def node(state):
+        with span("node", name):
+            result = func(state)
+            if asyncio.iscoroutine(result):
+                result = await result
+            return result
+
+    node.__name__ = getattr(func, "__name__", name)
+    return node
+
+
+def _usage_from_result(response: LLMResult) -> tuple[int, int, int]:
+    """
+    Read (prompt, completion, cached prompt) tokens from an LLM result, streamed or not.
+
+    Cached tokens come from the OpenAI-style `prompt_tokens_details.cached_tokens`
+    in the token usage (llm_output or the message's response_metadata), or from
+    `input_token_details.cache_read` in usage_metadata.
+    """
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        return usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0, cached
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+            if usage:
+                cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+                return usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0, cached
+            metadata = getattr(message, "usage_metadata", None)
+            if metadata:
+                cached = (metadata.get("input_token_details") or {}).get("cache_read") or 0
+                return metadata.get("input_tokens", 0), metadata.get("output_tokens", 0), cached
+    return 0, 0, 0
+
+
+def _finish_reason(response: LLMResult) -> Optional[str]:
+    """Why generation stopped ("stop", "length", "tool_calls", ...), if the provider said"""
+    for generations in response.generations:
+        for generation in generations:
+            reason = (generation.generation_info or {}).get("finish_reason")
+            message = getattr(generation, "message", None)
+            reason = reason or (getattr(message, "response_metadata", None) or {}).get("finish_reason")
+            if reason:
+                return reason
+    return None
+
+
+class TelemetryCallbackHandler(AsyncCallbackHandler):
+    """
+    Records LLM and tool runs as spans of the current turn.
+
+    Attached to the LLM clients and agent tools at construction time, so it
+    sees every call no matter which config the caller passes.
+    """
+
+    def __init__(self):
+        self._runs: dict[UUID, dict] = {}
+
+    async def on_chat_model_start(self, serialized: dict, messages: list, *, run_id: UUID,
+                                  metadata: Optional[dict] = None, **kwargs: Any) -> None:
+        if _current_turn.get() is None:
+            return
+        metadata = metadata or {}
+        caller = metadata.get("langgraph_node")
+        client = serialized.get("name") or "llm"
+        self._runs[run_id] = {
+            "start": time.perf_counter(),
+            "name": f"{caller}/{client}" if caller else client,
+            "model": metadata.get("ls_model_name"),
+            "prompt_text": "".join(str(m.content) for batch in messages for m in batch),
+        }
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        record = _current_turn.get()
+        if run is None or record is None:
+            return
+        prompt_tokens, completion_tokens, cached_tokens = _usage_from_result(response)
+        estimated = not (prompt_tokens or completion_tokens)
+        if estimated:
+            output = "".join(g.text for gens in response.generations for g in gens)
+            prompt_tokens, completion_tokens = estimate_tokens(run["prompt_text"]), estimate_tokens(output)
+        self._add(record, run, "llm", prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                  cached_tokens=cached_tokens, cost_usd=estimate_cost(run["model"], prompt_tokens, completion_tokens),
+                  tokens_estimated=estimated, truncated=_finish_reason(response) == "length")
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        record = _current_turn.get()
+        if run is not None and record is not None:
+            self._add(record, run, "llm", error=type(error).__name__)
+
+    async def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        if _current_turn.get() is None:
+            return
+        self._runs[run_id] = {"start": time.perf_counter(), "name": serialized.get("name") or "tool", "model": None}
+
+    async def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        record = _current_turn.get()
+        if run is not None and record is not None:
+            self._add(record, run, "tool")
+
+    async def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        record = _current_turn.get()
+        if run is not None and record is not None:
+            self._add(record, run, "tool", error=type(error).__name__)
+
+    @staticmethod
+    def _add(record: TurnRecord, run: dict, kind: str, **fields):
+        end = time.perf_counter()
+        record.add(Span(kind=kind, name=run["name"], start_ms=record.offset_ms(run["start"]),
+                        latency_ms=(end - run["start"]) * 1000, model=run["model"], **fields))
+
+
+# Shared handler attached to the LLM clients and agent tools
+telemetry_callback = TelemetryCallbackHandler()
@@ -0,0 +1,41 @@
+"""
+Token estimation helpers
+Cheap local token counts (no tokenizer download, no API call)
+"""
+
+import math
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text.
+
+    Uses the common ~4 characters per token rule of thumb; Arabic and code
+    tokenize denser, so this slightly under-counts them.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / 4)
+
+
+def estimate_message_tokens(messages: list) -> int:
+    """
+    Estimate prompt tokens for a list of LangChain messages.
+
+    Args:
+        messages: LangChain message objects
+
+    Returns:
+        Estimated token count including per-message overhead
+    """
+    total = 0
+    for msg in messages:
+        content = msg.content if isinstance(msg.content, str) else str(msg.content)
+        total += estimate_tokens(content) + 4  # Role and separator overhead
+    return total